@@ -0,0 +1,130 @@
+"""序列運算核心效能測試腳本
+
+Micro-benchmarks for the NumPy sequence kernels.
+
+以隨機產生的讀序量測每個核心的吞吐量, 並與逐條 Python 實作比較, 例如:
+
+Measures the throughput of every kernel on random reads and compares it with a per-read
+Python implementation, for example:
+
+    uv run python scripts/benchmark_kernels.py --reads 200000 --length 250
+"""
+
+import argparse
+from collections.abc import Callable
+from pathlib import Path
+import sys
+import time
+
+import numpy as np
+
+# 將專案根目錄添加到 sys.path, 以便導入 src 模組
+_script_dir = Path(__file__).resolve().parent
+_project_root = _script_dir.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from src.utils.kernel_utils import (  # noqa: E402
+    COMPLEMENT_TABLE,
+    SequenceBatch,
+    decode_phred,
+    encode_2bit,
+    expected_errors,
+    kmer_hashes,
+    pack_2bit,
+    pack_4bit,
+    reverse_complement_batch,
+)
+from src.utils.sequence_utils import reverse_complement  # noqa: E402
+
+
+def make_reads(reads: int, length: int, seed: int) -> tuple[list[bytes], list[bytes]]:
+    """產生隨機讀序與品質字串
+
+    Generate random reads and quality strings.
+
+    Args:
+        reads (int): 讀序數 / Number of reads.
+        length (int): 讀序長度 / Read length.
+        seed (int): 亂數種子 / Random seed.
+
+    Returns:
+        tuple[list[bytes], list[bytes]]: 序列與品質字串 / Sequences and quality strings.
+    """
+    rng = np.random.default_rng(seed)
+    bases = np.frombuffer(b"ACGT", dtype=np.uint8)[rng.integers(0, 4, size=(reads, length))]
+    quals = rng.integers(33 + 2, 33 + 41, size=(reads, length), dtype=np.uint8)
+    return [row.tobytes() for row in bases], [row.tobytes() for row in quals]
+
+
+def best_time(func: Callable[[], object], repeat: int) -> float:
+    """執行多次並回傳最短時間
+
+    Run a function several times and return the best wall time.
+
+    Args:
+        func (Callable[[], object]): 受測函式 / Function under test.
+        repeat (int): 次數 / Number of runs.
+
+    Returns:
+        float: 最短秒數 / Best time in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv: list[str] | None = None) -> None:
+    """執行所有核心的效能測試
+
+    Run the benchmarks of every kernel.
+
+    Args:
+        argv (list[str] | None): 命令列參數 / Command-line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="序列運算核心效能測試 / Sequence kernel benchmarks"
+    )
+    parser.add_argument("--reads", type=int, default=100_000, help="讀序數 / Number of reads")
+    parser.add_argument("--length", type=int, default=250, help="讀序長度 / Read length")
+    parser.add_argument("--repeat", type=int, default=3, help="重複次數 / Repetitions")
+    parser.add_argument("--seed", type=int, default=0, help="亂數種子 / Random seed")
+    args = parser.parse_args(argv)
+
+    seqs, quals = make_reads(args.reads, args.length, args.seed)
+    seq_batch = SequenceBatch.from_bytes(seqs)
+    qual_batch = SequenceBatch.from_bytes(quals)
+    megabases = args.reads * args.length / 1e6
+
+    cases: list[tuple[str, Callable[[], object]]] = [
+        ("SequenceBatch.from_bytes", lambda: SequenceBatch.from_bytes(seqs)),
+        ("encode_2bit", lambda: encode_2bit(seq_batch)),
+        ("pack_2bit", lambda: pack_2bit(encode_2bit(seq_batch))),
+        ("pack_4bit", lambda: pack_4bit(seq_batch)),
+        ("reverse_complement_batch", lambda: reverse_complement_batch(seq_batch)),
+        ("bytes.translate (per read)", lambda: [s.translate(COMPLEMENT_TABLE)[::-1] for s in seqs]),
+        ("decode_phred", lambda: decode_phred(qual_batch)),
+        ("expected_errors", lambda: expected_errors(qual_batch)),
+        ("kmer_hashes k=16", lambda: kmer_hashes(seq_batch, 16)),
+        ("kmer_hashes k=16 canonical", lambda: kmer_hashes(seq_batch, 16, canonical=True)),
+    ]
+    # 逐字元的 Python 版本很慢, 只用前 1% 讀序並換算
+    # The per-character Python version is slow; time 1% of the reads and scale up
+    sample = seqs[: max(args.reads // 100, 1)]
+    scale = args.reads / len(sample)
+
+    print(f"{args.reads} 條讀序 x {args.length} bp ({megabases:.1f} Mbp), 取 {args.repeat} 次最佳")
+    print(f"{'kernel':<32}{'seconds':>10}{'Mbp/s':>12}")
+    for name, func in cases:
+        seconds = best_time(func, args.repeat)
+        print(f"{name:<32}{seconds:>10.4f}{megabases / seconds:>12.1f}")
+
+    seconds = best_time(lambda: [reverse_complement(s.decode()) for s in sample], 1) * scale
+    print(f"{'reverse_complement (dict)':<32}{seconds:>10.4f}{megabases / seconds:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,27 @@
 
 BLAST nucleotide database construction helper script.
 
-請在下方 def main() 函式中修改參數, 並將檔案路徑改為實際路徑。
+以命令列參數指定輸入檔案與選項, 例如:
 
-please modify the parameters in the def main() function and change the file paths to actual paths.
+Input files and options are given on the command line, for example:
+
+    uv run python scripts/make_blastndb_helper.py \\
+        --accession2taxid nucl_gb.accession2taxid.gz --fasta 0615.fasta \\
+        --taxdb taxdb.tar.gz --title 0615 --output database --shards 8
 """
 
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, closing
 import gzip
+import hashlib
+import heapq
 import logging
+import os
 from pathlib import Path
+import re
 import shutil
+import sqlite3
 import sys
 import tarfile
 
@@ -20,9 +32,33 @@ _project_root = _script_dir.parent
 if str(_project_root) not in sys.path:
     sys.path.insert(0, str(_project_root))
 
-from src.utils.path_utils import get_project_root  # noqa: E402
+from src.utils.fastx_utils import iter_fasta  # noqa: E402
+from src.utils.path_utils import get_blastdbcmd_path, get_project_root  # noqa: E402
+from src.utils.ref_index_utils import build_exact_index_from_db  # noqa: E402
 from src.utils.subprocess_utils import run_command  # noqa: E402
 
+# 串流讀寫的緩衝大小 (16 MiB)
+READ_BUFFER_SIZE = 16 * 1024 * 1024
+
+# taxid 快取檔案的副檔名與結構版本
+# File suffix and schema version of the taxid cache
+TAXID_CACHE_SUFFIX = ".sqlite3"
+TAXID_CACHE_SCHEMA = 1
+
+# 增量更新使用的檔名: manifest, 增量 volume 與 alias
+# File names used by incremental updates: manifest, increment volumes and alias
+MANIFEST_SUFFIX = ".manifest.tsv"
+INCREMENT_TAG = "_inc"
+ALIAS_TAG = "_all"
+
+# 分片建庫的 volume 名稱標記
+# Volume name tag of sharded builds
+SHARD_TAG = "_shard"
+
+# taxdb.tar.gz 解壓縮後的檔案
+# Files extracted from taxdb.tar.gz
+TAXDB_FILES = ("taxdb.btd", "taxdb.bti", "taxonomy4blast.sqlite3")
+
 # 初始化獨立的 logger(不影響主程式)
 logger = logging.getLogger("make_blastndb_helper")
 logger.setLevel(logging.INFO)
@@ -57,21 +93,6 @@ logger.addHandler(file_handler)
 logger.propagate = False
 
 
-def extract_gzip_file(gzip_path: Path, output_path: Path) -> None:
-    """解壓縮 gzip 檔案
-
-    Extract gzip file.
-
-    Args:
-        gzip_path (Path): gzip 檔案路徑 / Gzip file path.
-        output_path (Path): 輸出檔案路徑 / Output file path.
-    """
-    logger.info(f"解壓縮 gzip 檔案: {gzip_path} -> {output_path}")
-    with gzip.open(gzip_path, "rb") as f_in, open(output_path, "wb") as f_out:
-        shutil.copyfileobj(f_in, f_out)
-    logger.info(f"解壓縮完成: {output_path}")
-
-
 def extract_tar_gz_file(tar_gz_path: Path, output_dir: Path) -> None:
     """解壓縮 tar.gz 檔案(可能需解兩層)
 
@@ -97,39 +118,285 @@ def extract_tar_gz_file(tar_gz_path: Path, output_dir: Path) -> None:
     logger.info(f"解壓縮完成, 檔案已解壓到: {output_dir}")
 
 
-def parse_accession2taxid(accession2taxid_path: Path, output_path: Path) -> None:
-    """解析 accession2taxid 檔案
+def collect_fasta_ids(fasta_path: Path) -> set[bytes]:
+    """快速掃描 FASTA 標頭, 收集序列 ID
 
-    Parse accession2taxid file (equivalent to: sed '1d' | awk '{print $2" "$3}').
+    Scan FASTA headers and collect sequence IDs (e.g. MN123456.1).
 
     Args:
-        accession2taxid_path (Path): accession2taxid 檔案路徑 / Accession2taxid file path.
+        fasta_path (Path): FASTA 檔案路徑 / FASTA file path.
+
+    Returns:
+        set[bytes]: 序列 ID 集合 / Set of sequence IDs.
+    """
+    logger.info(f"掃描 FASTA 標頭: {fasta_path}")
+    seq_ids: set[bytes] = set()
+
+    with open(fasta_path, "rb", buffering=READ_BUFFER_SIZE) as f:
+        for line in f:
+            if line.startswith(b">"):
+                fields = line[1:].split(None, 1)
+                if fields:
+                    seq_ids.add(fields[0])
+
+    logger.info(f"FASTA 中共有 {len(seq_ids)} 個序列 ID")
+    return seq_ids
+
+
+def _strip_version(seq_id: bytes) -> bytes:
+    """去除 accession 的版本號 (MN123456.1 -> MN123456)
+
+    Strip the version suffix of an accession (MN123456.1 -> MN123456).
+
+    Args:
+        seq_id (bytes): 序列 ID / Sequence ID.
+
+    Returns:
+        bytes: 不含版本號的 accession / Accession without version.
+    """
+    return seq_id.split(b".", 1)[0]
+
+
+def parse_accession2taxid(
+    accession2taxid_path: Path, output_path: Path, fasta_ids: set[bytes] | None = None
+) -> int:
+    """串流解析 accession2taxid 檔案 (可直接讀取 .gz)
+
+    Stream-parse an accession2taxid file, reading .gz input directly without extracting it
+    (equivalent to: zcat | sed '1d' | awk '{print $2" "$3}').
+
+    若提供 fasta_ids, 只輸出出現在 FASTA 中的 accession (含版本或不含版本皆可比對)。
+
+    When fasta_ids are given, only accessions present in the FASTA are written; both
+    versioned and unversioned IDs match.
+
+    Args:
+        accession2taxid_path (Path): accession2taxid 檔案路徑 (.gz 或純文字) / Accession2taxid file path (.gz or plain text).
         output_path (Path): 輸出檔案路徑 / Output file path.
+        fasta_ids (set[bytes] | None): FASTA 中的序列 ID / Sequence IDs in the FASTA.
+
+    Returns:
+        int: 輸出的行數 / Number of lines written.
     """
     logger.info(f"解析 accession2taxid 檔案: {accession2taxid_path}")
 
-    buffer_size = 10000  # 一次寫 1 萬行
-    buffer = []
+    accessions = None
+    if fasta_ids is not None:
+        accessions = fasta_ids | {_strip_version(seq_id) for seq_id in fasta_ids}
+
+    opener = gzip.open if accession2taxid_path.suffix == ".gz" else open
+    written = 0
+    carry = b""
 
     with (
-        open(accession2taxid_path, encoding="utf-8") as f_in,
-        open(output_path, "w", encoding="utf-8") as f_out,
+        opener(accession2taxid_path, "rb") as f_in,
+        open(output_path, "wb", buffering=READ_BUFFER_SIZE) as f_out,
     ):
-        next(f_in)  # skip header
+        f_in.readline()  # skip header
 
-        for line in f_in:
-            parts = line.rstrip("\n").split("\t")
-            if len(parts) >= 3:
-                buffer.append(f"{parts[1]} {parts[2]}\n")
+        while True:
+            block = f_in.read(READ_BUFFER_SIZE)
+            if not block:
+                break
+
+            lines = (carry + block).split(b"\n")
+            carry = lines.pop()
+            written += _write_taxid_lines(lines, f_out, accessions)
+
+        if carry:
+            written += _write_taxid_lines([carry], f_out, accessions)
+
+    logger.info(f"解析完成, 共 {written} 筆, 輸出到: {output_path}")
+    return written
+
+
+def _write_taxid_lines(lines: list[bytes], f_out, accessions: set[bytes] | None) -> int:
+    """將 accession2taxid 行轉為 taxid_map 格式並寫出
+
+    Convert accession2taxid lines to taxid_map format and write them.
+
+    Args:
+        lines (list[bytes]): accession2taxid 行 / Accession2taxid lines.
+        f_out: 輸出檔案物件 (二進位) / Binary output file object.
+        accessions (set[bytes] | None): 要保留的 accession / Accessions to keep.
+
+    Returns:
+        int: 寫出的行數 / Number of lines written.
+    """
+    output: list[bytes] = []
 
-            if len(buffer) >= buffer_size:
-                f_out.writelines(buffer)
-                buffer.clear()
+    for line in lines:
+        parts = line.split(b"\t", 3)
+        if len(parts) < 3:
+            continue
+        accession, accession_version, taxid = parts[0], parts[1], parts[2].rstrip(b"\r")
+        if accessions is None or accession_version in accessions:
+            output.append(b"%s %s\n" % (accession_version, taxid))
+        elif accession in accessions:
+            output.append(b"%s %s\n" % (accession, taxid))
 
-        # 最後 flush
-        if buffer:
-            f_out.writelines(buffer)
-    logger.info(f"解析完成, 輸出到: {output_path}")
+    f_out.writelines(output)
+    return len(output)
+
+
+def _taxid_cache_source_stamp(accession2taxid_path: Path) -> str:
+    """取得 accession2taxid 來源檔案的版本戳記 (大小與修改時間)
+
+    Get the version stamp (size and mtime) of the accession2taxid source file.
+
+    Args:
+        accession2taxid_path (Path): accession2taxid 檔案路徑 / Accession2taxid file path.
+
+    Returns:
+        str: 版本戳記 / Version stamp.
+    """
+    stat = accession2taxid_path.stat()
+    return f"{TAXID_CACHE_SCHEMA}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def is_taxid_cache_valid(accession2taxid_path: Path, cache_path: Path) -> bool:
+    """檢查 taxid 快取是否對應目前的來源檔案
+
+    Check whether the taxid cache was built from the current source file.
+
+    Args:
+        accession2taxid_path (Path): accession2taxid 檔案路徑 / Accession2taxid file path.
+        cache_path (Path): 快取檔案路徑 / Cache file path.
+
+    Returns:
+        bool: 快取是否有效 / Whether the cache is valid.
+    """
+    if not cache_path.exists():
+        return False
+    try:
+        with closing(sqlite3.connect(cache_path)) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+    except sqlite3.Error:
+        return False
+    return row is not None and row[0] == _taxid_cache_source_stamp(accession2taxid_path)
+
+
+def build_taxid_cache(accession2taxid_path: Path, cache_path: Path) -> int:
+    """將 accession2taxid 轉為 SQLite 索引快取 (只需執行一次)
+
+    Convert an accession2taxid dump into an indexed SQLite cache (one-time conversion).
+
+    以不含版本號的 accession 為主鍵; 來源檔案變更 (大小或修改時間) 時快取失效。
+
+    Keyed by the unversioned accession; the cache is invalidated when the source file's size
+    or mtime changes.
+
+    Args:
+        accession2taxid_path (Path): accession2taxid 檔案路徑 (.gz 或純文字) / Accession2taxid file path (.gz or plain text).
+        cache_path (Path): 快取檔案路徑 / Cache file path.
+
+    Returns:
+        int: 寫入的筆數 / Number of rows written.
+    """
+    logger.info(f"建立 taxid 快取: {accession2taxid_path} -> {cache_path}")
+    tmp_path = cache_path.with_name(f"{cache_path.name}.tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    opener = gzip.open if accession2taxid_path.suffix == ".gz" else open
+    written = 0
+    carry = b""
+
+    with closing(sqlite3.connect(tmp_path)) as conn:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(
+            "CREATE TABLE taxid (accession TEXT PRIMARY KEY, taxid INTEGER NOT NULL) WITHOUT ROWID"
+        )
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        with opener(accession2taxid_path, "rb") as f_in:
+            f_in.readline()  # skip header
+
+            while True:
+                block = f_in.read(READ_BUFFER_SIZE)
+                if not block:
+                    break
+
+                lines = (carry + block).split(b"\n")
+                carry = lines.pop()
+                rows = _taxid_rows(lines)
+                conn.executemany("INSERT OR REPLACE INTO taxid VALUES (?, ?)", rows)
+                written += len(rows)
+
+            if carry:
+                rows = _taxid_rows([carry])
+                conn.executemany("INSERT OR REPLACE INTO taxid VALUES (?, ?)", rows)
+                written += len(rows)
+
+        conn.execute(
+            "INSERT INTO meta VALUES ('source', ?)",
+            (_taxid_cache_source_stamp(accession2taxid_path),),
+        )
+        conn.commit()
+
+    tmp_path.replace(cache_path)
+    logger.info(f"taxid 快取建立完成, 共 {written} 筆")
+    return written
+
+
+def _taxid_rows(lines: list[bytes]) -> list[tuple[str, int]]:
+    """將 accession2taxid 行轉為 (accession, taxid)
+
+    Convert accession2taxid lines into (accession, taxid) rows.
+
+    Args:
+        lines (list[bytes]): accession2taxid 行 / Accession2taxid lines.
+
+    Returns:
+        list[tuple[str, int]]: 快取資料列 / Cache rows.
+    """
+    rows: list[tuple[str, int]] = []
+    for line in lines:
+        parts = line.split(b"\t", 3)
+        if len(parts) >= 3 and parts[2].strip().isdigit():
+            rows.append((parts[0].decode("ascii", errors="replace"), int(parts[2])))
+    return rows
+
+
+def write_taxid_map_from_cache(cache_path: Path, fasta_ids: set[bytes], output_path: Path) -> int:
+    """從 taxid 快取批次查詢 FASTA 中的 accession 並寫出 taxid_map
+
+    Bulk-query the taxid cache for the FASTA's accessions and write a taxid_map file.
+
+    Args:
+        cache_path (Path): 快取檔案路徑 / Cache file path.
+        fasta_ids (set[bytes]): FASTA 中的序列 ID / Sequence IDs in the FASTA.
+        output_path (Path): 輸出檔案路徑 / Output file path.
+
+    Returns:
+        int: 輸出的行數 / Number of lines written.
+    """
+    logger.info(f"從 taxid 快取查詢 {len(fasta_ids)} 個序列 ID")
+    wanted = [
+        (
+            seq_id.decode("ascii", errors="replace"),
+            _strip_version(seq_id).decode("ascii", errors="replace"),
+        )
+        for seq_id in fasta_ids
+    ]
+
+    with closing(sqlite3.connect(cache_path)) as conn:
+        conn.execute("CREATE TEMP TABLE wanted (seq_id TEXT, accession TEXT)")
+        conn.executemany("INSERT INTO wanted VALUES (?, ?)", wanted)
+        rows = conn.execute(
+            "SELECT wanted.seq_id, taxid.taxid FROM wanted "
+            "JOIN taxid ON taxid.accession = wanted.accession "
+            "ORDER BY wanted.seq_id"
+        ).fetchall()
+
+    with open(output_path, "w", encoding="utf-8") as f_out:
+        f_out.writelines(f"{seq_id} {taxid}\n" for seq_id, taxid in rows)
+
+    missing = len(fasta_ids) - len(rows)
+    if missing:
+        logger.warning(f"{missing} 個序列 ID 在 accession2taxid 中找不到 taxid")
+    logger.info(f"taxid_map 輸出完成, 共 {len(rows)} 筆: {output_path}")
+    return len(rows)
 
 
 def check_database_files(output_path: Path) -> bool:
@@ -156,26 +423,479 @@ def check_database_files(output_path: Path) -> bool:
         return False
 
 
-def main() -> None:
+def write_taxid_map(
+    nucl_gz_path: Path, fasta_ids: set[bytes], output_path: Path, use_taxid_cache: bool
+) -> None:
+    """產生 makeblastdb 使用的 taxid_map 檔案
+
+    Write the taxid_map file used by makeblastdb.
+
+    Args:
+        nucl_gz_path (Path): accession2taxid 檔案路徑 / Accession2taxid file path.
+        fasta_ids (set[bytes]): FASTA 中的序列 ID / Sequence IDs in the FASTA.
+        output_path (Path): 輸出檔案路徑 / Output file path.
+        use_taxid_cache (bool): 是否使用 SQLite 快取 / Whether to use the SQLite cache.
+    """
+    if not use_taxid_cache:
+        parse_accession2taxid(nucl_gz_path, output_path, fasta_ids)
+        return
+
+    cache_path = nucl_gz_path.with_name(f"{nucl_gz_path.name}{TAXID_CACHE_SUFFIX}")
+    if not is_taxid_cache_valid(nucl_gz_path, cache_path):
+        build_taxid_cache(nucl_gz_path, cache_path)
+    else:
+        logger.info(f"使用既有的 taxid 快取: {cache_path}")
+    write_taxid_map_from_cache(cache_path, fasta_ids, output_path)
+
+
+def run_makeblastdb(
+    makeblastdb_exe: Path,
+    fasta_path: Path,
+    title: str,
+    db_name: str,
+    taxidmapfile_path: Path,
+    output_path: Path,
+) -> None:
+    """執行 makeblastdb
+
+    Run makeblastdb.
+
+    Args:
+        makeblastdb_exe (Path): makeblastdb 執行檔路徑 / makeblastdb executable path.
+        fasta_path (Path): 輸入 FASTA 檔案路徑 / Input FASTA file path.
+        title (str): 資料庫標題 / Database title.
+        db_name (str): 資料庫基礎名稱 (-out) / Database base name (-out).
+        taxidmapfile_path (Path): taxid_map 檔案路徑 / taxid_map file path.
+        output_path (Path): 輸出目錄 / Output directory.
+    """
+    # makeblastdb 的 -out 參數是資料庫的基礎名稱(不含副檔名)
+    cmd = [
+        str(makeblastdb_exe),
+        "-in",
+        str(fasta_path),
+        "-dbtype",
+        "nucl",
+        "-title",
+        title,
+        "-parse_seqids",
+        "-taxid_map",
+        str(taxidmapfile_path),
+        "-out",
+        db_name,
+    ]
+
+    logger.info(f"執行命令: {' '.join(cmd)}")
+    logger.info(f"執行目錄: {output_path}")
+    run_command(cmd, cwd=output_path, check=True, capture_output=True)
+    logger.info("資料庫建置命令執行完成")
+
+
+def read_fasta_digests(fasta_path: Path) -> dict[str, str]:
+    """計算 FASTA 中每條序列的雜湊
+
+    Compute the digest of every sequence in a FASTA file.
+
+    Args:
+        fasta_path (Path): FASTA 檔案路徑 / FASTA file path.
+
+    Returns:
+        dict[str, str]: 序列 ID 對應序列雜湊 / Sequence ID to sequence digest.
+    """
+    digests: dict[str, str] = {}
+    for header, seq in iter_fasta(fasta_path):
+        fields = header.split(None, 1)
+        if fields:
+            digests[fields[0].decode("ascii", errors="replace")] = hashlib.blake2b(
+                seq.upper(), digest_size=16
+            ).hexdigest()
+    return digests
+
+
+def load_manifest(output_path: Path, title: str) -> dict[str, str] | None:
+    """讀取資料庫已收錄序列的清單
+
+    Load the manifest of sequences already in the database.
+
+    Args:
+        output_path (Path): 資料庫目錄 / Database directory.
+        title (str): 資料庫標題 / Database title.
+
+    Returns:
+        dict[str, str] | None: 序列 ID 對應序列雜湊, 不存在時為 None / Sequence ID to digest, or None if missing.
+    """
+    manifest_path = output_path / f"{title}{MANIFEST_SUFFIX}"
+    if not manifest_path.exists():
+        return None
+
+    manifest: dict[str, str] = {}
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) == 2:
+                manifest[parts[0]] = parts[1]
+    return manifest
+
+
+def write_manifest(output_path: Path, title: str, digests: dict[str, str]) -> None:
+    """寫出資料庫已收錄序列的清單
+
+    Write the manifest of sequences in the database.
+
+    Args:
+        output_path (Path): 資料庫目錄 / Database directory.
+        title (str): 資料庫標題 / Database title.
+        digests (dict[str, str]): 序列 ID 對應序列雜湊 / Sequence ID to digest.
+    """
+    manifest_path = output_path / f"{title}{MANIFEST_SUFFIX}"
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        f.writelines(f"{seq_id}\t{digest}\n" for seq_id, digest in digests.items())
+
+
+def list_increment_volumes(output_path: Path, title: str) -> list[str]:
+    """列出資料庫的增量 volume 名稱
+
+    List the increment volume names of a database.
+
+    Args:
+        output_path (Path): 資料庫目錄 / Database directory.
+        title (str): 資料庫標題 / Database title.
+
+    Returns:
+        list[str]: 依建立順序排列的增量 volume / Increment volumes in creation order.
+    """
+    return sorted(
+        ndb.stem
+        for ndb in output_path.glob(f"{title}{INCREMENT_TAG}*.ndb")
+        if not re.search(r"\.\d{2}$", ndb.stem)
+    )
+
+
+def write_alias_file(output_path: Path, alias_name: str, title: str, volumes: list[str]) -> Path:
+    """寫出 BLAST 核酸 alias 檔 (.nal)
+
+    Write a BLAST nucleotide alias file (.nal).
+
+    Args:
+        output_path (Path): 資料庫目錄 / Database directory.
+        alias_name (str): alias 名稱 (不含副檔名) / Alias name without extension.
+        title (str): 資料庫標題 / Database title.
+        volumes (list[str]): 組成 alias 的資料庫 / Databases joined by the alias.
+
+    Returns:
+        Path: alias 檔案路徑 / Alias file path.
+    """
+    alias_path = output_path / f"{alias_name}.nal"
+    alias_path.write_text(
+        "#\n"
+        "# Alias file created by make_blastndb_helper\n"
+        "#\n"
+        f"TITLE {title}\n"
+        f"DBLIST {' '.join(volumes)}\n",
+        encoding="utf-8",
+    )
+    logger.info(f"已寫出 alias 檔: {alias_path} ({len(volumes)} 個 volume)")
+    return alias_path
+
+
+def remove_increment_volumes(output_path: Path, title: str) -> None:
+    """刪除增量 volume 與 alias (完整重建前使用)
+
+    Remove increment volumes and their alias before a full rebuild.
+
+    Args:
+        output_path (Path): 資料庫目錄 / Database directory.
+        title (str): 資料庫標題 / Database title.
+    """
+    for path in output_path.glob(f"{title}{INCREMENT_TAG}*"):
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+    (output_path / f"{title}{ALIAS_TAG}.nal").unlink(missing_ok=True)
+
+
+def update_database_incrementally(
+    makeblastdb_exe: Path,
+    nucl_gz_path: Path,
+    sequence_fasta_path: Path,
+    title: str,
+    output_path: Path,
+    temp_dir: Path,
+    use_taxid_cache: bool,
+) -> bool:
+    """只將新增的序列建為新的 volume 並更新 alias
+
+    Build only newly added sequences into an extra volume and regenerate the alias.
+
+    與 manifest 比較新的 FASTA; 若有序列被刪除或內容變更 (無法從既有 volume 移除),
+    回傳 False 以改為完整重建。
+
+    The new FASTA is diffed against the manifest. If any sequence was removed or changed
+    (which cannot be undone in an existing volume), False is returned so the caller falls
+    back to a full rebuild.
+
+    Args:
+        makeblastdb_exe (Path): makeblastdb 執行檔路徑 / makeblastdb executable path.
+        nucl_gz_path (Path): accession2taxid 檔案路徑 / Accession2taxid file path.
+        sequence_fasta_path (Path): 新的 FASTA 檔案路徑 / New FASTA file path.
+        title (str): 資料庫標題 / Database title.
+        output_path (Path): 資料庫目錄 / Database directory.
+        temp_dir (Path): 暫存目錄 / Temporary directory.
+        use_taxid_cache (bool): 是否使用 SQLite 快取 / Whether to use the SQLite cache.
+
+    Returns:
+        bool: 是否已完成增量更新 / Whether the incremental update was completed.
+    """
+    manifest = load_manifest(output_path, title)
+    if manifest is None:
+        logger.warning("找不到資料庫 manifest, 無法增量更新")
+        return False
+
+    digests = read_fasta_digests(sequence_fasta_path)
+    removed = manifest.keys() - digests.keys()
+    changed = [
+        seq_id for seq_id, digest in digests.items() if manifest.get(seq_id, digest) != digest
+    ]
+    if removed or changed:
+        logger.warning(
+            f"有 {len(removed)} 條序列被刪除, {len(changed)} 條序列內容變更, 無法增量更新"
+        )
+        return False
+
+    new_ids = [seq_id for seq_id in digests if seq_id not in manifest]
+    if not new_ids:
+        logger.info("沒有新增的序列, 資料庫已是最新狀態")
+        return True
+
+    logger.info(f"新增 {len(new_ids)} 條序列 (既有 {len(manifest)} 條)")
+    increment_fasta = temp_dir / "increment.fasta"
+    wanted = set(new_ids)
+    with open(increment_fasta, "wb") as f_out:
+        for header, seq in iter_fasta(sequence_fasta_path):
+            fields = header.split(None, 1)
+            if fields and fields[0].decode("ascii", errors="replace") in wanted:
+                f_out.write(b">" + header + b"\n" + seq + b"\n")
+
+    taxidmapfile_path = temp_dir / "taxidmapfile_increment.txt"
+    write_taxid_map(
+        nucl_gz_path,
+        {seq_id.encode("ascii") for seq_id in new_ids},
+        taxidmapfile_path,
+        use_taxid_cache,
+    )
+
+    existing = list_increment_volumes(output_path, title)
+    volume_name = f"{title}{INCREMENT_TAG}{len(existing) + 1:03d}"
+    run_makeblastdb(
+        makeblastdb_exe, increment_fasta, title, volume_name, taxidmapfile_path, output_path
+    )
+    build_exact_index_from_db(get_blastdbcmd_path(), output_path, volume_name)
+
+    write_alias_file(output_path, f"{title}{ALIAS_TAG}", title, [title, *existing, volume_name])
+    manifest.update({seq_id: digests[seq_id] for seq_id in new_ids})
+    write_manifest(output_path, title, manifest)
+    logger.info(f"增量更新完成: {volume_name}")
+    return True
+
+
+def remove_database_files(output_path: Path, title: str) -> None:
+    """刪除既有的資料庫檔案與分片 (完整重建前使用)
+
+    Remove existing database files and shards before a full rebuild.
+
+    只刪除 BLAST 核酸資料庫檔案 (<title>.n*, <title>.NN.n*) 與分片,
+    manifest 與完全比對索引會在建庫後覆寫。
+
+    Only BLAST nucleotide database files (<title>.n*, <title>.NN.n*) and shards are removed;
+    the manifest and exact-match index are overwritten after the build.
+
+    Args:
+        output_path (Path): 資料庫目錄 / Database directory.
+        title (str): 資料庫標題 / Database title.
+    """
+    patterns = [f"{title}.n*", f"{title}.[0-9][0-9].n*", f"{title}{SHARD_TAG}*"]
+    for pattern in patterns:
+        for path in output_path.glob(pattern):
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+
+
+def split_fasta_into_shards(fasta_path: Path, shard_paths: list[Path]) -> list[int]:
+    """依序列總長度將 FASTA 平均分成多個分片
+
+    Split a FASTA file into shards balanced by total residues.
+
+    每條序列寫入目前總長度最小的分片 (貪婪法)。
+
+    Each sequence goes to the shard with the fewest residues so far (greedy balancing).
+
+    Args:
+        fasta_path (Path): 輸入 FASTA 檔案路徑 / Input FASTA file path.
+        shard_paths (list[Path]): 分片輸出路徑 / Shard output paths.
+
+    Returns:
+        list[int]: 每個分片的鹼基數 / Residues per shard.
+    """
+    residues = [0] * len(shard_paths)
+    heap = [(0, index) for index in range(len(shard_paths))]
+
+    with ExitStack() as stack:
+        handles = [
+            stack.enter_context(open(path, "wb", buffering=READ_BUFFER_SIZE))
+            for path in shard_paths
+        ]
+        for header, seq in iter_fasta(fasta_path):
+            size, index = heapq.heappop(heap)
+            handles[index].write(b">" + header + b"\n" + seq + b"\n")
+            residues[index] = size + len(seq)
+            heapq.heappush(heap, (residues[index], index))
+
+    return residues
+
+
+def build_sharded_database(
+    makeblastdb_exe: Path,
+    sequence_fasta_path: Path,
+    title: str,
+    taxidmapfile_path: Path,
+    output_path: Path,
+    temp_dir: Path,
+    shards: int,
+    jobs: int,
+) -> Path:
+    """分片平行建庫, 並以 <title>.nal 合併
+
+    Build the database as parallel shards joined by <title>.nal.
+
+    Args:
+        makeblastdb_exe (Path): makeblastdb 執行檔路徑 / makeblastdb executable path.
+        sequence_fasta_path (Path): 輸入 FASTA 檔案路徑 / Input FASTA file path.
+        title (str): 資料庫標題 / Database title.
+        taxidmapfile_path (Path): taxid_map 檔案路徑 / taxid_map file path.
+        output_path (Path): 輸出目錄 / Output directory.
+        temp_dir (Path): 暫存目錄 / Temporary directory.
+        shards (int): 分片數 / Number of shards.
+        jobs (int): 同時執行的 makeblastdb 數量 / Number of concurrent makeblastdb processes.
+
+    Returns:
+        Path: alias 檔案路徑 / Alias file path.
+    """
+    shard_names = [f"{title}{SHARD_TAG}{index + 1:02d}" for index in range(shards)]
+    shard_paths = [temp_dir / f"{name}.fasta" for name in shard_names]
+
+    logger.info(f"將 FASTA 分成 {shards} 個分片")
+    residues = split_fasta_into_shards(sequence_fasta_path, shard_paths)
+    for name, size in zip(shard_names, residues, strict=True):
+        logger.info(f"分片 {name}: {size} bp")
+
+    # 空的分片 (序列數少於分片數時) 不建庫
+    # Empty shards (fewer sequences than shards) are skipped
+    built = [
+        (name, path)
+        for name, path, size in zip(shard_names, shard_paths, residues, strict=True)
+        if size
+    ]
+
+    logger.info(f"以 {min(jobs, len(built))} 個程序平行執行 makeblastdb")
+    with ThreadPoolExecutor(max_workers=min(jobs, len(built)) or 1) as executor:
+        futures = [
+            executor.submit(
+                run_makeblastdb,
+                makeblastdb_exe,
+                path,
+                title,
+                name,
+                taxidmapfile_path,
+                output_path,
+            )
+            for name, path in built
+        ]
+        for future in futures:
+            future.result()
+
+    return write_alias_file(output_path, title, title, [name for name, _ in built])
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """解析命令列參數
+
+    Parse command-line arguments.
+
+    Args:
+        argv (list[str] | None): 命令列參數, None 表示使用 sys.argv / Arguments, None for sys.argv.
+
+    Returns:
+        argparse.Namespace: 解析後的參數 / Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="建置 BLAST 核酸資料庫 / Build a BLAST nucleotide database "
+        "(檔案路徑需全英文 / file paths must be in English only)"
+    )
+    parser.add_argument(
+        "--accession2taxid",
+        type=Path,
+        required=True,
+        help="nucl_gb.accession2taxid.gz 檔案或其所在目錄 / file or its directory",
+    )
+    parser.add_argument("--fasta", type=Path, required=True, help="序列 FASTA / Sequence FASTA")
+    parser.add_argument(
+        "--taxdb",
+        type=Path,
+        help="taxdb.tar.gz (--incremental 時可省略以沿用既有的 taxdb) / "
+        "optional with --incremental, which reuses the existing taxdb",
+    )
+    parser.add_argument("--title", required=True, help="資料庫標題 / Database title")
+    parser.add_argument("--output", type=Path, required=True, help="輸出目錄 / Output directory")
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="將 FASTA 分成幾個分片平行建庫 (以 <title>.nal 合併) / "
+        "Number of shards built in parallel and joined by <title>.nal",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="同時執行的 makeblastdb 數量 / Number of concurrent makeblastdb processes",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="只將新增序列建為新的 volume (以 <title>_all.nal 合併) / "
+        "Build only new sequences into an extra volume joined by <title>_all.nal",
+    )
+    parser.add_argument(
+        "--no-taxid-cache",
+        action="store_true",
+        help="不使用 accession2taxid 的 SQLite 快取 / Do not use the SQLite accession2taxid cache",
+    )
+    args = parser.parse_args(argv)
+    if args.taxdb is None and not args.incremental:
+        parser.error("完整建庫需要 --taxdb / --taxdb is required unless --incremental is set")
+    return args
+
+
+def main(argv: list[str] | None = None) -> None:
     """主函式
 
     Main function.
+
+    Args:
+        argv (list[str] | None): 命令列參數, None 表示使用 sys.argv / Arguments, None for sys.argv.
     """
-    # 輸入參數(檔案路徑需全英文)
-    # Input parameters (file paths must be in English only)
-    accession2taxid_path = Path(
-        r"C:\Users\Andy\Downloads\nucl_gb.accession2taxid.gz"
-    )  # 請修改為實際路徑 / Please modify to actual path
-    sequence_fasta_path = Path(
-        r"C:\Users\Andy\Desktop\0615.fasta"
-    )  # 請修改為實際路徑 / Please modify to actual path
-    taxdb_path = Path(
-        r"C:\Users\Andy\Downloads\taxdb.tar.gz"
-    )  # 請修改為實際路徑 / Please modify to actual path
-    title = "0615"  # 資料庫標題 / Database title
-    output_path = Path(
-        r"C:\Users\Andy\Desktop\Data\database"
-    )  # 請修改為實際路徑 / Please modify to actual path
+    args = parse_args(argv)
+    accession2taxid_path: Path = args.accession2taxid
+    sequence_fasta_path: Path = args.fasta
+    taxdb_path: Path | None = args.taxdb
+    title: str = args.title
+    output_path: Path = args.output
+    use_taxid_cache = not args.no_taxid_cache
+    incremental: bool = args.incremental
+    shards = max(args.shards, 1)
+    jobs = max(args.jobs, 1)
 
     logger.info("開始建置 BLAST 核酸資料庫")
     logger.info(f"accession2taxid_path: {accession2taxid_path}")
@@ -183,6 +903,7 @@ def main() -> None:
     logger.info(f"taxdb_path: {taxdb_path}")
     logger.info(f"title: {title}")
     logger.info(f"output_path: {output_path}")
+    logger.info(f"shards: {shards}, jobs: {jobs}")
 
     # 檢查輸入檔案是否存在
     if not accession2taxid_path.exists():
@@ -193,7 +914,7 @@ def main() -> None:
         logger.error(f"sequence_fasta_path 不存在: {sequence_fasta_path}")
         return
 
-    if not taxdb_path.exists():
+    if taxdb_path is not None and not taxdb_path.exists():
         logger.error(f"taxdb_path 不存在: {taxdb_path}")
         return
 
@@ -203,7 +924,7 @@ def main() -> None:
     temp_dir.mkdir(parents=True, exist_ok=True)
 
     try:
-        # 步驟 1: 解壓縮
+        # 步驟 1: 解壓縮 (accession2taxid 不解壓, 於步驟 2 直接串流讀取)
         logger.info("=== 步驟 1: 解壓縮 ===")
         # 判斷 accession2taxid_path 是檔案還是目錄
         if accession2taxid_path.is_file():
@@ -218,60 +939,83 @@ def main() -> None:
             logger.error(f"找不到 nucl_gb.accession2taxid.gz: {nucl_gz_path}")
             return
 
-        nucl_accession2taxid_path = temp_dir / "nucl_gb.accession2taxid"
-        extract_gzip_file(nucl_gz_path, nucl_accession2taxid_path)
-
-        extract_tar_gz_file(taxdb_path, output_path)
-
-        # 檢查解壓縮後的檔案
-        expected_files = [
-            "taxdb.btd",
-            "taxdb.bti",
-            "taxonomy4blast.sqlite3",
-        ]
-        for filename in expected_files:
-            file_path = output_path / filename
-            if not file_path.exists():
-                logger.warning(f"預期的檔案不存在: {file_path}")
+        # 增量更新沿用資料庫目錄中既有的 taxdb, 不重新解壓縮
+        # Incremental updates reuse the taxdb already in the database folder
+        has_taxdb = all((output_path / filename).exists() for filename in TAXDB_FILES[:2])
+        if incremental and has_taxdb:
+            logger.info("沿用既有的 taxdb, 不重新解壓縮")
+        elif taxdb_path is None:
+            logger.error(f"資料庫目錄中沒有 taxdb, 請以 --taxdb 指定: {output_path}")
+            return
+        else:
+            extract_tar_gz_file(taxdb_path, output_path)
 
-        # 步驟 2: Parsing
-        logger.info("=== 步驟 2: Parsing ===")
-        taxidmapfile_path = temp_dir / "taxidmapfile.txt"
-        parse_accession2taxid(nucl_accession2taxid_path, taxidmapfile_path)
+            # 檢查解壓縮後的檔案
+            for filename in TAXDB_FILES:
+                file_path = output_path / filename
+                if not file_path.exists():
+                    logger.warning(f"預期的檔案不存在: {file_path}")
 
-        # 步驟 3: 建立資料庫
-        logger.info("=== 步驟 3: 建立資料庫 ===")
         makeblastdb_exe = get_project_root() / "dependencies" / "blast+" / "bin" / "makeblastdb.exe"
 
         if not makeblastdb_exe.exists():
             logger.error(f"找不到 makeblastdb.exe: {makeblastdb_exe}")
             return
 
-        # makeblastdb 的 -out 參數是資料庫的基礎名稱(不含副檔名)
-        cmd = [
-            str(makeblastdb_exe),
-            "-in",
-            str(sequence_fasta_path),
-            "-dbtype",
-            "nucl",
-            "-title",
-            title,
-            "-parse_seqids",
-            "-taxid_map",
-            str(taxidmapfile_path),
-            "-out",
-            title,
-        ]
+        existing_db = (output_path / f"{title}.ndb").exists() or (
+            output_path / f"{title}.nal"
+        ).exists()
+        if incremental and existing_db:
+            logger.info("=== 增量更新 ===")
+            if update_database_incrementally(
+                makeblastdb_exe,
+                nucl_gz_path,
+                sequence_fasta_path,
+                title,
+                output_path,
+                temp_dir,
+                use_taxid_cache,
+            ):
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                logger.info("BLAST 核酸資料庫增量更新流程完成")
+                return
+            logger.warning("改為完整重建資料庫")
 
-        logger.info(f"執行命令: {' '.join(cmd)}")
-        logger.info(f"執行目錄: {output_path}")
-        run_command(cmd, cwd=output_path, check=True, capture_output=True)
-        logger.info("資料庫建置命令執行完成")
+        # 步驟 2: Parsing
+        logger.info("=== 步驟 2: Parsing ===")
+        taxidmapfile_path = temp_dir / "taxidmapfile.txt"
+        fasta_ids = collect_fasta_ids(sequence_fasta_path)
+        write_taxid_map(nucl_gz_path, fasta_ids, taxidmapfile_path, use_taxid_cache)
+
+        # 步驟 3: 建立資料庫
+        logger.info("=== 步驟 3: 建立資料庫 ===")
+        remove_increment_volumes(output_path, title)
+        remove_database_files(output_path, title)
+        if shards > 1:
+            build_sharded_database(
+                makeblastdb_exe,
+                sequence_fasta_path,
+                title,
+                taxidmapfile_path,
+                output_path,
+                temp_dir,
+                shards,
+                jobs,
+            )
+        else:
+            run_makeblastdb(
+                makeblastdb_exe, sequence_fasta_path, title, title, taxidmapfile_path, output_path
+            )
 
         # 步驟 4: 確認建庫成功並刪除 temp
         logger.info("=== 步驟 4: 確認建庫成功 ===")
         db_output_path = output_path
         if check_database_files(db_output_path):
+            # 步驟 5: 建立完全比對索引 (供分析時略過 BLAST)
+            logger.info("=== 步驟 5: 建立完全比對索引 ===")
+            build_exact_index_from_db(get_blastdbcmd_path(), output_path, title)
+            write_manifest(output_path, title, read_fasta_digests(sequence_fasta_path))
+
             logger.info("刪除臨時目錄")
             if temp_dir.exists():
                 shutil.rmtree(temp_dir, ignore_errors=True)
@@ -12,9 +12,7 @@ from src.utils.logger_utils import init_logger
 from src.utils.path_utils import get_icon_path, get_project_root
 from src.utils.ui_config import COLORS, FONTS, LAYOUT
 
-# 初始化根 Logger(僅在應用程式啟動時執行一次)
 LOG_FILE = get_project_root() / "logs" / "trim2sort.log"
-init_logger(level="INFO", log_file=LOG_FILE, use_color=True)
 
 
 def load_app_image() -> customtkinter.CTkImage:
@@ -122,5 +120,8 @@ class App(customtkinter.CTk):
 
 
 if __name__ == "__main__":
+    # 初始化根 Logger (僅在主程序啟動時執行一次; 子程序的日誌經由佇列送回主程序)
+    # Initialize the root logger once in the main process; workers log through its queue
+    init_logger(level="INFO", log_file=LOG_FILE, use_color=True)
     app = App()
     app.mainloop()
@@ -3,36 +3,187 @@
 NGS (Next Generation Sequencing) analysis module.
 """
 
-from collections.abc import Sequence
+from collections.abc import Callable, Mapping, Sequence
+from functools import partial
 import gc
+import json
 from pathlib import Path
 import re
 import shutil
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import warnings
 
 import customtkinter
 import natsort
-import numpy as np
 import pandas as pd
 from PIL import Image
 
+from src.utils.abundance_utils import (
+    AbundanceGate,
+    read_otu_counts,
+    write_gated_queries,
+)
+from src.utils.blast_summary_utils import summarize_blast_hits
+from src.utils.blast_utils import run_blast_chunked
 from src.utils.excel_utils import highlight_row
+from src.utils.fastx_utils import iter_fasta
+from src.utils.fused_pipeline_utils import FusedOutputs, FusedSettings, run_fused_sample
 from src.utils.logger_utils import get_logger
+from src.utils.merge_utils import MergeSettings, merge_pairs
+from src.utils.pairing_utils import is_fastq_file, pair_fastq_files, preflight_read_pairs
 from src.utils.path_utils import (
     find_latest_ref_file,
     get_blastn_path,
     get_cutadapt_path,
     get_icon_path,
+    get_project_root,
     get_usearch_path,
 )
+from src.utils.primer_trim_utils import (
+    LinkedAdapter,
+    relocate_cutadapt_report,
+    trim_primers_paired,
+)
+from src.utils.qc_utils import scan_fastq_pair, write_qc_report
+from src.utils.ref_index_utils import (
+    blast_with_exact_index,
+    load_exact_index,
+    read_alias_volumes,
+)
+from src.utils.scheduler_utils import CoreScheduler, ToolProfile, detect_resource_budget
 from src.utils.sequence_utils import reverse_complement
+from src.utils.stage_cache_utils import StageCache, source_fingerprint
 from src.utils.subprocess_utils import run_command
+from src.utils.subsample_utils import reservoir_sample_pairs
+from src.utils.sweep_utils import (
+    SweepSetting,
+    derive_sweep_uniques,
+    summarize_sorted_blasts,
+    sweep_grid,
+    write_sweep_comparison,
+)
 from src.utils.ui_config import COLORS, FONTS, LAYOUT
 
 logger = get_logger(__name__)
 
+BLAST_OUTFMT_FIELDS = ("qseqid", "pident", "qcovs", "sscinames", "sacc")
+BLAST_MAX_TARGET_SEQS = 3
+
+# 32 位元 usearch 單一程序的記憶體上限 (4 GB)
+# Per-process memory ceiling of 32-bit usearch (4 GB)
+USEARCH_MEMORY_CEILING = 4 * 1024**3
+
+# 各外部工具與內建步驟的資源特性 (最大有效執行緒數與每個程序預留的記憶體);
+# 內建步驟的執行緒數為每個樣本的子程序數
+# Resource profiles of the external tools and built-in stages (useful thread cap and memory
+# reserved per process); for built-in stages the threads are worker processes per sample
+CUTADAPT_PROFILE = ToolProfile("cutadapt", max_threads=8, memory_bytes=512 * 1024**2)
+USEARCH_THREADED_PROFILE = ToolProfile(
+    "usearch", max_threads=16, memory_bytes=USEARCH_MEMORY_CEILING
+)
+USEARCH_SINGLE_PROFILE = ToolProfile("usearch", max_threads=1, memory_bytes=USEARCH_MEMORY_CEILING)
+FUSED_PIPELINE_PROFILE = ToolProfile(
+    "fused_pipeline", max_threads=16, memory_bytes=1024**3, native=True
+)
+NATIVE_TRIM_PROFILE = ToolProfile(
+    "primer_trim", max_threads=16, memory_bytes=512 * 1024**2, native=True
+)
+NATIVE_MERGE_PROFILE = ToolProfile(
+    "merge_pairs", max_threads=16, memory_bytes=512 * 1024**2, native=True
+)
+BLASTN_PROFILE = ToolProfile("blastn", max_threads=64, memory_bytes=1024**3)
+INPUT_QC_PROFILE = ToolProfile("input_qc", max_threads=2, memory_bytes=256 * 1024**2, native=True)
+PREFLIGHT_PROFILE = ToolProfile("preflight", max_threads=1, memory_bytes=256 * 1024**2)
+PREVIEW_SUBSAMPLE_PROFILE = ToolProfile(
+    "preview_subsample", max_threads=1, memory_bytes=256 * 1024**2
+)
+
+# 預覽模式的輸出資料夾與結果檔名標記
+# Output folder and result file name marker of the preview mode
+PREVIEW_FOLDER = "PREVIEW"
+PREVIEW_MARKER = "_PREVIEW"
+
+# 參數掃描的輸出資料夾與各設定分開建立的資料夾 (步驟 1-2 的結果共用)
+# Output folder of parameter sweeps and the folders created per setting; steps 1-2 are shared
+SWEEP_FOLDER = "SWEEP"
+SWEEP_BRANCH_FOLDERS = ("E_uniques", "F_OTUs", "G_OTUtable", "H_blasts", "I_sorted_blasts")
+SWEEP_BRANCH_PROFILE = ToolProfile(
+    "sweep_branches", max_threads=16, memory_bytes=1024**3, native=True
+)
+
+# 內建步驟的實作模組, 其原始碼摘要作為步驟快取的工具版本
+# Implementation modules of the built-in stages; their source digest is the stage cache tool
+# version
+NATIVE_TRIM_MODULES = ("src.utils.primer_trim_utils", "src.utils.fastx_utils")
+NATIVE_MERGE_MODULES = ("src.utils.merge_utils", "src.utils.fastx_utils", "src.utils.kernel_utils")
+FUSED_PIPELINE_MODULES = (
+    "src.utils.fused_pipeline_utils",
+    *NATIVE_TRIM_MODULES,
+    *NATIVE_MERGE_MODULES,
+)
+
+
+# 不可單獨使用的 volume: makeblastdb 的 .NN 分卷、分片建庫與增量更新的 volume
+# Volumes that must not be used alone: makeblastdb .NN parts, shard and increment volumes
+PARTIAL_VOLUME_PATTERN = re.compile(r"(\.\d{2}|_shard\d+|_inc\d+)$")
+
+
+def list_blast_databases(db_path: Path) -> list[str]:
+    """列出資料夾中可供選擇的 BLAST 資料庫 (alias 優先)
+
+    List the selectable BLAST databases in a folder, aliases first.
+
+    分卷、分片與增量 volume, 以及已被其他 alias 包含的資料庫都不列出, 以免只比對部分
+    資料庫; alias 以 "(Combined) " 前綴表示。
+
+    Partial, shard and increment volumes, and databases included by another alias, are left
+    out so a partial database cannot be selected; aliases carry a "(Combined) " prefix.
+
+    Args:
+        db_path (Path): 資料庫資料夾 / Database folder.
+
+    Returns:
+        list[str]: 資料庫選項 / Database choices.
+    """
+    aliases = {path.stem: path for path in db_path.glob("*.nal") if path.is_file()}
+    volumes = {path.stem for path in db_path.glob("*.ndb") if path.is_file()}
+    included = {name for alias in aliases.values() for name in read_alias_volumes(alias)}
+
+    def selectable(name: str) -> bool:
+        return name not in included and not PARTIAL_VOLUME_PATTERN.search(name)
+
+    return [
+        *(f"(Combined) {name}" for name in natsort.natsorted(filter(selectable, aliases))),
+        *natsort.natsorted(name for name in volumes - aliases.keys() if selectable(name)),
+    ]
+
+
+def reset_folder(folder_path: Path) -> Path:
+    """清空並建立資料夾 (無法刪除時盡量清除其內容)
+
+    Empty and create a folder, clearing as much content as possible when it cannot be removed.
+
+    Args:
+        folder_path (Path): 資料夾路徑 / Folder path.
+
+    Returns:
+        Path: 資料夾路徑 / Folder path.
+    """
+    if folder_path.exists():
+        try:
+            shutil.rmtree(folder_path)
+        except PermissionError:
+            for item in folder_path.iterdir():
+                try:
+                    if item.is_dir():
+                        shutil.rmtree(item, ignore_errors=True)
+                    else:
+                        item.unlink()
+                except Exception:
+                    pass
+    folder_path.mkdir(parents=True, exist_ok=True)
+    return folder_path
+
 
 def load_app_image() -> customtkinter.CTkImage:
     """載入應用程式圖示
@@ -63,6 +214,41 @@ class NGSConfig:
         self.quality_threshold: int = 20
         self.length_threshold: int = 150
         self.ref_path: str = find_latest_ref_file()
+        self.use_exact_index: bool = True
+        self.use_native_primer_trimming: bool = True
+        self.use_native_merging: bool = True
+        # 合併 staggered 配對並修除突出端 (usearch -fastq_allowmergestagger), 預設與 usearch
+        # 相同丟棄
+        # Merge staggered pairs with their overhangs trimmed (usearch
+        # -fastq_allowmergestagger); like usearch they are discarded by default
+        self.merge_allow_stagger: bool = False
+        self.use_fused_pipeline: bool = True
+        self.fused_debug_dumps: bool = False
+        self.run_input_qc: bool = True
+        self.verify_input_pairs: bool = True
+        # 送入 BLAST 的 ZOTU 最低讀序數與比例, 0 表示不限制
+        # Minimum read count and ratio for a ZOTU to be BLASTed; 0 disables the threshold
+        self.blast_min_reads: int = 0
+        self.blast_min_ratio: float = 0.0
+        # 預覽模式每個樣本抽樣的配對數與亂數種子
+        # Read pairs sampled per sample in preview mode, and the random seed
+        self.preview_read_pairs: int = 5000
+        self.preview_seed: int = 0
+        # 參數掃描的品質與長度門檻, 任一設定時改為執行掃描 (未設定的一方使用上方的門檻)
+        # Quality and length thresholds to sweep; setting either runs a sweep, and the other
+        # falls back to the threshold above
+        self.sweep_quality_thresholds: list[int] = []
+        self.sweep_length_thresholds: list[int] = []
+        # 跨輸出資料夾與專案共用的步驟快取 (BLAST 與結果整理不快取)
+        # Stage cache shared across output folders and projects; BLAST and post-processing
+        # are not cached
+        self.use_stage_cache: bool = True
+        self.stage_cache_dir: str = str(get_project_root() / "stage_cache")
+        self.stage_cache_max_gb: float = 20.0
+        # 資源預算, None 表示由主機偵測
+        # Resource budget; None detects the value from the host
+        self.cpu_budget: int | None = None
+        self.memory_budget_gb: float | None = None
 
 
 class ConfigWindow(customtkinter.CTkToplevel):
@@ -692,6 +878,23 @@ class NGSContentFrame(customtkinter.CTkFrame):
         )
         self.analyse_button.grid(row=row, column=1, padx=(5, 0), sticky="ew")
 
+        row += 1
+
+        self.preview_button = customtkinter.CTkButton(
+            self,
+            height=LAYOUT.BUTTON_HEIGHT,
+            border_width=0,
+            corner_radius=LAYOUT.CORNER_RADIUS,
+            text="PREVIEW",
+            fg_color=COLORS.SECONDARY_BG,
+            text_color=COLORS.TEXT_PRIMARY,
+            hover_color=COLORS.HOVER_BG,
+            font=(FONTS.FAMILY, FONTS.SIZE_NORMAL, FONTS.STYLE_BOLD),
+            command=self.preview,
+            state="disabled",
+        )
+        self.preview_button.grid(row=row, column=0, columnspan=2, pady=(10, 0), sticky="ew")
+
         self._setup_field_validation()
 
     def _setup_field_validation(self) -> None:
@@ -723,10 +926,9 @@ class NGSContentFrame(customtkinter.CTkFrame):
             and bool(self.outputs_path.get())
         )
 
-        if all_filled:
-            self.analyse_button.configure(state="normal")
-        else:
-            self.analyse_button.configure(state="disabled")
+        state = "normal" if all_filled else "disabled"
+        self.analyse_button.configure(state=state)
+        self.preview_button.configure(state=state)
 
     def open_config(self) -> None:
         """開啟配置視窗
@@ -786,18 +988,7 @@ class NGSContentFrame(customtkinter.CTkFrame):
                 "Warning", "no taxdb.btd & taxdb.bti files found, scientific name will be N/A"
             )
 
-        database_files = []
-        for file_path in db_path.iterdir():
-            if file_path.is_file():
-                if file_path.suffix == ".nal":
-                    database_files.append(f"(Combined) {file_path.stem}")
-                elif file_path.suffix == ".ndb":
-                    # 過濾掉附屬檔案 (如 .00.ndb, .01.ndb 等)
-                    # 只保留純正的 .ndb 檔案 (不以 .XX.ndb 結尾)
-                    file_name = file_path.name
-                    if not re.search(r"\.\d{2}\.ndb$", file_name):
-                        database_files.append(file_path.stem)
-
+        database_files = list_blast_databases(db_path)
         if database_files:
             self.database_selector_combo.configure(values=database_files)
             self.database_selector.set(database_files[0])
@@ -826,10 +1017,26 @@ class NGSContentFrame(customtkinter.CTkFrame):
             self.outputs_path.set(foldername)
         self._check_fields()
 
-    def analyse(self) -> None:
+    def preview(self) -> None:
+        """以抽樣的讀序執行預覽分析
+
+        Execute a preview analysis on sampled reads.
+        """
+        self.analyse(preview=True)
+
+    def analyse(self, preview: bool = False) -> None:
         """執行 NGS 分析
 
         Execute NGS analysis.
+
+        預覽模式的結果寫入輸出資料夾下的 PREVIEW 資料夾, 不會覆蓋完整分析的結果。
+
+        Preview results go to a PREVIEW folder inside the outputs folder, so full results are
+        not overwritten.
+
+        Args:
+            preview (bool): 是否只分析每個樣本抽樣的讀序 / Whether to analyse only sampled
+                reads of every sample.
         """
         samples_dir = Path(self.samples_path.get())
         outputs_dir = Path(self.outputs_path.get())
@@ -839,16 +1046,36 @@ class NGSContentFrame(customtkinter.CTkFrame):
             messagebox.showerror("Error", "Samples or outputs folder does not exist")
             return
 
-        input_files = natsort.natsorted(
-            [f for f in samples_dir.iterdir() if f.is_file() and f.suffix.lower() == ".fastq"]
-        )
-        sample_size = len(input_files) // 2
+        fastq_files = [f for f in samples_dir.iterdir() if f.is_file() and is_fastq_file(f)]
+        pairs, problems = pair_fastq_files(fastq_files)
 
-        if sample_size == 0:
+        if not pairs and not problems:
             logger.error("未找到任何樣本檔案")
             messagebox.showerror("Error", "No sample files found")
             return
 
+        scheduler = CoreScheduler(
+            detect_resource_budget(self.config.cpu_budget, self.config.memory_budget_gb)
+        )
+        input_qc: dict[str, dict] = {}
+        if self.config.verify_input_pairs:
+            # 需要輸入品質檢查時於預檢的同一次讀取中累計, 每個 FASTQ 只讀一次
+            # When the input QC is wanted it is accumulated in the same pre-flight read, so
+            # every FASTQ is read only once
+            plan = scheduler.plan("preflight", PREFLIGHT_PROFILE, len(pairs))
+            checks = preflight_read_pairs(pairs, plan.workers, with_qc=self.config.run_input_qc)
+            problems += [f"{check.pair.sample}: {check.error}" for check in checks if not check.ok]
+            input_qc = {check.pair.r1.name: check.qc for check in checks if check.qc is not None}
+
+        if problems:
+            for problem in problems:
+                logger.error(f"輸入檔案預檢失敗: {problem}")
+            messagebox.showerror("Error", "Invalid input files:\n" + "\n".join(problems[:20]))
+            return
+
+        input_files = [path for pair in pairs for path in (pair.r1, pair.r2)]
+        sample_size = len(pairs)
+
         gc.collect()
 
         folder_names = [
@@ -862,24 +1089,25 @@ class NGSContentFrame(customtkinter.CTkFrame):
             "H_blasts",
             "I_sorted_blasts",
         ]
+        if preview:
+            outputs_dir = outputs_dir / PREVIEW_FOLDER
+            folder_names.insert(0, "0_samples")
+
+        sweep_settings: list[SweepSetting] = []
+        if self.config.sweep_quality_thresholds or self.config.sweep_length_thresholds:
+            sweep_settings = sweep_grid(
+                self.config.sweep_quality_thresholds or [self.config.quality_threshold],
+                self.config.sweep_length_thresholds or [self.config.length_threshold],
+            )
+            # 步驟 3-9 的資料夾由各設定分別建立
+            # Folders of steps 3-9 are created per setting
+            folder_names = [
+                name
+                for name in folder_names
+                if name not in ("C_quality", "D_length", *SWEEP_BRANCH_FOLDERS)
+            ]
 
-        folders: dict[str, Path] = {}
-        for folder_name in folder_names:
-            folder_path = outputs_dir / folder_name
-            if folder_path.exists():
-                try:
-                    shutil.rmtree(folder_path)
-                except PermissionError:
-                    for item in folder_path.iterdir():
-                        try:
-                            if item.is_dir():
-                                shutil.rmtree(item, ignore_errors=True)
-                            else:
-                                item.unlink()
-                        except Exception:
-                            pass
-            folder_path.mkdir(parents=True, exist_ok=True)
-            folders[folder_name] = folder_path
+        folders = {name: reset_folder(outputs_dir / name) for name in folder_names}
 
         processor = NGSProcessor(
             cutadapt_path=self.cutadapt_path.get(),
@@ -889,12 +1117,25 @@ class NGSContentFrame(customtkinter.CTkFrame):
             database_selector=self.database_selector.get(),
             config=self.config,
             folders=folders,
+            preview=preview,
+            input_qc=input_qc,
+            scheduler=scheduler,
         )
 
         try:
-            processor.run_analysis(samples_dir, input_files, sample_size)
+            if sweep_settings:
+                processor.run_sweep(samples_dir, input_files, sample_size, sweep_settings)
+            else:
+                processor.run_analysis(samples_dir, input_files, sample_size)
             logger.info("分析完成")
-            messagebox.showinfo("Success", "Analysis completed successfully")
+            if sweep_settings:
+                messagebox.showinfo(
+                    "Success", f"Parameter sweep completed, results in {outputs_dir / SWEEP_FOLDER}"
+                )
+            elif preview:
+                messagebox.showinfo("Success", f"Preview completed, results in {outputs_dir}")
+            else:
+                messagebox.showinfo("Success", "Analysis completed successfully")
         except Exception as e:
             logger.error(f"分析過程發生錯誤: {e}")
             messagebox.showerror("Error", f"Analysis failed: {e}")
@@ -915,6 +1156,9 @@ class NGSProcessor:
         database_selector: str,
         config: NGSConfig,
         folders: dict[str, Path],
+        preview: bool = False,
+        input_qc: dict[str, dict] | None = None,
+        scheduler: CoreScheduler | None = None,
     ) -> None:
         """初始化 NGS 處理器
 
@@ -928,6 +1172,15 @@ class NGSProcessor:
             database_selector (str): 資料庫選擇器 / Database selector.
             config (NGSConfig): NGS 設定 / NGS configuration.
             folders (dict[str, Path]): 資料夾路徑字典 / Folder paths dictionary.
+            preview (bool): 預覽模式, 每個樣本只分析抽樣的讀序 (需要 "0_samples" 資料夾) /
+                Preview mode, analysing only sampled reads of every sample; requires a
+                "0_samples" folder.
+            input_qc (dict[str, dict] | None): 預檢時已累計的輸入品質檢查 (R1 檔名 -> 結果),
+                這些樣本不再重新掃描 / Input QC already accumulated by the pre-flight check,
+                R1 file name -> result; those samples are not scanned again.
+            scheduler (CoreScheduler | None): 沿用的排程器 (含預檢的決策), 未指定時依設定建立 /
+                Scheduler to reuse, carrying the pre-flight decision; built from the config
+                when omitted.
         """
         self.cutadapt_path = cutadapt_path
         self.usearch_path = usearch_path
@@ -936,6 +1189,52 @@ class NGSProcessor:
         self.database_selector = database_selector
         self.config = config
         self.folders = folders
+        self.exact_index = (
+            load_exact_index(database_path, self.db_name) if config.use_exact_index else None
+        )
+        self.scheduler = scheduler or CoreScheduler(
+            detect_resource_budget(config.cpu_budget, config.memory_budget_gb)
+        )
+        self.qc_results: dict[str, dict] = dict(input_qc or {})
+        self.abundance_gate = AbundanceGate(config.blast_min_reads, config.blast_min_ratio)
+        self.preview = preview
+        self.preview_counts: dict[str, tuple[int, int]] = {}
+        self.sweep_setting: SweepSetting | None = None
+        self.sweep_stats: dict[str, dict] = {}
+        self.stage_cache = (
+            StageCache(Path(config.stage_cache_dir), int(config.stage_cache_max_gb * 1024**3))
+            if config.use_stage_cache
+            else None
+        )
+
+    @property
+    def db_name(self) -> str:
+        """取得實際資料庫名稱
+
+        Get the actual database name.
+
+        Returns:
+            str: 去除 "(Combined) " 前綴後的資料庫名稱 / Database name without the "(Combined) " prefix.
+        """
+        # 如果資料庫名稱以 "(Combined) " 開頭, 則去掉前綴以獲取實際資料庫名稱
+        if self.database_selector.startswith("(Combined) "):
+            return self.database_selector.replace("(Combined) ", "", 1)
+        return self.database_selector
+
+    @property
+    def use_fused_pipeline(self) -> bool:
+        """是否以串流方式執行步驟 1-5 (需同時使用內建修剪器與合併器)
+
+        Whether steps 1-5 run as a fused stream; requires the built-in trimmer and merger.
+
+        Returns:
+            bool: 是否使用串流流程 / Whether the fused pipeline is used.
+        """
+        return (
+            self.config.use_fused_pipeline
+            and self.config.use_native_primer_trimming
+            and self.config.use_native_merging
+        )
 
     def run_analysis(
         self, samples_dir: Path, input_files: Sequence[Path], sample_size: int
@@ -950,55 +1249,172 @@ class NGSProcessor:
             sample_size (int): 樣本數量 / Sample size.
         """
         logger.info("開始 NGS 分析")
+        samples_dir = self._prepare_inputs(samples_dir, input_files, sample_size)
+
+        if self.use_fused_pipeline:
+            logger.info(f"步驟 1-5/9: 串流處理 (修剪至去重複, 共 {sample_size} 個樣本)")
+            self.scheduler.run(
+                "fused_pipeline",
+                FUSED_PIPELINE_PROFILE,
+                self._run_fused_sample,
+                [
+                    (samples_dir, input_files[i].name, input_files[i + 1].name)
+                    for i in range(0, sample_size * 2, 2)
+                ],
+            )
+            gc.collect()
+        else:
+            self._run_staged_preprocessing(samples_dir, input_files, sample_size)
 
-        logger.info(f"步驟 1/9: 修剪 Primers (共 {sample_size} 個樣本)")
-        for i in range(0, sample_size * 2, 2):
-            self._trim_primers(samples_dir, input_files[i].name, input_files[i + 1].name)
-        gc.collect()
+        self._run_otu_and_blast()
+        logger.info("NGS 分析完成")
 
-        primer_trimming_files = natsort.natsorted(
-            [f for f in self.folders["A_primer_trimming"].iterdir() if f.is_file()]
-        )
+    def run_sweep(
+        self,
+        samples_dir: Path,
+        input_files: Sequence[Path],
+        sample_size: int,
+        settings: Sequence[SweepSetting],
+    ) -> None:
+        """執行品質與長度門檻的參數掃描
 
-        logger.info(f"步驟 2/9: 合併配對序列 (共 {sample_size} 個樣本)")
-        for i in range(0, sample_size * 2, 2):
-            self._merge_pairs(primer_trimming_files[i].name, primer_trimming_files[i + 1].name)
-        gc.collect()
+        Run a parameter sweep over the quality and length thresholds.
+
+        步驟 1-2 每個樣本只執行一次, 步驟 3-5 於單次讀取合併讀序時對所有設定分支,
+        步驟 6-9 則在 SWEEP/<設定> 資料夾中分別執行; 最後寫出 SWEEP/sweep_comparison.xlsx。
 
+        Steps 1-2 run once per sample, steps 3-5 branch for every setting in a single read of
+        the merged reads, and steps 6-9 run separately in SWEEP/<setting> folders. A
+        SWEEP/sweep_comparison.xlsx table is written at the end.
+
+        Args:
+            samples_dir (Path): 樣本資料夾路徑 / Samples directory path.
+            input_files (Sequence[Path]): 輸入檔案列表 / Input files list.
+            sample_size (int): 樣本數量 / Sample size.
+            settings (Sequence[SweepSetting]): 掃描設定 / Sweep settings.
+        """
+        logger.info(f"開始參數掃描 (共 {len(settings)} 組設定)")
+        samples_dir = self._prepare_inputs(samples_dir, input_files, sample_size)
+        self._run_trim_and_merge(samples_dir, input_files, sample_size)
+
+        sweep_dir = self.folders["B_merged"].parent / SWEEP_FOLDER
+        branches = {
+            setting: {
+                name: reset_folder(sweep_dir / setting.label / name)
+                for name in SWEEP_BRANCH_FOLDERS
+            }
+            for setting in settings
+        }
         merged_files = natsort.natsorted(list(self.folders["B_merged"].iterdir()))
 
-        logger.info(f"步驟 3/9: 品質控制 (共 {len(merged_files)} 個檔案)")
-        for merged_file in merged_files:
-            self._quality_control(merged_file.name)
+        logger.info(
+            f"步驟 3-5/9: 依設定分支 (共 {len(merged_files)} 個檔案, {len(settings)} 組設定)"
+        )
+        self.scheduler.run(
+            "sweep_branches",
+            SWEEP_BRANCH_PROFILE,
+            self._derive_sweep_branches,
+            [(merged_file.name, branches) for merged_file in merged_files],
+        )
         gc.collect()
 
-        qualified_files = natsort.natsorted(list(self.folders["C_quality"].iterdir()))
+        shared_folders = self.folders
+        rows: list[dict] = []
+        try:
+            for setting in settings:
+                logger.info(f"參數掃描設定: {setting.label}")
+                self.folders = {**shared_folders, **branches[setting]}
+                self.sweep_setting = setting
+                self._run_otu_and_blast()
+                rows += self._sweep_rows(setting, merged_files)
+        finally:
+            self.folders = shared_folders
+            self.sweep_setting = None
+
+        write_sweep_comparison(sweep_dir / "sweep_comparison.xlsx", rows)
+        logger.info("參數掃描完成")
+
+    def _prepare_inputs(
+        self, samples_dir: Path, input_files: Sequence[Path], sample_size: int
+    ) -> Path:
+        """預覽模式下抽樣讀序, 並執行輸入品質檢查
 
-        logger.info(f"步驟 4/9: 過濾長度 (共 {len(qualified_files)} 個檔案)")
-        for qualified_file in qualified_files:
-            self._filter_length(qualified_file.name)
-        gc.collect()
+        Sample reads in preview mode and run the input QC.
 
-        length_files = natsort.natsorted(list(self.folders["D_length"].iterdir()))
-        adjusted_sample_size = len(length_files)
+        Args:
+            samples_dir (Path): 樣本資料夾路徑 / Samples directory path.
+            input_files (Sequence[Path]): 輸入檔案列表 / Input files list.
+            sample_size (int): 樣本數量 / Sample size.
 
-        logger.info(f"步驟 5/9: 聚類序列 (共 {adjusted_sample_size} 個檔案)")
-        for length_file in length_files:
-            self._cluster(length_file.name)
-        gc.collect()
+        Returns:
+            Path: 後續步驟讀取的樣本資料夾 / Samples directory read by later stages.
+        """
+        if self.preview:
+            logger.info(
+                f"預覽模式: 每個樣本抽樣 {self.config.preview_read_pairs} 對讀序 "
+                f"(共 {sample_size} 個樣本)"
+            )
+            self.scheduler.run(
+                "preview_subsample",
+                PREVIEW_SUBSAMPLE_PROFILE,
+                self._subsample_pair,
+                [
+                    (samples_dir, input_files[i].name, input_files[i + 1].name)
+                    for i in range(0, sample_size * 2, 2)
+                ],
+            )
+            # 後續步驟改讀抽樣後的檔案 (檔名不變)
+            # Later stages read the sampled files, which keep their names
+            samples_dir = self.folders["0_samples"]
+            gc.collect()
+
+        if self.config.run_input_qc:
+            logger.info(f"步驟 0/9: 輸入品質檢查 (共 {sample_size} 個樣本)")
+            # 預檢已一併完成的樣本不再重新讀取 (其統計為完整輸入檔案而非抽樣結果)
+            # Samples already covered by the pre-flight check are not read again; their
+            # statistics describe the full input files rather than the sampled reads
+            pending = [
+                (samples_dir, input_files[i].name, input_files[i + 1].name)
+                for i in range(0, sample_size * 2, 2)
+                if input_files[i].name not in self.qc_results
+            ]
+            if pending:
+                self.scheduler.run("input_qc", INPUT_QC_PROFILE, self._scan_input_qc, pending)
+            self._write_qc_report()
+            gc.collect()
+
+        return samples_dir
+
+    def _run_otu_and_blast(self) -> None:
+        """執行步驟 6-9 並整理 BLAST 結果
 
+        Run steps 6-9 and sort the BLAST results.
+        """
+        merged_files = natsort.natsorted(list(self.folders["B_merged"].iterdir()))
         uniques_files = natsort.natsorted(list(self.folders["E_uniques"].iterdir()))
+        adjusted_sample_size = len(uniques_files)
 
         logger.info(f"步驟 6/9: 建立 OTU (共 {len(uniques_files)} 個檔案)")
-        for uniques_file in uniques_files:
-            self._create_otu(uniques_file.name)
+        self.scheduler.run(
+            "create_otu",
+            USEARCH_SINGLE_PROFILE,
+            self._create_otu,
+            [(uniques_file.name,) for uniques_file in uniques_files],
+        )
         gc.collect()
 
         otu_files = natsort.natsorted(list(self.folders["F_OTUs"].iterdir()))
 
         logger.info(f"步驟 7/9: 建立 OTU 表格 (共 {len(otu_files)} 個檔案)")
-        for merged_file, otu_file in zip(merged_files, otu_files, strict=False):
-            self._create_otu_table(merged_file.name, otu_file.name)
+        self.scheduler.run(
+            "create_otu_table",
+            USEARCH_THREADED_PROFILE,
+            self._create_otu_table,
+            [
+                (merged_file.name, otu_file.name)
+                for merged_file, otu_file in zip(merged_files, otu_files, strict=False)
+            ],
+        )
         gc.collect()
 
         otu_table_files = natsort.natsorted(list(self.folders["G_OTUtable"].iterdir()))
@@ -1011,25 +1427,397 @@ class NGSProcessor:
         otu_files = natsort.natsorted(list(self.folders["F_OTUs"].iterdir()))
 
         logger.info(f"步驟 9/9: 執行 BLAST (共 {len(otu_files)} 個檔案)")
-        for otu_file in otu_files:
-            self._run_blast(otu_file.name)
+        self.scheduler.run(
+            "blast",
+            BLASTN_PROFILE,
+            self._run_blast,
+            [(otu_file.name,) for otu_file in otu_files],
+        )
         gc.collect()
 
         logger.info("合併 BLAST 結果")
         self._combine_blast_results()
         gc.collect()
 
-        logger.info("NGS 分析完成")
+        self._write_run_metrics()
+
+    def _run_staged_preprocessing(
+        self, samples_dir: Path, input_files: Sequence[Path], sample_size: int
+    ) -> None:
+        """逐步執行步驟 1-5, 每個步驟寫出完整的中間檔
+
+        Run steps 1-5 one stage at a time, writing every intermediate file.
+
+        Args:
+            samples_dir (Path): 樣本資料夾路徑 / Samples directory path.
+            input_files (Sequence[Path]): 輸入檔案列表 / Input files list.
+            sample_size (int): 樣本數量 / Sample size.
+        """
+        self._run_trim_and_merge(samples_dir, input_files, sample_size)
+
+        merged_files = natsort.natsorted(list(self.folders["B_merged"].iterdir()))
+
+        logger.info(f"步驟 3/9: 品質控制 (共 {len(merged_files)} 個檔案)")
+        self.scheduler.run(
+            "quality_control",
+            USEARCH_SINGLE_PROFILE,
+            self._quality_control,
+            [(merged_file.name,) for merged_file in merged_files],
+        )
+        gc.collect()
 
-    def _trim_primers(self, samples_dir: Path, r1: str, r2: str) -> None:
+        qualified_files = natsort.natsorted(list(self.folders["C_quality"].iterdir()))
+
+        logger.info(f"步驟 4/9: 過濾長度 (共 {len(qualified_files)} 個檔案)")
+        self.scheduler.run(
+            "filter_length",
+            USEARCH_SINGLE_PROFILE,
+            self._filter_length,
+            [(qualified_file.name,) for qualified_file in qualified_files],
+        )
+        gc.collect()
+
+        length_files = natsort.natsorted(list(self.folders["D_length"].iterdir()))
+        adjusted_sample_size = len(length_files)
+
+        logger.info(f"步驟 5/9: 聚類序列 (共 {adjusted_sample_size} 個檔案)")
+        self.scheduler.run(
+            "cluster",
+            USEARCH_SINGLE_PROFILE,
+            self._cluster,
+            [(length_file.name,) for length_file in length_files],
+        )
+        gc.collect()
+
+    def _run_trim_and_merge(
+        self, samples_dir: Path, input_files: Sequence[Path], sample_size: int
+    ) -> None:
+        """逐步執行步驟 1-2 (修剪與合併)
+
+        Run steps 1-2, trimming and merging, one stage at a time.
+
+        Args:
+            samples_dir (Path): 樣本資料夾路徑 / Samples directory path.
+            input_files (Sequence[Path]): 輸入檔案列表 / Input files list.
+            sample_size (int): 樣本數量 / Sample size.
+        """
+        logger.info(f"步驟 1/9: 修剪 Primers (共 {sample_size} 個樣本)")
+        self.scheduler.run(
+            "primer_trimming",
+            NATIVE_TRIM_PROFILE if self.config.use_native_primer_trimming else CUTADAPT_PROFILE,
+            self._trim_primers,
+            [
+                (samples_dir, input_files[i].name, input_files[i + 1].name)
+                for i in range(0, sample_size * 2, 2)
+            ],
+        )
+        gc.collect()
+
+        primer_trimming_files = natsort.natsorted(
+            [f for f in self.folders["A_primer_trimming"].iterdir() if f.is_file()]
+        )
+
+        logger.info(f"步驟 2/9: 合併配對序列 (共 {sample_size} 個樣本)")
+        self.scheduler.run(
+            "merge_pairs",
+            NATIVE_MERGE_PROFILE if self.config.use_native_merging else USEARCH_THREADED_PROFILE,
+            self._merge_pairs,
+            [
+                (primer_trimming_files[i].name, primer_trimming_files[i + 1].name)
+                for i in range(0, sample_size * 2, 2)
+            ],
+        )
+        gc.collect()
+
+    def _run_fused_sample(self, samples_dir: Path, r1: str, r2: str, threads: int = 1) -> None:
+        """以串流方式執行單一樣本的步驟 1-5
+
+        Run steps 1-5 for one sample as a single streaming pass.
+
+        輸出檔名與逐步流程相同; 只寫出合併讀序與去重複結果, 開啟 fused_debug_dumps 時
+        另外寫出修剪、品質與長度步驟的中間檔。
+
+        Output names match the staged workflow. Only the merged reads and the uniques are
+        written, plus the trimming, quality and length intermediates when fused_debug_dumps
+        is enabled.
+
+        Args:
+            samples_dir (Path): 樣本資料夾路徑 / Samples directory path.
+            r1 (str): R1 檔案名稱 / R1 file name.
+            r2 (str): R2 檔案名稱 / R2 file name.
+            threads (int): 工具執行緒數 / Tool thread count.
+        """
+        logger.info(f"串流處理: {r1} / {r2}")
+        report_dir = self.folders["A_primer_trimming"] / "report"
+        report_dir.mkdir(parents=True, exist_ok=True)
+
+        trimmed_r1 = f"{r1}_TRIMMED_R1.fastq"
+        merged_name = f"{trimmed_r1}_merged.fastq"
+        quality_name = f"{merged_name}_QUAL.fastq"
+        length_name = f"{quality_name}_LENG.fasta"
+
+        debug = self.config.fused_debug_dumps
+        outputs = FusedOutputs(
+            merged_fastq=self.folders["B_merged"] / merged_name,
+            uniques_fasta=self.folders["E_uniques"] / f"{length_name}_UNIQ.fasta",
+            trim_report=report_dir / f"{Path(r1).stem}.cutadapt.json",
+            trimmed_r1=self.folders["A_primer_trimming"] / trimmed_r1 if debug else None,
+            trimmed_r2=self.folders["A_primer_trimming"] / f"{r2}_TRIMMED_R2.fastq"
+            if debug
+            else None,
+            quality_fastq=self.folders["C_quality"] / quality_name if debug else None,
+            length_fasta=self.folders["D_length"] / length_name if debug else None,
+        )
+        adapter1, adapter2 = LinkedAdapter.primer_pair(
+            self.config.forward_primer, self.config.reverse_primer
+        )
+        settings = FusedSettings(
+            adapter1=adapter1,
+            adapter2=adapter2,
+            quality_threshold=self.config.quality_threshold,
+            length_threshold=self.config.length_threshold,
+            merge=MergeSettings(allow_stagger=self.config.merge_allow_stagger),
+        )
+        cached = self._run_cached(
+            "fused_pipeline",
+            [samples_dir / r1, samples_dir / r2],
+            {"settings": repr(settings)},
+            source_fingerprint(*FUSED_PIPELINE_MODULES),
+            {
+                "merged_fastq": outputs.merged_fastq,
+                "uniques_fasta": outputs.uniques_fasta,
+                "trim_report": outputs.trim_report,
+                **outputs.debug_paths,
+            },
+            partial(
+                run_fused_sample,
+                samples_dir / r1,
+                samples_dir / r2,
+                settings,
+                outputs,
+                cores=threads,
+            ),
+        )
+        if cached:
+            # 快取的報告記錄的是最初產生它的專案路徑
+            # A cached report records the paths of the project that first produced it
+            relocate_cutadapt_report(
+                outputs.trim_report,
+                samples_dir / r1,
+                samples_dir / r2,
+                *outputs.report_outputs(samples_dir / r1, samples_dir / r2),
+            )
+        logger.info(f"完成串流處理: {r1} / {r2}")
+
+    def _scan_input_qc(self, samples_dir: Path, r1: str, r2: str, threads: int = 1) -> None:
+        """掃描單一樣本的輸入 FASTQ 品質
+
+        Scan the input FASTQ quality of one sample.
+
+        Args:
+            samples_dir (Path): 樣本資料夾路徑 / Samples directory path.
+            r1 (str): R1 檔案名稱 / R1 file name.
+            r2 (str): R2 檔案名稱 / R2 file name.
+            threads (int): 同時掃描的檔案數 / Files scanned concurrently.
+        """
+        self.qc_results[r1] = scan_fastq_pair(samples_dir / r1, samples_dir / r2, workers=threads)
+
+    def _subsample_pair(self, samples_dir: Path, r1: str, r2: str, threads: int = 1) -> None:
+        """以蓄水池抽樣取出單一樣本的部分讀序 (預覽模式)
+
+        Reservoir-sample part of the reads of one sample for preview mode.
+
+        Args:
+            samples_dir (Path): 樣本資料夾路徑 / Samples directory path.
+            r1 (str): R1 檔案名稱 / R1 file name.
+            r2 (str): R2 檔案名稱 / R2 file name.
+            threads (int): 未使用, 抽樣為單執行緒 / Unused; sampling is single-threaded.
+        """
+        output_dir = self.folders["0_samples"]
+        self.preview_counts[r1] = reservoir_sample_pairs(
+            samples_dir / r1,
+            samples_dir / r2,
+            output_dir / r1,
+            output_dir / r2,
+            self.config.preview_read_pairs,
+            self.config.preview_seed,
+        )
+
+    def _derive_sweep_branches(
+        self,
+        merged_file: str,
+        branches: dict[SweepSetting, dict[str, Path]],
+        threads: int = 1,
+    ) -> None:
+        """由單一樣本的合併讀序計算所有掃描設定的步驟 3-5
+
+        Derive steps 3-5 of every sweep setting from the merged reads of one sample.
+
+        Args:
+            merged_file (str): 合併讀序檔案名稱 / Merged reads file name.
+            branches (dict[SweepSetting, dict[str, Path]]): 各設定的資料夾 / Folders per setting.
+            threads (int): 子程序數 / Number of worker processes.
+        """
+        uniques_name = f"{merged_file}_QUAL.fastq_LENG.fasta_UNIQ.fasta"
+        outputs = {
+            setting: folders["E_uniques"] / uniques_name for setting, folders in branches.items()
+        }
+        self.sweep_stats[merged_file] = derive_sweep_uniques(
+            self.folders["B_merged"] / merged_file, outputs, cores=threads
+        )
+
+    def _sweep_rows(self, setting: SweepSetting, merged_files: Sequence[Path]) -> list[dict]:
+        """整理單一掃描設定下各樣本的比較表列
+
+        Collect the comparison table rows of every sample under one sweep setting.
+
+        Args:
+            setting (SweepSetting): 掃描設定 / Sweep setting.
+            merged_files (Sequence[Path]): 合併讀序檔案 / Merged reads files.
+
+        Returns:
+            list[dict]: 每個樣本一列 / One row per sample.
+        """
+        rows = []
+        for merged_file in merged_files:
+            stats = self.sweep_stats[merged_file.name][setting]
+            # 與 _process_single_blast_result 相同的樣本名稱
+            # Same sample name as _process_single_blast_result
+            sample_name = merged_file.name.split(".")[0]
+            zotu_fasta = (
+                self.folders["F_OTUs"]
+                / f"{merged_file.name}_QUAL.fastq_LENG.fasta_UNIQ.fasta_ZOTU.fasta"
+            )
+            zotus = sum(1 for _ in iter_fasta(zotu_fasta)) if zotu_fasta.exists() else 0
+            marker = PREVIEW_MARKER if self.preview else ""
+            assigned_reads, species = summarize_sorted_blasts(
+                self.folders["I_sorted_blasts"] / f"{sample_name}{marker}.xlsx"
+            )
+            rows.append(
+                {
+                    "Setting": setting.label,
+                    "Quality_threshold": setting.quality_threshold,
+                    "Length_threshold": setting.length_threshold,
+                    "Sample": sample_name,
+                    "Merged_reads": stats.merged_reads,
+                    "Quality_passed": stats.quality_passed,
+                    "Length_passed": stats.length_passed,
+                    "Uniques": stats.uniques,
+                    "ZOTUs": zotus,
+                    "Assigned_reads": assigned_reads,
+                    "Species": species,
+                }
+            )
+        return rows
+
+    def _write_qc_report(self) -> None:
+        """寫出輸入品質報告 (qc_report.json / qc_report.html)
+
+        Write the input QC report (qc_report.json / qc_report.html).
+        """
+        outputs_dir = self.folders["A_primer_trimming"].parent
+        samples = {name: self.qc_results[name] for name in natsort.natsorted(self.qc_results)}
+        write_qc_report(outputs_dir / "qc_report.json", outputs_dir / "qc_report.html", samples)
+
+    def _write_run_metrics(self) -> None:
+        """寫出執行紀錄 (含排程決策)
+
+        Write the run metrics, including the scheduling decisions.
+        """
+        metrics_path = self.folders["I_sorted_blasts"].parent / "run_metrics.json"
+        metrics: dict = {"scheduler": self.scheduler.to_dict()}
+        if self.stage_cache is not None:
+            metrics["stage_cache"] = self.stage_cache.to_dict()
+        if self.sweep_setting is not None:
+            metrics["sweep"] = {
+                "setting": self.sweep_setting.label,
+                "quality_threshold": self.sweep_setting.quality_threshold,
+                "length_threshold": self.sweep_setting.length_threshold,
+            }
+        if self.preview:
+            metrics["preview"] = {
+                "read_pairs": self.config.preview_read_pairs,
+                "seed": self.config.preview_seed,
+                "samples": {
+                    name: {"sampled": sampled, "total": total}
+                    for name, (sampled, total) in natsort.natsorted(self.preview_counts.items())
+                },
+            }
+        with open(metrics_path, "w", encoding="utf-8") as f:
+            json.dump(metrics, f, ensure_ascii=False, indent=2)
+        logger.info(f"已寫出執行紀錄: {metrics_path}")
+
+    def _run_cached(
+        self,
+        stage: str,
+        inputs: Sequence[Path],
+        params: Mapping[str, object],
+        tool: str,
+        outputs: Mapping[str, Path],
+        run: Callable[[], None],
+    ) -> bool:
+        """執行步驟, 相同輸入、參數與工具版本的結果由步驟快取取得
+
+        Run a stage, taking the result from the stage cache when the inputs, parameters and
+        tool version match an earlier run.
+
+        Args:
+            stage (str): 步驟名稱 / Stage name.
+            inputs (Sequence[Path]): 輸入檔案 / Input files.
+            params (Mapping[str, object]): 影響輸出的參數 / Parameters affecting the output.
+            tool (str): 工具版本 / Tool version.
+            outputs (Mapping[str, Path]): 輸出名稱 -> 檔案路徑 / Output name -> file path.
+            run (Callable[[], None]): 實際執行步驟的函式 / Function that runs the stage.
+
+        Returns:
+            bool: 是否取自快取 / Whether the outputs came from the cache.
+        """
+        if self.stage_cache is None:
+            run()
+            return False
+
+        key = self.stage_cache.key(stage, inputs, params, tool)
+        if self.stage_cache.fetch(stage, key, outputs):
+            logger.info(f"使用快取結果: {stage} ({next(iter(outputs.values())).name})")
+            return True
+        run()
+        self.stage_cache.store(stage, key, outputs)
+        return False
+
+    def _tool_version(self, executable: str) -> str:
+        """取得步驟快取使用的外部工具版本
+
+        Get the external tool version used by the stage cache.
+
+        Args:
+            executable (str): 外部工具執行檔 / External tool executable.
+
+        Returns:
+            str: 工具版本 / Tool version.
+        """
+        if self.stage_cache is None:
+            return executable
+        return self.stage_cache.tool_version(executable)
+
+    def _trim_primers(self, samples_dir: Path, r1: str, r2: str, threads: int = 1) -> None:
         """修剪 Primers
 
         Trim primers.
 
+        預設使用內建的連結式接頭修剪器: 兩端引子各自比對、任一端找到即算修剪, 兩條讀序皆修剪的
+        配對才保留, 比對位置的選擇與 cutadapt 相同, 並輸出相同格式的 JSON 報告; 停用時改為呼叫
+        cutadapt。
+
+        Uses the built-in linked-adapter trimmer by default. Each primer end is matched on its
+        own, a read counts as trimmed when either end is found, and a pair is kept only when
+        both reads were trimmed. Alignments are chosen as cutadapt chooses them and the JSON
+        report has the same format. Falls back to cutadapt when disabled.
+
         Args:
             samples_dir (Path): 樣本資料夾路徑 / Samples directory path.
             r1 (str): R1 檔案名稱 / R1 file name.
             r2 (str): R2 檔案名稱 / R2 file name.
+            threads (int): 工具執行緒數 / Tool thread count.
         """
         logger.info(f"修剪 Primers: {r1} / {r2}")
         forward = self.config.forward_primer
@@ -1043,58 +1831,126 @@ class NGSProcessor:
 
         filename_base = Path(r1).stem
         json_output = report_dir / f"{filename_base}.cutadapt.json"
-
-        trimming_cmd = [
-            self.cutadapt_path,
-            "-a",
-            f"{forward}...{reverse}",
-            "-A",
-            f"{rev_comp_reverse}...{rev_comp_forward}",
-            "--discard-untrimmed",
-            "--json",
-            str(json_output),
-            "-o",
-            str(primer_trimming_dir / f"{r1}_TRIMMED_R1.fastq"),
-            "-p",
-            str(primer_trimming_dir / f"{r2}_TRIMMED_R2.fastq"),
-            str(samples_dir / r1),
-            str(samples_dir / r2),
-        ]
-        run_command(trimming_cmd)
+        out1 = primer_trimming_dir / f"{r1}_TRIMMED_R1.fastq"
+        out2 = primer_trimming_dir / f"{r2}_TRIMMED_R2.fastq"
+
+        if self.config.use_native_primer_trimming:
+            adapter1, adapter2 = LinkedAdapter.primer_pair(forward, reverse)
+            run = partial(
+                trim_primers_paired,
+                samples_dir / r1,
+                samples_dir / r2,
+                out1,
+                out2,
+                adapter1,
+                adapter2,
+                json_output,
+                cores=threads,
+            )
+            tool = source_fingerprint(*NATIVE_TRIM_MODULES)
+        else:
+            trimming_cmd = [
+                self.cutadapt_path,
+                "-a",
+                f"{forward}...{reverse}",
+                "-A",
+                f"{rev_comp_reverse}...{rev_comp_forward}",
+                "--discard-untrimmed",
+                "-j",
+                str(threads),
+                "--json",
+                str(json_output),
+                "-o",
+                str(out1),
+                "-p",
+                str(out2),
+                str(samples_dir / r1),
+                str(samples_dir / r2),
+            ]
+            run = partial(run_command, trimming_cmd)
+            tool = self._tool_version(self.cutadapt_path)
+
+        cached = self._run_cached(
+            "primer_trimming",
+            [samples_dir / r1, samples_dir / r2],
+            {"forward_primer": forward, "reverse_primer": reverse},
+            tool,
+            {"trimmed_r1": out1, "trimmed_r2": out2, "report": json_output},
+            run,
+        )
+        if cached:
+            # 快取的報告記錄的是最初產生它的專案路徑
+            # A cached report records the paths of the project that first produced it
+            relocate_cutadapt_report(json_output, samples_dir / r1, samples_dir / r2, out1, out2)
         logger.info(f"完成修剪 Primers: {r1} / {r2}")
 
-    def _merge_pairs(self, r1: str, r2: str) -> None:
+    def _merge_pairs(self, r1: str, r2: str, threads: int = 1) -> None:
         """合併配對序列
 
         Merge paired sequences.
 
+        預設使用內建的合併器, 停用時改為呼叫 usearch。兩者皆丟棄 staggered 配對, 除非開啟
+        merge_allow_stagger。
+
+        Uses the built-in merger by default and falls back to usearch when disabled. Both
+        discard staggered pairs unless merge_allow_stagger is set.
+
         Args:
             r1 (str): R1 檔案名稱 / R1 file name.
             r2 (str): R2 檔案名稱 / R2 file name.
+            threads (int): 工具執行緒數 / Tool thread count.
         """
         logger.info(f"合併配對序列: {r1} / {r2}")
         primer_trimming_dir = self.folders["A_primer_trimming"]
         merged_dir = self.folders["B_merged"]
-
-        merging_cmd = [
-            self.usearch_path,
-            "-fastq_mergepairs",
-            str(primer_trimming_dir / r1),
-            "-reverse",
-            str(primer_trimming_dir / r2),
-            "-fastqout",
-            str(merged_dir / f"{r1}_merged.fastq"),
-        ]
-        run_command(merging_cmd)
+        merged_fastq = merged_dir / f"{r1}_merged.fastq"
+
+        allow_stagger = self.config.merge_allow_stagger
+        if self.config.use_native_merging:
+            run = partial(
+                merge_pairs,
+                primer_trimming_dir / r1,
+                primer_trimming_dir / r2,
+                merged_fastq,
+                MergeSettings(allow_stagger=allow_stagger),
+                cores=threads,
+            )
+            tool = source_fingerprint(*NATIVE_MERGE_MODULES)
+        else:
+            merging_cmd = [
+                self.usearch_path,
+                "-fastq_mergepairs",
+                str(primer_trimming_dir / r1),
+                "-reverse",
+                str(primer_trimming_dir / r2),
+                "-fastqout",
+                str(merged_fastq),
+                "-threads",
+                str(threads),
+            ]
+            if allow_stagger:
+                merging_cmd.append("-fastq_allowmergestagger")
+            run = partial(run_command, merging_cmd)
+            tool = self._tool_version(self.usearch_path)
+
+        self._run_cached(
+            "merge_pairs",
+            [primer_trimming_dir / r1, primer_trimming_dir / r2],
+            {"allow_stagger": allow_stagger},
+            tool,
+            {"merged_fastq": merged_fastq},
+            run,
+        )
         logger.info(f"完成合併配對序列: {r1}")
 
-    def _quality_control(self, file: str) -> None:
+    def _quality_control(self, file: str, threads: int = 1) -> None:
         """品質控制
 
         Quality control.
 
         Args:
             file (str): 檔案名稱 / File name.
+            threads (int): 工具執行緒數 / Tool thread count.
         """
         logger.info(f"品質控制: {file}")
         merged_dir = self.folders["B_merged"]
@@ -1110,16 +1966,24 @@ class NGSProcessor:
             "-fastqout",
             str(quality_dir / f"{file}_QUAL.fastq"),
         ]
-        run_command(qualifying_cmd)
+        self._run_cached(
+            "quality_control",
+            [merged_dir / file],
+            {"quality_threshold": quality_threshold},
+            self._tool_version(self.usearch_path),
+            {"quality_fastq": quality_dir / f"{file}_QUAL.fastq"},
+            partial(run_command, qualifying_cmd),
+        )
         logger.info(f"完成品質控制: {file}")
 
-    def _filter_length(self, file: str) -> None:
+    def _filter_length(self, file: str, threads: int = 1) -> None:
         """過濾長度
 
         Filter length.
 
         Args:
             file (str): 檔案名稱 / File name.
+            threads (int): 工具執行緒數 / Tool thread count.
         """
         logger.info(f"過濾長度: {file}")
         quality_dir = self.folders["C_quality"]
@@ -1135,16 +1999,24 @@ class NGSProcessor:
             "-fastaout",
             str(length_dir / f"{file}_LENG.fasta"),
         ]
-        run_command(length_filtering_cmd)
+        self._run_cached(
+            "filter_length",
+            [quality_dir / file],
+            {"length_threshold": length_threshold},
+            self._tool_version(self.usearch_path),
+            {"length_fasta": length_dir / f"{file}_LENG.fasta"},
+            partial(run_command, length_filtering_cmd),
+        )
         logger.info(f"完成過濾長度: {file}")
 
-    def _cluster(self, file: str) -> None:
+    def _cluster(self, file: str, threads: int = 1) -> None:
         """聚類序列
 
         Cluster sequences.
 
         Args:
             file (str): 檔案名稱 / File name.
+            threads (int): 工具執行緒數 / Tool thread count.
         """
         logger.info(f"聚類序列: {file}")
         length_dir = self.folders["D_length"]
@@ -1160,16 +2032,24 @@ class NGSProcessor:
             "-relabel",
             "Uniq",
         ]
-        run_command(clustering_cmd)
+        self._run_cached(
+            "cluster",
+            [length_dir / file],
+            {},
+            self._tool_version(self.usearch_path),
+            {"uniques_fasta": uniques_dir / f"{file}_UNIQ.fasta"},
+            partial(run_command, clustering_cmd),
+        )
         logger.info(f"完成聚類序列: {file}")
 
-    def _create_otu(self, file: str) -> None:
+    def _create_otu(self, file: str, threads: int = 1) -> None:
         """建立 OTU
 
         Create OTU.
 
         Args:
             file (str): 檔案名稱 / File name.
+            threads (int): 工具執行緒數 / Tool thread count.
         """
         logger.info(f"建立 OTU: {file}")
         uniques_dir = self.folders["E_uniques"]
@@ -1182,10 +2062,17 @@ class NGSProcessor:
             "-zotus",
             str(otu_dir / f"{file}_ZOTU.fasta"),
         ]
-        run_command(otu_making_cmd)
+        self._run_cached(
+            "create_otu",
+            [uniques_dir / file],
+            {},
+            self._tool_version(self.usearch_path),
+            {"zotus": otu_dir / f"{file}_ZOTU.fasta"},
+            partial(run_command, otu_making_cmd),
+        )
         logger.info(f"完成建立 OTU: {file}")
 
-    def _create_otu_table(self, merged_file: str, otu_file: str) -> None:
+    def _create_otu_table(self, merged_file: str, otu_file: str, threads: int = 1) -> None:
         """建立 OTU 表格
 
         Create OTU table.
@@ -1193,6 +2080,7 @@ class NGSProcessor:
         Args:
             merged_file (str): 合併檔案名稱 / Merged file name.
             otu_file (str): OTU 檔案名稱 / OTU file name.
+            threads (int): 工具執行緒數 / Tool thread count.
         """
         logger.info(f"建立 OTU 表格: {otu_file}")
         merged_dir = self.folders["B_merged"]
@@ -1209,8 +2097,20 @@ class NGSProcessor:
             str(otu_table_dir / f"{otu_file}_table.txt"),
             "-mapout",
             str(otu_table_dir / f"{otu_file}_map.txt"),
+            "-threads",
+            str(threads),
         ]
-        run_command(otu_tab_making_cmd)
+        self._run_cached(
+            "create_otu_table",
+            [merged_dir / merged_file, otu_dir / otu_file],
+            {},
+            self._tool_version(self.usearch_path),
+            {
+                "otu_table": otu_table_dir / f"{otu_file}_table.txt",
+                "map": otu_table_dir / f"{otu_file}_map.txt",
+            },
+            partial(run_command, otu_tab_making_cmd),
+        )
         logger.info(f"完成建立 OTU 表格: {otu_file}")
 
     def _rename_otu_table(self, file: str) -> None:
@@ -1228,39 +2128,107 @@ class NGSProcessor:
         old_file.rename(new_name)
         logger.info(f"完成重新命名 OTU 表格: {file} -> {new_name.name}")
 
-    def _run_blast(self, file: str) -> None:
+    def _run_blast(self, file: str, threads: int = 1) -> None:
         """執行 BLAST
 
         Run BLAST.
 
+        設定豐度門檻時, 讀序數或比例不足的 ZOTU 不送入 BLAST。
+
+        With an abundance gate configured, ZOTUs below the read count or ratio threshold
+        are not queried.
+
+        若資料庫旁有完全比對索引, 與至少 BLAST_MAX_TARGET_SEQS 條參考序列完全相同或為其
+        子序列的 ZOTU 直接由索引產生結果 (與 blastn 的輸出相同)。
+
+        When an exact-match index exists next to the database, ZOTUs identical to or
+        contained in at least BLAST_MAX_TARGET_SEQS references are resolved by the index
+        without blastn, giving the same output blastn would.
+
+        其餘查詢依鹼基數切塊, 以多個 blastn 程序平行執行後依原始順序合併。
+
+        The remaining queries are split into residue-balanced chunks, run as concurrent
+        blastn processes and merged back in query order.
+
         Args:
             file (str): 檔案名稱 / File name.
+            threads (int): 工具執行緒數 / Tool thread count.
         """
         logger.info(f"執行 BLAST: {file}")
         otu_dir = self.folders["F_OTUs"]
         blast_dir = self.folders["H_blasts"]
-        db_display_name = self.database_selector
-        # 如果資料庫名稱以 "(Combined) " 開頭, 則去掉前綴以獲取實際資料庫名稱
-        if db_display_name.startswith("(Combined) "):
-            db_name = db_display_name.replace("(Combined) ", "", 1)
-        else:
-            db_name = db_display_name
+        query_fasta = otu_dir / file
+        output_txt = blast_dir / f"{file}_blasted.txt"
+
+        gated_fasta = None
+        skipped = self._low_abundance_otus(file)
+        if skipped:
+            gated_fasta = blast_dir / f"{file}_gated.fasta"
+            kept = write_gated_queries(query_fasta, gated_fasta, set(skipped))
+            logger.info(f"豐度門檻略過 {len(skipped)} 個 ZOTU, 保留 {kept} 個: {file}")
+            query_fasta = gated_fasta
+            if kept == 0:
+                output_txt.write_text("", encoding="utf-8")
+                gated_fasta.unlink()
+                logger.info(f"完成執行 BLAST: {file} (無需查詢)")
+                return
+
+        try:
+            blast_with_exact_index(
+                partial(run_blast_chunked, self._blastn, workers=threads),
+                query_fasta,
+                output_txt,
+                BLAST_OUTFMT_FIELDS,
+                BLAST_MAX_TARGET_SEQS,
+                self.exact_index,
+            )
+        finally:
+            if gated_fasta is not None:
+                gated_fasta.unlink(missing_ok=True)
+        logger.info(f"完成執行 BLAST: {file}")
+
+    def _low_abundance_otus(self, otu_file: str) -> dict[str, int]:
+        """找出 OTU 表格中低於豐度門檻的 ZOTU
+
+        Find the ZOTUs of an OTU table that fall below the abundance gate.
+
+        Args:
+            otu_file (str): OTU 檔案名稱 / OTU file name.
+
+        Returns:
+            dict[str, int]: 低豐度 ZOTU 與其讀序數 / Low-abundance ZOTUs and their read counts.
+        """
+        if not self.abundance_gate.enabled:
+            return {}
+        table_path = self.folders["G_OTUtable"] / f"{otu_file}_table.txt"
+        if not table_path.exists():
+            logger.warning(f"找不到 OTU 表格, 不套用豐度門檻: {table_path.name}")
+            return {}
+        return self.abundance_gate.skipped(read_otu_counts(table_path))
+
+    def _blastn(self, query_fasta: Path, output_txt: Path) -> None:
+        """執行 blastn
 
+        Run blastn.
+
+        Args:
+            query_fasta (Path): 查詢 FASTA 檔案路徑 / Query FASTA file path.
+            output_txt (Path): 輸出文字檔案路徑 / Output text file path.
+        """
         blast_cmd = [
             self.blastn_path,
             "-query",
-            str(otu_dir / file),
+            str(query_fasta),
             "-out",
-            str(blast_dir / f"{file}_blasted.txt"),
+            str(output_txt),
             "-db",
-            db_name,
+            self.db_name,
             "-outfmt",
-            "6 qseqid pident qcovs sscinames sacc",
+            " ".join(["6", *BLAST_OUTFMT_FIELDS]),
             "-max_target_seqs",
-            "3",
+            str(BLAST_MAX_TARGET_SEQS),
         ]
         run_command(blast_cmd, cwd=self.database_path)
-        logger.info(f"完成執行 BLAST: {file}")
 
     def _combine_blast_results(self) -> None:
         """合併 BLAST 結果
@@ -1312,86 +2280,12 @@ class NGSProcessor:
             sorted_blasts_dir (Path): 排序後 BLAST 結果目錄 / Sorted BLAST results directory.
         """
         try:
-            original_data = pd.read_csv(
-                blast_file,
-                engine="python",
-                header=None,
-                sep="\t",
-                encoding="utf-8",
-                names=["OTU", "Identity", "Coverage", "Scientific_name", "Accession_number"],
-            )
-
-            reads_data = pd.read_csv(
-                otu_table_file,
-                engine="python",
-                header=None,
-                sep="\t",
-                encoding="utf-8",
-                names=["OTU", "Reads"],
-                skiprows=1,
-            )
-            total_reads = reads_data.Reads.sum()
-
-            grouped_otu = original_data[original_data.Identity >= 97].reset_index(drop=True)
-            drop_filtered = original_data[original_data.Identity < 97].copy()
-            drop_filtered["Stat"] = "*FILTERED*"
-            drop_filtered = drop_filtered.drop_duplicates(
-                subset=["OTU", "Scientific_name"], keep="first"
-            )
-
-            grouped_otu["Stat"] = np.where(grouped_otu["OTU"].duplicated(), "*DUPE*", "")
-            drop_dupe = grouped_otu[grouped_otu.Stat == "*DUPE*"]
-            drop_dupe = drop_dupe.drop_duplicates(subset=["OTU", "Scientific_name"], keep="first")
-            clean_data = grouped_otu.drop_duplicates(subset=["OTU"], keep="first")
-
-            csv_data = pd.merge(clean_data, reads_data, on="OTU")
-            ratio = csv_data.Reads / float(total_reads)
-            csv_data.insert(7, column="Ratio", value=ratio)
-
-            main_data = pd.concat([csv_data, drop_dupe], axis=0, ignore_index=True)
-            main_data = main_data.sort_values(["OTU", "Stat"], ignore_index=True)
-
-            with warnings.catch_warnings():
-                warnings.filterwarnings("ignore", category=FutureWarning)
-                main_data = (
-                    main_data.groupby("OTU")
-                    .apply(lambda x: x.drop_duplicates(subset=["Scientific_name"], keep="first"))
-                    .reset_index(drop=True)
-                )
-
-            otus_with_valid_data = set(main_data["OTU"].unique())
-            all_filtered_otus = set(drop_filtered["OTU"].unique()) - otus_with_valid_data
-
-            filtered_with_reads = drop_filtered[drop_filtered["OTU"].isin(all_filtered_otus)].copy()
-            filtered_with_reads = filtered_with_reads.drop_duplicates(subset=["OTU"], keep="first")
-            filtered_with_reads = pd.merge(filtered_with_reads, reads_data, on="OTU")
-            ratio_filtered = filtered_with_reads.Reads / float(total_reads)
-            filtered_with_reads["Ratio"] = ratio_filtered
-
-            filtered_without_reads = drop_filtered[
-                ~drop_filtered["OTU"].isin(all_filtered_otus)
-            ].copy()
-            filtered_without_reads["Reads"] = np.nan
-            filtered_without_reads["Ratio"] = np.nan
-
-            all_filtered = pd.concat(
-                [filtered_with_reads, filtered_without_reads], axis=0, ignore_index=True
-            )
-
-            final_csv = pd.concat([main_data, all_filtered], axis=0, ignore_index=True)
-            final_csv = final_csv[
-                [
-                    "OTU",
-                    "Identity",
-                    "Coverage",
-                    "Scientific_name",
-                    "Stat",
-                    "Reads",
-                    "Ratio",
-                    "Accession_number",
-                ]
-            ]
-            final_csv = final_csv.sort_values("OTU", key=natsort.natsort_keygen())
+            # 分批彙整 BLAST 命中; 未執行 BLAST 的低豐度 ZOTU 仍列出讀序數與比例
+            # Summarize BLAST hits in chunks; low-abundance ZOTUs that were not BLASTed are
+            # still listed with reads and ratio
+            counts = read_otu_counts(otu_table_file)
+            skipped = self.abundance_gate.skipped(counts)
+            final_csv = summarize_blast_hits(blast_file, BLAST_OUTFMT_FIELDS, counts, skipped)
 
             final_csv["Scientific_name"] = final_csv["Scientific_name"].astype(str)
             if "Scientific_name" in df_ref.columns:
@@ -1404,6 +2298,8 @@ class NGSProcessor:
 
             # 使用 "." 分割檔案名稱, 取 [0] 作為樣本名稱
             sample_name = otu_table_file.stem.split(".")[0]
+            if self.preview:
+                sample_name += PREVIEW_MARKER
             excel_path1 = sorted_blasts_dir / f"{sample_name}.xlsx"
             excel_path2 = sorted_blasts_dir / f"{sample_name}_zh_added.xlsx"
 
@@ -1413,25 +2309,6 @@ class NGSProcessor:
             with pd.ExcelWriter(excel_path2, engine="openpyxl") as writer:
                 final_zh_csv_styled.to_excel(writer, index=False, sheet_name="Sheet1")
 
-            del (
-                original_data,
-                reads_data,
-                grouped_otu,
-                drop_filtered,
-                drop_dupe,
-                clean_data,
-                csv_data,
-                main_data,
-                filtered_with_reads,
-                filtered_without_reads,
-                all_filtered,
-                final_csv,
-                final_zh_csv,
-                final_csv_styled,
-                final_zh_csv_styled,
-            )
-            gc.collect()
-
             logger.info(f"已處理 BLAST 結果: {blast_file.name}")
 
         except Exception as e:
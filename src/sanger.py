@@ -5,7 +5,11 @@ Sanger sequencing analysis module.
 
 from collections.abc import Sequence
 from datetime import datetime
+from functools import partial
+import json
 from pathlib import Path
+import threading
+import time
 import tkinter as tk
 from tkinter import filedialog
 
@@ -14,6 +18,11 @@ import customtkinter
 import pandas as pd
 from PIL import Image
 
+from src.utils.blast_table_utils import read_blast_table
+from src.utils.blast_utils import default_blast_workers, run_blast_chunked
+from src.utils.excel_utils import load_reference_table
+from src.utils.fastx_utils import fastq_to_fasta
+from src.utils.hash_utils import file_digest
 from src.utils.logger_utils import get_logger
 from src.utils.path_utils import (
     find_latest_ref_file,
@@ -23,11 +32,22 @@ from src.utils.path_utils import (
     get_project_root,
     get_trimmomatic_path,
 )
+from src.utils.ref_index_utils import blast_with_exact_index, load_exact_index
 from src.utils.subprocess_utils import run_command
+from src.utils.trim_utils import trim_fastq
 from src.utils.ui_config import COLORS, FONTS, LAYOUT
 
 logger = get_logger(__name__)
 
+BLAST_OUTFMT_FIELDS = ("qseqid", "pident", "qcovs", "sscinames", "sacc", "qlen")
+BLAST_COLUMNS = ("No", "Identity", "Coverage", "Scientific_name", "Accession_number", "bp")
+BLAST_MAX_TARGET_SEQS = 1
+
+# 監看模式的輪詢間隔 (毫秒) 與檔案穩定時間 (秒, 避免處理仍在複製中的檔案)
+# Watch-mode polling interval (ms) and settle time (s, skips files still being copied)
+WATCH_INTERVAL_MS = 5000
+WATCH_SETTLE_SECONDS = 2.0
+
 
 def load_app_image() -> customtkinter.CTkImage:
     """載入應用程式圖示
@@ -58,7 +78,7 @@ class Sanger(customtkinter.CTkToplevel):
         """
         super().__init__(*args, **kwargs)
         self.title("Sanger Analysis")
-        self.geometry("500x400")
+        self.geometry("500x430")
         self.configure(fg_color=COLORS.PRIMARY_BG)
         self.resizable(False, False)
         self.grid_rowconfigure(0, weight=0)
@@ -144,6 +164,9 @@ class SangerContentFrame(customtkinter.CTkFrame):
 
         self.samples_path = tk.StringVar()
         self.outputs_path = tk.StringVar()
+        self.watcher: SangerWatcher | None = None
+        self._watch_job: str | None = None
+        self._watch_thread: threading.Thread | None = None
 
         self._setup_ui()
 
@@ -278,6 +301,22 @@ class SangerContentFrame(customtkinter.CTkFrame):
         )
         self.analyse_button.grid(row=7, column=0, columnspan=2, padx=0, sticky="ew")
 
+        self.watch_button = customtkinter.CTkButton(
+            self,
+            width=80,
+            height=LAYOUT.BUTTON_HEIGHT,
+            border_width=0,
+            corner_radius=LAYOUT.CORNER_RADIUS,
+            text="WATCH",
+            fg_color=COLORS.SECONDARY_BG,
+            text_color=COLORS.TEXT_PRIMARY,
+            hover_color=COLORS.HOVER_BG,
+            font=(FONTS.FAMILY, FONTS.SIZE_NORMAL, FONTS.STYLE_BOLD),
+            command=self.toggle_watch,
+            state="disabled",
+        )
+        self.watch_button.grid(row=8, column=0, columnspan=2, padx=0, pady=(5, 0), sticky="ew")
+
         self._setup_field_validation()
 
     def _setup_field_validation(self) -> None:
@@ -304,8 +343,11 @@ class SangerContentFrame(customtkinter.CTkFrame):
 
         if all_filled:
             self.analyse_button.configure(state="normal")
+            self.watch_button.configure(state="normal")
         else:
             self.analyse_button.configure(state="disabled")
+            if self.watcher is None:
+                self.watch_button.configure(state="disabled")
 
     def browse_samples(self) -> None:
         """瀏覽選擇樣本資料夾
@@ -370,6 +412,98 @@ class SangerContentFrame(customtkinter.CTkFrame):
 
         logger.info("分析完成")
 
+    def toggle_watch(self) -> None:
+        """開始或停止監看模式
+
+        Start or stop watch mode.
+        """
+        if self.watcher is not None:
+            if self._watch_job is not None:
+                self.after_cancel(self._watch_job)
+                self._watch_job = None
+            self.watcher = None
+            self.watch_button.configure(text="WATCH")
+            logger.info("已停止監看模式")
+            self._check_fields()
+            return
+
+        input_folder = Path(self.samples_path.get())
+        output_folder = Path(self.outputs_path.get())
+
+        if not input_folder.exists() or not output_folder.exists():
+            logger.error("輸入或輸出資料夾不存在")
+            return
+
+        primer = self._get_primer_file()
+        if not primer:
+            logger.error("未選擇資料庫")
+            return
+
+        self.watcher = SangerWatcher(
+            self, input_folder, output_folder, primer, self.database_combobox.get()
+        )
+        self.watch_button.configure(text="STOP WATCH")
+        logger.info(f"開始監看資料夾: {input_folder}")
+        self._watch_tick()
+
+    def _watch_tick(self) -> None:
+        """監看模式的單次輪詢: 在背景執行緒處理新檔案, 避免 GUI 停止回應
+
+        Run one watch-mode polling cycle. New files are processed in a worker thread so the
+        GUI stays responsive; the next poll is scheduled once the worker reports back.
+        """
+        self._watch_job = None
+        if self.watcher is None:
+            return
+
+        # 上一次 (可能屬於已停止的監看) 的處理尚未結束時稍後再試
+        # Retry later while a previous run, possibly of a stopped watch, is still busy
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            self._watch_job = self.after(WATCH_INTERVAL_MS, self._watch_tick)
+            return
+
+        self._watch_thread = threading.Thread(
+            target=self._watch_worker, args=(self.watcher,), name="sanger-watch", daemon=True
+        )
+        self._watch_thread.start()
+
+    def _watch_worker(self, watcher: "SangerWatcher") -> None:
+        """在背景執行緒處理待處理的檔案, 並以 after 將結果交回主執行緒
+
+        Process pending files in the worker thread and post the outcome back to the main
+        thread with after.
+
+        Args:
+            watcher (SangerWatcher): 監看處理器 / Watch processor.
+        """
+        try:
+            processed, error = watcher.process_pending(), None
+        except Exception as e:
+            processed, error = 0, e
+        self.after(0, self._watch_done, watcher, processed, error)
+
+    def _watch_done(
+        self, watcher: "SangerWatcher", processed: int, error: Exception | None
+    ) -> None:
+        """在主執行緒接收背景處理的結果並排定下一次輪詢
+
+        Receive the worker outcome on the main thread and schedule the next poll.
+
+        Args:
+            watcher (SangerWatcher): 完成處理的監看處理器 / Watch processor that finished.
+            processed (int): 處理的檔案數 / Number of processed files.
+            error (Exception | None): 處理失敗時的例外 / Exception when processing failed.
+        """
+        if error is not None:
+            logger.error(f"監看模式處理失敗: {error}")
+        elif processed:
+            logger.info(f"監看模式: 本次處理 {processed} 個檔案")
+
+        # 監看已停止或重新開始時不再排定舊處理器的輪詢
+        # Do not reschedule a watcher that was stopped or replaced meanwhile
+        if watcher is self.watcher and self._watch_job is None:
+            self._watch_job = self.after(WATCH_INTERVAL_MS, self._watch_tick)
+
     def _get_primer_file(self) -> str | None:
         """取得 Primer 檔案名稱
 
@@ -399,28 +533,57 @@ class SangerContentFrame(customtkinter.CTkFrame):
         """
         with output_fastq.open("w") as output_handle:
             for ab1_file in ab1_files:
-                records = SeqIO.parse(ab1_file, "abi")
-                filename = ab1_file.stem
-                for record in records:
-                    record.id = f"{filename} {record.id}"
-                    SeqIO.write(record, output_handle, "fastq")
+                output_handle.write(self._ab1_to_fastq(ab1_file))
+
+    def _ab1_to_fastq(self, ab1_file: Path) -> str:
+        """將單一 AB1 檔案轉為 FASTQ 文字 (讀序名稱前加上檔名)
+
+        Convert one AB1 file to FASTQ text, prefixing read names with the file name.
+
+        Args:
+            ab1_file (Path): AB1 檔案路徑 / AB1 file path.
+
+        Returns:
+            str: FASTQ 文字 / FASTQ text.
+        """
+        fastq = []
+        for record in SeqIO.parse(ab1_file, "abi"):
+            record.id = f"{ab1_file.stem} {record.id}"
+            fastq.append(record.format("fastq"))
+        return "".join(fastq)
 
     def _trim_sequences(
-        self, input_fastq: Path, output_fastq: Path, trimlog: Path, primer: str
+        self,
+        input_fastq: Path,
+        output_fastq: Path,
+        trimlog: Path,
+        primer: str,
+        use_trimmomatic: bool = False,
     ) -> None:
-        """使用 Trimmomatic 修剪序列
+        """修剪序列 (預設使用內建修剪器, 可選用 Trimmomatic)
+
+        Trim sequences with the built-in trimmer (Trimmomatic is optional).
 
-        Trim sequences using Trimmomatic.
+        內建修剪器與 ILLUMINACLIP:<primer>:3:30:10 LEADING:30 TRAILING:30 等效,
+        不需要安裝 Java。
+
+        The built-in trimmer is equivalent to ILLUMINACLIP:<primer>:3:30:10 LEADING:30
+        TRAILING:30 and does not require Java.
 
         Args:
             input_fastq (Path): 輸入 FASTQ 檔案路徑 / Input FASTQ file path.
             output_fastq (Path): 輸出 FASTQ 檔案路徑 / Output FASTQ file path.
             trimlog (Path): Trim log 檔案路徑 / Trim log file path.
             primer (str): Primer 檔案名稱 / Primer file name.
+            use_trimmomatic (bool): 是否改用 Trimmomatic jar / Whether to use the Trimmomatic jar.
         """
-        trimmomatic_path = get_trimmomatic_path()
         primer_path = get_primer_path(primer)
 
+        if not use_trimmomatic:
+            trim_fastq(input_fastq, output_fastq, trimlog, primer_path)
+            return
+
+        trimmomatic_path = get_trimmomatic_path()
         trimming_cmd = [
             "java",
             "-jar",
@@ -446,11 +609,11 @@ class SangerContentFrame(customtkinter.CTkFrame):
             input_fastq (Path): 輸入 FASTQ 檔案路徑 / Input FASTQ file path.
             output_fasta (Path): 輸出 FASTA 檔案路徑 / Output FASTA file path.
         """
-        with output_fasta.open("w") as output_handle:
-            for record in SeqIO.parse(input_fastq, "fastq"):
-                SeqIO.write(record, output_handle, "fasta")
+        fastq_to_fasta(input_fastq, output_fasta)
 
-    def _run_blast(self, query_fasta: Path, output_txt: Path) -> None:
+    def _run_blast(
+        self, query_fasta: Path, output_txt: Path, database_choice: str | None = None
+    ) -> None:
         """執行 BLASTN 比對
 
         Run BLASTN alignment.
@@ -458,9 +621,11 @@ class SangerContentFrame(customtkinter.CTkFrame):
         Args:
             query_fasta (Path): 查詢 FASTA 檔案路徑 / Query FASTA file path.
             output_txt (Path): 輸出文字檔案路徑 / Output text file path.
+            database_choice (str | None): 資料庫選項, None 表示讀取下拉選單 (僅限主執行緒) /
+                Database choice; None reads the option menu, which only the main thread may do.
         """
-        blastn_exe = get_blastn_path()
-        database_choice = self.database_combobox.get()
+        if database_choice is None:
+            database_choice = self.database_combobox.get()
         root_dir = get_project_root()
 
         match database_choice:
@@ -474,8 +639,33 @@ class SangerContentFrame(customtkinter.CTkFrame):
                 logger.error("未知的資料庫類型")
                 return
 
+        exact_index = load_exact_index(db_dir, db_name)
+        blast_with_exact_index(
+            partial(
+                run_blast_chunked,
+                partial(self._blastn, db_dir=db_dir, db_name=db_name),
+                workers=default_blast_workers(),
+            ),
+            query_fasta,
+            output_txt,
+            BLAST_OUTFMT_FIELDS,
+            BLAST_MAX_TARGET_SEQS,
+            exact_index,
+        )
+
+    def _blastn(self, query_fasta: Path, output_txt: Path, db_dir: Path, db_name: str) -> None:
+        """執行 blastn
+
+        Run blastn.
+
+        Args:
+            query_fasta (Path): 查詢 FASTA 檔案路徑 / Query FASTA file path.
+            output_txt (Path): 輸出文字檔案路徑 / Output text file path.
+            db_dir (Path): 資料庫目錄 / Database directory.
+            db_name (str): 資料庫名稱 / Database name.
+        """
         blast_cmd = [
-            str(blastn_exe),
+            str(get_blastn_path()),
             "-query",
             str(query_fasta),
             "-out",
@@ -483,9 +673,9 @@ class SangerContentFrame(customtkinter.CTkFrame):
             "-db",
             str(db_dir / db_name),
             "-outfmt",
-            "6 qseqid pident qcovs sscinames sacc qlen",
+            " ".join(["6", *BLAST_OUTFMT_FIELDS]),
             "-max_target_seqs",
-            "1",
+            str(BLAST_MAX_TARGET_SEQS),
         ]
         run_command(blast_cmd, cwd=db_dir)
 
@@ -496,53 +686,52 @@ class SangerContentFrame(customtkinter.CTkFrame):
 
         Process BLAST results and generate Excel files.
 
+        BLAST 結果只解析一次, 失敗樣本與中文名稱皆在記憶體中合併後直接寫出兩個檔案。
+
+        The BLAST output is parsed once; failed samples and Chinese names are joined in
+        memory and both workbooks are written directly.
+
         Args:
             blast_txt (Path): BLAST 結果文字檔案路徑 / BLAST result text file path.
             sample_files (Sequence[Path]): 樣本檔案列表 / List of sample files.
             output_name (Path): 輸出檔案名稱前綴 / Output file name prefix.
         """
-        lines = blast_txt.read_text().splitlines()
-        processed_lines = []
+        concat_result = self._parse_blast_results(blast_txt, sample_files)
 
-        for line in lines:
-            parts = line.split("\t")
-            parts[0] = parts[0].replace("_Primer-Added", "")
-            processed_lines.append("\t".join(parts))
+        result_file = Path(f"{output_name}.xlsx")
+        concat_result.to_excel(result_file, engine="openpyxl", index=False)
 
-        blast_txt.write_text("\n".join(processed_lines))
+        self._add_chinese_names(concat_result, result_file)
 
-        blast_set = set()
-        for line in processed_lines:
-            blast_set.add(line.split()[0])
+    def _parse_blast_results(self, blast_txt: Path, sample_files: Sequence[Path]) -> pd.DataFrame:
+        """解析 BLAST 結果並加入比對失敗的樣本
 
-        in_name_set = {sample_file.stem.split("_Primer-Added")[0] for sample_file in sample_files}
-        fail_lists = in_name_set.difference(blast_set)
-
-        dataset = pd.DataFrame(list(fail_lists), columns=["No"])
-        blastresult = pd.read_csv(
-            blast_txt,
-            header=None,
-            sep="\t",
-            names=["No", "Identity", "Coverage", "Scientific_name", "Accession_number", "bp"],
-        )
-        concat_result = pd.concat([dataset, blastresult], ignore_index=True)
+        Parse BLAST results and prepend samples without any hit.
 
-        result_file = Path(f"{output_name}_result.xlsx")
-        concat_result.to_excel(result_file, engine="openpyxl", index=False)
+        Args:
+            blast_txt (Path): BLAST 結果文字檔案路徑 / BLAST result text file path.
+            sample_files (Sequence[Path]): 樣本檔案列表 / List of sample files.
+
+        Returns:
+            pd.DataFrame: 合併後的結果 / Combined result table.
+        """
+        blastresult = read_blast_table(blast_txt, BLAST_OUTFMT_FIELDS, BLAST_COLUMNS)
+        blastresult["No"] = blastresult["No"].str.replace("_Primer-Added", "", regex=False)
 
-        parts = result_file.stem.split("_")
-        new_file_name = result_file.parent / f"{parts[0]}_{parts[1]}.xlsx"
-        result_file.rename(new_file_name)
+        in_name_set = {sample_file.stem.split("_Primer-Added")[0] for sample_file in sample_files}
+        fail_lists = sorted(in_name_set.difference(blastresult["No"]))
 
-        self._add_chinese_names(new_file_name)
+        dataset = pd.DataFrame(fail_lists, columns=["No"])
+        return pd.concat([dataset, blastresult], ignore_index=True)
 
-    def _add_chinese_names(self, input_file: Path) -> None:
+    def _add_chinese_names(self, result: pd.DataFrame, input_file: Path) -> None:
         """添加中文名稱到結果檔案
 
         Add Chinese names to result file.
 
         Args:
-            input_file (Path): 輸入 Excel 檔案路徑 / Input Excel file path.
+            result (pd.DataFrame): BLAST 結果 / BLAST result table.
+            input_file (Path): 結果 Excel 檔案路徑 / Result Excel file path.
         """
         ref_path = find_latest_ref_file()
         if not ref_path:
@@ -550,21 +739,229 @@ class SangerContentFrame(customtkinter.CTkFrame):
             return
 
         try:
-            df_ref = pd.read_excel(ref_path, engine="openpyxl")
-            df_ref.set_index("Scientific_name", inplace=True)
+            df_ref = load_reference_table(ref_path)
 
-            df_input = pd.read_excel(input_file, engine="openpyxl")
-            df_input.set_index("Scientific_name", inplace=True)
+            df_ref_merged = result.merge(df_ref, how="left", on="Scientific_name")
+            df_ref_merged = df_ref_merged.sort_values(by="No", kind="stable")
 
-            df_ref_merged = pd.merge(
-                df_input, df_ref, left_index=True, right_index=True, how="left"
-            )
-            df_ref_merged.insert(3, "Scientific_name", df_ref_merged.index)
-            df_ref_merged = df_ref_merged.sort_values(by="No")
-
-            output_file_path = Path(str(input_file).replace(".xlsx", "_zh.xlsx"))
+            output_file_path = input_file.with_name(f"{input_file.stem}_zh.xlsx")
             df_ref_merged.to_excel(output_file_path, engine="openpyxl", index=False)
 
             logger.info(f"已添加中文名稱: {output_file_path}")
         except Exception as e:
             logger.error(f"添加中文名稱失敗: {e}")
+
+
+class SangerWatcher:
+    """Sanger 監看資料夾增量處理器
+
+    Incremental processor for a watched Sanger samples folder.
+
+    以內容雜湊判斷新增或變更的 .ab1 檔案, 只將這些檔案送入修剪與 BLAST,
+    結果寫入該資料夾專屬的持續性結果表 (同一樣本重新處理時會取代舊結果)。
+
+    New or changed .ab1 files are detected by content hash and only those go through
+    trimming and BLAST. Results are kept in a persistent per-folder result table, where a
+    reprocessed trace replaces its previous rows.
+
+    process_pending 在背景執行緒執行, 因此不讀取任何 GUI 元件; 所需的設定在建立時取得。
+
+    process_pending runs in a worker thread, so it never touches GUI widgets; the settings it
+    needs are captured at construction.
+    """
+
+    def __init__(
+        self,
+        frame: SangerContentFrame,
+        input_folder: Path,
+        output_folder: Path,
+        primer: str,
+        database_choice: str,
+    ) -> None:
+        """初始化監看處理器
+
+        Initialize watch processor.
+
+        Args:
+            frame (SangerContentFrame): 提供分析步驟的內容框架 / Content frame providing the analysis steps.
+            input_folder (Path): 監看的樣本資料夾 / Watched samples folder.
+            output_folder (Path): 輸出資料夾 / Output folder.
+            primer (str): Primer 檔案名稱 / Primer file name.
+            database_choice (str): 資料庫選項 / Database choice.
+        """
+        self.frame = frame
+        self.input_folder = input_folder
+        self.primer = primer
+        self.database_choice = database_choice
+        self.work_dir = output_folder / f"{input_folder.name}_watch"
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self.state_file = self.work_dir / "state.json"
+        self.result_csv = output_folder / f"{input_folder.name}_watch_results.csv"
+        self.result_xlsx = output_folder / f"{input_folder.name}_watch_results.xlsx"
+        self.state: dict[str, dict[str, int | str]] = self._load_state()
+
+    def _load_state(self) -> dict[str, dict[str, int | str]]:
+        """讀取已處理檔案的狀態
+
+        Load the state of already processed files.
+
+        Returns:
+            dict[str, dict[str, int | str]]: 檔名對應雜湊、大小、修改時間與錯誤訊息 (若失敗) /
+                File name to digest, size, mtime and, for failed files, the error.
+        """
+        if not self.state_file.exists():
+            return {}
+        try:
+            return json.loads(self.state_file.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"監看狀態檔損毀, 將重新處理所有檔案: {e}")
+            return {}
+
+    def _save_state(self) -> None:
+        """儲存已處理檔案的狀態
+
+        Save the state of processed files.
+        """
+        self.state_file.write_text(json.dumps(self.state, indent=2), encoding="utf-8")
+
+    def scan(self) -> list[tuple[Path, str]]:
+        """找出新增或內容變更的 .ab1 檔案
+
+        Find new or content-changed .ab1 files.
+
+        大小與修改時間皆未變的檔案不重新計算雜湊; 最近仍在寫入的檔案留待下次輪詢。
+
+        Files whose size and mtime are unchanged are not rehashed; files modified very
+        recently are left for the next poll.
+
+        Returns:
+            list[tuple[Path, str]]: 待處理檔案與其雜湊 / Pending files with their digests.
+        """
+        pending: list[tuple[Path, str]] = []
+        now = time.time()
+
+        for ab1_file in sorted(self.input_folder.glob("*.ab1")):
+            stat = ab1_file.stat()
+            if now - stat.st_mtime < WATCH_SETTLE_SECONDS:
+                continue
+
+            entry = self.state.get(ab1_file.name)
+            if (
+                entry is not None
+                and entry["size"] == stat.st_size
+                and entry["mtime_ns"] == stat.st_mtime_ns
+            ):
+                continue
+
+            digest = file_digest(ab1_file)
+            if entry is not None and entry["digest"] == digest:
+                entry["size"] = stat.st_size
+                entry["mtime_ns"] = stat.st_mtime_ns
+                continue
+
+            pending.append((ab1_file, digest))
+
+        return pending
+
+    def process_pending(self) -> int:
+        """處理所有待處理的檔案並更新結果表
+
+        Process all pending files and update the result table.
+
+        無法讀取的檔案記錄於狀態的 "error" 欄位並記錄一次錯誤日誌, 檔案變更前不再處理。
+
+        An unreadable file is stored in the state with an "error" field and logged once; it is
+        skipped until the file changes.
+
+        Returns:
+            int: 成功處理的檔案數 / Number of files processed successfully.
+        """
+        pending = self.scan()
+        if not pending:
+            self._save_state()
+            return 0
+
+        logger.info(f"監看模式: 處理 {len(pending)} 個新的或變更的檔案")
+
+        merged_fastq = self.work_dir / "batch_merged.fastq"
+        trimmed_fastq = self.work_dir / "batch_trimmed.fastq"
+        trimmed_fasta = self.work_dir / "batch_trimmed.fasta"
+        blasted_txt = self.work_dir / "batch_blasted.txt"
+        trimlog = self.work_dir / "batch_trimlog.log"
+
+        # 逐檔讀取, 無法讀取的檔案記錄錯誤後略過, 不影響同批的其他檔案
+        # Files are read one by one; an unreadable file is recorded with its error and
+        # skipped without holding back the rest of the batch
+        readable: list[tuple[Path, str]] = []
+        with merged_fastq.open("w") as output_handle:
+            for ab1_file, digest in pending:
+                try:
+                    output_handle.write(self.frame._ab1_to_fastq(ab1_file))
+                except Exception as e:
+                    logger.error(f"監看模式: 無法讀取 {ab1_file.name}, 檔案變更前不再處理: {e}")
+                    self._remember(ab1_file, digest, error=str(e))
+                    continue
+                readable.append((ab1_file, digest))
+
+        if not readable:
+            self._save_state()
+            return 0
+
+        sample_files = [ab1_file for ab1_file, _ in readable]
+        self.frame._trim_sequences(merged_fastq, trimmed_fastq, trimlog, self.primer)
+        self.frame._convert_fastq_to_fasta(trimmed_fastq, trimmed_fasta)
+        self.frame._run_blast(trimmed_fasta, blasted_txt, self.database_choice)
+        batch_result = self.frame._parse_blast_results(blasted_txt, sample_files)
+
+        self._append_results(batch_result)
+
+        for ab1_file, digest in readable:
+            self._remember(ab1_file, digest)
+        self._save_state()
+
+        logger.info(f"監看模式: 已更新結果表 {self.result_xlsx}")
+        return len(sample_files)
+
+    def _remember(self, ab1_file: Path, digest: str, error: str | None = None) -> None:
+        """記錄已處理檔案的狀態, 失敗的檔案另記錄錯誤訊息
+
+        Record the state of a processed file, plus the error message of a failed one.
+
+        記錄錯誤的檔案同樣在內容變更前不再處理。
+
+        Files recorded with an error are likewise skipped until their content changes.
+
+        Args:
+            ab1_file (Path): AB1 檔案路徑 / AB1 file path.
+            digest (str): 檔案雜湊 / File digest.
+            error (str | None): 錯誤訊息, None 表示處理成功 / Error message; None on success.
+        """
+        stat = ab1_file.stat()
+        entry: dict[str, int | str] = {
+            "digest": digest,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+        if error is not None:
+            entry["error"] = error
+        self.state[ab1_file.name] = entry
+
+    def _append_results(self, batch_result: pd.DataFrame) -> None:
+        """將新結果併入持續性結果表
+
+        Merge a batch of results into the persistent result table.
+
+        Args:
+            batch_result (pd.DataFrame): 本批次結果 / Results of this batch.
+        """
+        if self.result_csv.exists():
+            table = pd.read_csv(self.result_csv, dtype={"No": str})
+            table = table[~table["No"].isin(batch_result["No"])]
+            table = pd.concat([table, batch_result], ignore_index=True)
+        else:
+            table = batch_result
+
+        table = table.sort_values(by="No", kind="stable", ignore_index=True)
+        table.to_csv(self.result_csv, index=False)
+        table.to_excel(self.result_xlsx, engine="openpyxl", index=False)
+        self.frame._add_chinese_names(table, self.result_xlsx)
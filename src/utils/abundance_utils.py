@@ -0,0 +1,121 @@
+"""依豐度篩選 BLAST 查詢
+
+Abundance gating of BLAST queries.
+
+由 OTU 表格 (usearch -otutab) 取得每個 ZOTU 的讀序數, 讀序數或比例低於門檻的 ZOTU
+不送入 BLAST; 這些 ZOTU 仍會以獨立的 Stat 列在結果中。
+
+Read counts per ZOTU come from the OTU table (usearch -otutab). ZOTUs below the read count
+or ratio threshold are not sent to BLAST, but they are still listed in the results with their
+own Stat.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+from src.utils.fastx_utils import iter_fasta
+from src.utils.logger_utils import get_logger
+
+logger = get_logger(__name__)
+
+# 低豐度而未執行 BLAST 的 ZOTU 在結果中的 Stat
+# Stat of ZOTUs skipped by the abundance gate
+LOW_ABUNDANCE_STAT = "*LOW_ABUNDANCE*"
+
+
+@dataclass(slots=True, frozen=True)
+class AbundanceGate:
+    """BLAST 查詢的豐度門檻 (0 表示不限制)
+
+    Abundance thresholds for BLAST queries; 0 disables a threshold.
+    """
+
+    min_reads: int = 0
+    min_ratio: float = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        """是否設定了任何門檻
+
+        Whether any threshold is set.
+        """
+        return self.min_reads > 0 or self.min_ratio > 0
+
+    def skipped(self, counts: dict[str, int]) -> dict[str, int]:
+        """找出低於門檻的 ZOTU
+
+        Find the ZOTUs below the thresholds.
+
+        Args:
+            counts (dict[str, int]): ZOTU -> 讀序數 / ZOTU -> read count.
+
+        Returns:
+            dict[str, int]: 低於門檻的 ZOTU 與其讀序數 / ZOTUs below the thresholds and their
+            read counts.
+        """
+        if not self.enabled:
+            return {}
+        total = sum(counts.values())
+        return {
+            otu: reads
+            for otu, reads in counts.items()
+            if reads < self.min_reads or (total and reads / total < self.min_ratio)
+        }
+
+
+def read_otu_counts(table_path: Path) -> dict[str, int]:
+    """讀取 OTU 表格中每個 ZOTU 的讀序數 (各樣本欄位加總)
+
+    Read the read count of every ZOTU from an OTU table, summed over sample columns.
+
+    Args:
+        table_path (Path): OTU 表格路徑 / OTU table path.
+
+    Returns:
+        dict[str, int]: ZOTU -> 讀序數 / ZOTU -> read count.
+    """
+    counts: dict[str, int] = {}
+    with open(table_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            otu, *values = line.rstrip("\r\n").split("\t")
+            counts[otu] = sum(int(float(value)) for value in values if value)
+    return counts
+
+
+def otu_id(header: bytes) -> str:
+    """由 FASTA 標頭取得 ZOTU 名稱 (去除 ;size= 等註記)
+
+    Get the ZOTU name from a FASTA header, dropping annotations such as ;size=.
+
+    Args:
+        header (bytes): FASTA 標頭 (不含 ">") / FASTA header without ">".
+
+    Returns:
+        str: ZOTU 名稱 / ZOTU name.
+    """
+    return header.split(b";", 1)[0].split(maxsplit=1)[0].decode()
+
+
+def write_gated_queries(query_fasta: Path, output_fasta: Path, skipped: set[str]) -> int:
+    """寫出排除低豐度 ZOTU 後的查詢 FASTA
+
+    Write the query FASTA without the low-abundance ZOTUs.
+
+    Args:
+        query_fasta (Path): 原始查詢 FASTA / Original query FASTA.
+        output_fasta (Path): 輸出 FASTA / Output FASTA.
+        skipped (set[str]): 要排除的 ZOTU / ZOTUs to leave out.
+
+    Returns:
+        int: 保留的查詢數 / Number of queries kept.
+    """
+    kept = 0
+    with open(output_fasta, "wb") as f:
+        for header, seq in iter_fasta(query_fasta):
+            if otu_id(header) in skipped:
+                continue
+            f.write(b">" + header + b"\n" + seq + b"\n")
+            kept += 1
+    return kept
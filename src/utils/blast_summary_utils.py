@@ -0,0 +1,224 @@
+"""NGS BLAST 結果的串流彙整
+
+Streaming summary of NGS BLAST results.
+
+BLAST 命中以固定列數分批讀取, 每個 OTU 只保留彙整後的狀態: 第一個 Identity >= 97 的
+命中 (主要結果)、其後各物種第一個 >= 97 的命中 (*DUPE*) 與各物種第一個 < 97 的命中
+(*FILTERED*)。保留的狀態即為輸出表格的內容, 因此峰值記憶體取決於 OTU 與物種數,
+與 BLAST 檔案大小 (例如提高 -max_target_seqs) 無關。
+
+BLAST hits are read in fixed-size chunks and every OTU keeps only its summarized state: the
+first hit with Identity >= 97 (the main result), the first later >= 97 hit of each species
+(*DUPE*), and the first < 97 hit of each species (*FILTERED*). That state is exactly the
+output table, so peak memory depends on the number of OTUs and species, not on the size of
+the BLAST file (for example with a raised -max_target_seqs).
+"""
+
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+import math
+from pathlib import Path
+
+import natsort
+import pandas as pd
+
+from src.utils.abundance_utils import LOW_ABUNDANCE_STAT
+from src.utils.blast_table_utils import CHUNK_ROWS, iter_blast_table
+
+# BLAST 命中的欄名與彙整表格的欄位順序
+# Column names of BLAST hits and column order of the summary table
+HIT_COLUMNS = ("OTU", "Identity", "Coverage", "Scientific_name", "Accession_number")
+SUMMARY_COLUMNS = (
+    "OTU",
+    "Identity",
+    "Coverage",
+    "Scientific_name",
+    "Stat",
+    "Reads",
+    "Ratio",
+    "Accession_number",
+)
+
+IDENTITY_THRESHOLD = 97
+DUPE_STAT = "*DUPE*"
+FILTERED_STAT = "*FILTERED*"
+
+# 命中: (Identity, Coverage, Scientific_name, Accession_number)
+# A hit: (Identity, Coverage, Scientific_name, Accession_number)
+Hit = tuple[float, int, object, object]
+
+
+@dataclass(slots=True)
+class OtuHits:
+    """單一 OTU 的彙整狀態
+
+    Summarized state of one OTU.
+
+    物種鍵中缺少的物種名稱以 None 表示, 依首次出現順序保存。
+
+    Species keys use None for a missing species name and keep first-seen order.
+    """
+
+    best: Hit | None = None
+    dupes: dict[object, Hit] = field(default_factory=dict)
+    filtered: dict[object, Hit] = field(default_factory=dict)
+
+    def add(self, hit: Hit, passed: bool) -> None:
+        """加入一筆命中 (需依 BLAST 輸出順序加入)
+
+        Add one hit; hits must be added in BLAST output order.
+
+        Args:
+            hit (Hit): 命中 / Hit.
+            passed (bool): Identity 是否達門檻 / Whether Identity reaches the threshold.
+        """
+        species = _species_key(hit[2])
+        if not passed:
+            self.filtered.setdefault(species, hit)
+        elif self.best is None:
+            self.best = hit
+        else:
+            self.dupes.setdefault(species, hit)
+
+
+def _species_key(name: object) -> object:
+    """物種名稱的字典鍵 (缺值為 None)
+
+    Dictionary key of a species name; missing values become None.
+    """
+    return name if isinstance(name, str) else None
+
+
+def collect_otu_hits(
+    blast_txt: Path, fields: Sequence[str], chunk_rows: int = CHUNK_ROWS
+) -> dict[str, OtuHits]:
+    """分批讀取 BLAST 命中並彙整每個 OTU 的狀態
+
+    Read BLAST hits in chunks and summarize the state of every OTU.
+
+    每批同一 OTU、同一物種且同樣達門檻與否的命中只保留前兩筆 (主要結果與其同物種的
+    *DUPE*), 只有剩下的命中逐筆處理。
+
+    Each chunk keeps only the first two hits with the same OTU, species and pass state (a
+    main result and its same-species *DUPE*), and only the remaining hits are handled one by
+    one.
+
+    Args:
+        blast_txt (Path): BLAST outfmt 6 檔案 / BLAST outfmt 6 file.
+        fields (Sequence[str]): 執行 BLAST 時的 outfmt 欄位, 依序對應 HIT_COLUMNS /
+            outfmt fields BLAST ran with, matching HIT_COLUMNS in order.
+        chunk_rows (int): 每批列數 / Rows per chunk.
+
+    Returns:
+        dict[str, OtuHits]: OTU -> 彙整狀態 (依首次出現順序) / OTU -> summarized state, in
+        first-seen order.
+    """
+    otus: dict[str, OtuHits] = {}
+    for chunk in iter_blast_table(blast_txt, fields, HIT_COLUMNS, chunk_rows):
+        chunk = chunk.assign(passed=chunk["Identity"] >= IDENTITY_THRESHOLD)
+        repeat = chunk.groupby(["OTU", "Scientific_name", "passed"], dropna=False).cumcount()
+        chunk = chunk[repeat < 2]
+        rows = zip(
+            chunk["OTU"].tolist(),
+            chunk["Identity"].tolist(),
+            chunk["Coverage"].tolist(),
+            chunk["Scientific_name"].tolist(),
+            chunk["Accession_number"].tolist(),
+            chunk["passed"].tolist(),
+            strict=True,
+        )
+        for otu, identity, coverage, species, accession, passed in rows:
+            state = otus.get(otu)
+            if state is None:
+                state = otus[otu] = OtuHits()
+            state.add((identity, coverage, species, accession), passed)
+    return otus
+
+
+def summarize_blast_hits(
+    blast_txt: Path,
+    fields: Sequence[str],
+    counts: Mapping[str, int],
+    skipped: Mapping[str, int],
+    chunk_rows: int = CHUNK_ROWS,
+) -> pd.DataFrame:
+    """將 BLAST 命中與 OTU 讀序數彙整為結果表格
+
+    Summarize BLAST hits and OTU read counts into the result table.
+
+    每個 OTU 依序列出主要結果 (含讀序數與比例)、其他物種的 *DUPE* 與 *FILTERED*; 沒有任何
+    Identity >= 97 命中的 OTU 只列出第一個 *FILTERED* 命中並附讀序數與比例。沒有讀序數的
+    OTU 不列主要結果, *DUPE* 也包含主要結果的物種, 沒有 *DUPE* 時整個 OTU 不列出。未執行
+    BLAST 的低豐度 OTU 另列一列。OTU 依自然排序。
+
+    Each OTU lists its main result with reads and ratio, then *DUPE* rows of other species
+    and *FILTERED* rows. An OTU without any Identity >= 97 hit lists only its first
+    *FILTERED* hit, with reads and ratio. An OTU without a read count has no main result row;
+    its *DUPE* rows then include the main result's species, and without any *DUPE* row the OTU
+    is left out. Low-abundance OTUs that were not BLASTed get a row of their own. OTUs are in
+    natural order.
+
+    Args:
+        blast_txt (Path): BLAST outfmt 6 檔案 / BLAST outfmt 6 file.
+        fields (Sequence[str]): 執行 BLAST 時的 outfmt 欄位 / outfmt fields BLAST ran with.
+        counts (Mapping[str, int]): OTU -> 讀序數 / OTU -> read count.
+        skipped (Mapping[str, int]): 未執行 BLAST 的低豐度 OTU 與其讀序數 / Low-abundance OTUs
+            that were not BLASTed, with their read counts.
+        chunk_rows (int): 每批列數 / Rows per chunk.
+
+    Returns:
+        pd.DataFrame: 欄位依 SUMMARY_COLUMNS 的結果表格 / Result table with SUMMARY_COLUMNS.
+    """
+    total = sum(counts.values())
+
+    def ratio(reads: int) -> float:
+        return reads / total if total else math.nan
+
+    nan = math.nan
+    rows: list[tuple] = []
+    for otu, state in collect_otu_hits(blast_txt, fields, chunk_rows).items():
+        reads = counts.get(otu)
+        if state.best is None:
+            # 沒有達門檻的命中: 以第一個 *FILTERED* 命中代表此 OTU (需有讀序數)
+            # No hit reaches the threshold: the first *FILTERED* hit stands for the OTU
+            # (only when it has a read count)
+            if reads is not None:
+                identity, coverage, species, accession = next(iter(state.filtered.values()))
+                rows.append(
+                    (
+                        otu,
+                        identity,
+                        coverage,
+                        species,
+                        FILTERED_STAT,
+                        reads,
+                        ratio(reads),
+                        accession,
+                    )
+                )
+            continue
+
+        dupes = state.dupes
+        if reads is not None:
+            identity, coverage, species, accession = state.best
+            rows.append((otu, identity, coverage, species, "", reads, ratio(reads), accession))
+            # 與主要結果同物種的 *DUPE* 只在沒有主要結果列時列出
+            # A *DUPE* of the main result's species is listed only without a main result row
+            best_species = _species_key(species)
+            dupes = {key: hit for key, hit in dupes.items() if key != best_species}
+        elif not dupes:
+            # 沒有讀序數也沒有 *DUPE* 的 OTU 不列出
+            # An OTU with neither a read count nor a *DUPE* row is left out
+            continue
+        rows.extend(
+            (otu, identity, coverage, species, stat, nan, nan, accession)
+            for stat, hits in ((DUPE_STAT, dupes), (FILTERED_STAT, state.filtered))
+            for identity, coverage, species, accession in hits.values()
+        )
+
+    rows.extend(
+        (otu, nan, nan, "", LOW_ABUNDANCE_STAT, reads, ratio(reads), nan)
+        for otu, reads in skipped.items()
+    )
+    rows = natsort.natsorted(rows, key=lambda row: row[0])
+    return pd.DataFrame(rows, columns=list(SUMMARY_COLUMNS))
@@ -0,0 +1,155 @@
+"""BLAST 執行工具
+
+BLAST execution utilities.
+"""
+
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import os
+from pathlib import Path
+
+import numpy as np
+
+from src.utils.fastx_index_utils import ByteRange, FastxIndex
+from src.utils.logger_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def default_blast_workers() -> int:
+    """取得預設的 blastn 平行程序數 (CPU 核心數)
+
+    Get the default number of concurrent blastn processes (CPU count).
+
+    Returns:
+        int: 程序數 / Number of processes.
+    """
+    return os.cpu_count() or 1
+
+
+def residue_ranges(fasta_index: FastxIndex, parts: int) -> list[ByteRange]:
+    """將 FASTA 依鹼基數切成至多 parts 個以紀錄為界的連續區段
+
+    Split a FASTA into at most `parts` contiguous, record-aligned ranges balanced by residue
+    count.
+
+    標頭長度不計入, 因此標頭長短不一時各區段的鹼基數仍然平衡。
+
+    Header lengths are not counted, so ranges stay balanced even when header lengths vary.
+
+    Args:
+        fasta_index (FastxIndex): FASTA 的紀錄索引 / Record index of the FASTA.
+        parts (int): 區段數 / Number of ranges.
+
+    Returns:
+        list[ByteRange]: 非空的位元組區段 / Non-empty byte ranges.
+    """
+    records = len(fasta_index)
+    if records == 0:
+        return []
+
+    lengths = np.concatenate(
+        [np.diff(batch.sequences.offsets) for batch in fasta_index.iter_batches()]
+    )
+    # 每筆紀錄之前的累積鹼基數; 起點低於目標的紀錄歸入前一個區段
+    # Residues before each record; records starting below a target go to the earlier range
+    residue_starts = np.cumsum(lengths) - lengths
+    parts = max(1, min(parts, records))
+    targets = lengths.sum() * np.arange(1, parts) / parts
+    cuts = np.searchsorted(residue_starts, targets)
+    bounds = np.unique(np.concatenate(([0], cuts, [records])))
+    starts = fasta_index.starts
+    return [
+        ByteRange(int(starts[first]), int(starts[stop]), int(first), int(stop))
+        for first, stop in itertools.pairwise(bounds.tolist())
+        if stop > first
+    ]
+
+
+def split_fasta_by_residues(fasta_index: FastxIndex, chunk_paths: list[Path]) -> list[int]:
+    """依鹼基數將查詢 FASTA 切成連續且平衡的區塊
+
+    Split a query FASTA into contiguous chunks balanced by residue count.
+
+    區塊保留原始查詢順序 (連續切分), 因此依序串接各區塊的結果即等同單一程序的輸出。
+    各區塊直接複製記憶體映射中的原始位元組, 不需重新寫出序列。
+
+    Chunks are contiguous runs of the original queries, so concatenating their results in
+    chunk order reproduces the single-process output. Each chunk is copied straight from the
+    memory-mapped bytes without rewriting sequences.
+
+    Args:
+        fasta_index (FastxIndex): 查詢 FASTA 的紀錄索引 / Record index of the query FASTA.
+        chunk_paths (list[Path]): 區塊輸出路徑 / Chunk output paths.
+
+    Returns:
+        list[int]: 每個區塊的查詢數 / Number of queries per chunk.
+    """
+    ranges = residue_ranges(fasta_index, len(chunk_paths))
+    counts = [0] * len(chunk_paths)
+    for chunk, path in enumerate(chunk_paths):
+        with open(path, "wb") as f:
+            if chunk < len(ranges):
+                byte_range = ranges[chunk]
+                f.write(fasta_index.raw(byte_range))
+                counts[chunk] = byte_range.stop - byte_range.first
+    return counts
+
+
+def run_blast_chunked(
+    run_blast: Callable[[Path, Path], None],
+    query_fasta: Path,
+    output_txt: Path,
+    workers: int,
+) -> None:
+    """將查詢切塊後以多個 blastn 程序平行執行, 並依原始順序合併結果
+
+    Run blastn as concurrent processes over query chunks and merge results in query order.
+
+    Args:
+        run_blast (Callable[[Path, Path], None]): 執行 blastn(query, out) 的函式 / Function running blastn(query, out).
+        query_fasta (Path): 查詢 FASTA 檔案路徑 / Query FASTA file path.
+        output_txt (Path): 輸出檔案路徑 / Output file path.
+        workers (int): 平行程序數 / Number of concurrent processes.
+    """
+    chunk_fastas: list[Path] = []
+    chunk_outputs: list[Path] = []
+    # 失敗時也要移除區塊檔, 殘留的 .txt 會被當成 BLAST 結果
+    # Remove chunk files on failure too; a leftover .txt would be taken for a result
+    try:
+        # 查詢檔每次執行都會重新產生, 不需要旁路索引
+        # The query file is regenerated on every run, so no sidecar index is kept
+        with FastxIndex(query_fasta, cache=False) as query_index:
+            query_count = len(query_index)
+            chunks = min(max(workers, 1), query_count)
+            if chunks > 1:
+                chunk_fastas = [
+                    output_txt.with_name(f"{output_txt.stem}_chunk{chunk:03d}.fasta")
+                    for chunk in range(chunks)
+                ]
+                chunk_outputs = [path.with_suffix(".txt") for path in chunk_fastas]
+                counts = split_fasta_by_residues(query_index, chunk_fastas)
+
+        if not chunk_fastas:
+            run_blast(query_fasta, output_txt)
+            return
+
+        active = [chunk for chunk, count in enumerate(counts) if count]
+        logger.info(f"BLAST 查詢分成 {len(active)} 個區塊平行執行 (共 {query_count} 條序列)")
+        with ThreadPoolExecutor(max_workers=len(active)) as executor:
+            futures = [
+                executor.submit(run_blast, chunk_fastas[chunk], chunk_outputs[chunk])
+                for chunk in active
+            ]
+            for future in futures:
+                future.result()
+
+        with open(output_txt, "wb") as f_out:
+            for chunk in active:
+                with open(chunk_outputs[chunk], "rb") as f_in:
+                    while block := f_in.read(1024 * 1024):
+                        f_out.write(block)
+    finally:
+        for path in [*chunk_fastas, *chunk_outputs]:
+            path.unlink(missing_ok=True)
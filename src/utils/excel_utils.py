@@ -3,8 +3,13 @@
 Excel-related utility functions.
 """
 
+from functools import lru_cache
+from pathlib import Path
+
 import pandas as pd
 
+from src.utils.abundance_utils import LOW_ABUNDANCE_STAT
+
 
 def highlight_row(row: pd.Series) -> list[str]:
     """根據狀態欄位標記該列的背景顏色
@@ -24,7 +29,47 @@ def highlight_row(row: pd.Series) -> list[str]:
             css = "background-color: #00c2c7"
         case "*FILTERED*":
             css = "background-color: #94F7B2"
+        case stat if stat == LOW_ABUNDANCE_STAT:
+            css = "background-color: #D9D9D9"
         case _:
             css = "background-color: transparent"
 
     return [css] * len(row)
+
+
+@lru_cache(maxsize=4)
+def _read_reference_table(ref_path: str, mtime_ns: int) -> pd.DataFrame:
+    """讀取參考表 (以路徑與修改時間為快取鍵)
+
+    Read the reference workbook (cached by path and modification time).
+
+    Args:
+        ref_path (str): 參考檔案路徑 / Reference file path.
+        mtime_ns (int): 檔案修改時間, 僅作為快取鍵 / File mtime, only used as cache key.
+
+    Returns:
+        pd.DataFrame: 參考資料 / Reference data.
+    """
+    df_ref = pd.read_excel(ref_path, engine="openpyxl")
+    if "Scientific_name" in df_ref.columns:
+        df_ref["Scientific_name"] = df_ref["Scientific_name"].astype(str)
+    return df_ref
+
+
+def load_reference_table(ref_path: Path | str) -> pd.DataFrame:
+    """取得中文名稱參考表 (快取, 檔案更新後自動重新讀取)
+
+    Get the Chinese-name reference table, cached until the file changes.
+
+    回傳的 DataFrame 為共用快取, 呼叫端不可直接修改。
+
+    The returned DataFrame is a shared cached object and must not be modified in place.
+
+    Args:
+        ref_path (Path | str): 參考檔案路徑 / Reference file path.
+
+    Returns:
+        pd.DataFrame: 參考資料 / Reference data.
+    """
+    path = Path(ref_path).resolve()
+    return _read_reference_table(str(path), path.stat().st_mtime_ns)
@@ -0,0 +1,263 @@
+"""FASTQ / FASTA 檔案處理工具
+
+FASTQ / FASTA file handling utilities.
+
+以原始位元組區塊處理檔案, 不建立 Biopython SeqRecord, 記憶體用量與檔案大小無關。
+
+Files are processed as raw byte blocks without building Biopython SeqRecord objects, so
+memory usage does not depend on file size.
+"""
+
+from collections.abc import Iterator
+import gzip
+from pathlib import Path
+from typing import BinaryIO
+
+from src.utils.logger_utils import get_logger
+
+logger = get_logger(__name__)
+
+# 每次讀取的區塊大小 (8 MiB)
+# Size of each block read from disk (8 MiB)
+BLOCK_SIZE = 8 * 1024 * 1024
+
+# 每批讀取的 FASTQ 紀錄數
+# Number of FASTQ records per batch
+FASTQ_BATCH_SIZE = 4096
+
+# FASTQ 紀錄: (標頭不含 "@", 序列, 品質)
+# FASTQ record: (header without "@", sequence, quality)
+FastqRecord = tuple[bytes, bytes, bytes]
+
+
+def fastq_to_fasta(input_fastq: Path, output_fasta: Path, block_size: int = BLOCK_SIZE) -> int:
+    """將 FASTQ 轉換為 FASTA 格式 (位元組快速路徑)
+
+    Convert FASTQ to FASTA working on raw byte lines.
+
+    假設 FASTQ 為標準四行格式 (不換行), 標頭的 "@" 改為 ">", 捨棄 "+" 與品質行。
+    不完整的最後一筆紀錄會保留到下一個區塊再處理。
+
+    Assumes standard four-line (unwrapped) FASTQ. The "@" of each header becomes ">" and the
+    "+" and quality lines are dropped. An incomplete trailing record is carried over to the
+    next block.
+
+    檔案結尾的紀錄不足四行 (檔案被截斷) 時拋出 ValueError, 不寫出該紀錄。
+
+    A trailing record with fewer than four lines, from a truncated file, raises ValueError
+    instead of being written.
+
+    Args:
+        input_fastq (Path): 輸入 FASTQ 檔案路徑 / Input FASTQ file path.
+        output_fasta (Path): 輸出 FASTA 檔案路徑 / Output FASTA file path.
+        block_size (int): 每次讀取的位元組數 / Number of bytes read per block.
+
+    Returns:
+        int: 轉換的紀錄數 / Number of converted records.
+
+    Raises:
+        ValueError: 結尾紀錄不完整時 / When the trailing record is incomplete.
+    """
+    record_count = 0
+    carry = b""
+
+    with (
+        open(input_fastq, "rb", buffering=0) as f_in,
+        open(output_fasta, "wb", buffering=block_size) as f_out,
+    ):
+        while True:
+            block = f_in.read(block_size)
+            if not block:
+                break
+
+            lines = (carry + block).split(b"\n")
+            # 最後一個元素可能是不完整的行, 連同不完整的紀錄一起保留
+            # The last element may be a partial line; keep it with any partial record
+            complete = (len(lines) - 1) // 4 * 4
+            carry = b"\n".join(lines[complete:])
+            record_count += _write_fasta_lines(f_out, lines[:complete])
+
+        # 檔案結尾的空行不算紀錄; 剩下的必須是一筆沒有結尾換行的完整紀錄
+        # Blank lines at the end are not a record; what is left must be one complete record
+        # without a final newline
+        trailing = carry.split(b"\n")
+        while trailing and not trailing[-1].strip():
+            trailing.pop()
+        if len(trailing) == 4:
+            record_count += _write_fasta_lines(f_out, trailing)
+        elif trailing:
+            raise ValueError(f"FASTQ 結尾有不完整的紀錄: {input_fastq}")
+
+    return record_count
+
+
+def _write_fasta_lines(f_out, lines: list[bytes]) -> int:
+    """將完整的 FASTQ 行寫為 FASTA
+
+    Write complete FASTQ lines as FASTA.
+
+    Args:
+        f_out: 輸出檔案物件 (二進位) / Binary output file object.
+        lines (list[bytes]): 行數為 4 的倍數的 FASTQ 行 / FASTQ lines, a multiple of four.
+
+    Returns:
+        int: 寫出的紀錄數 / Number of records written.
+    """
+    if not lines:
+        return 0
+
+    headers = lines[0::4]
+    sequences = lines[1::4]
+    if headers[0].endswith(b"\r"):
+        headers = [header.rstrip(b"\r") for header in headers]
+        sequences = [sequence.rstrip(b"\r") for sequence in sequences]
+
+    output = [b""] * (len(headers) * 2)
+    output[0::2] = headers
+    output[1::2] = sequences
+    chunk = b"\n".join(output)
+    # 將每個標頭的 "@" 換為 ">" (僅限行首)
+    # Replace the leading "@" of every header line with ">"
+    chunk = b">" + chunk[1:].replace(b"\n@", b"\n>")
+    f_out.write(chunk)
+    f_out.write(b"\n")
+    return len(headers)
+
+
+def iter_fasta(fasta_path: Path) -> Iterator[tuple[bytes, bytes]]:
+    """逐筆讀取 FASTA 紀錄 (支援多行序列)
+
+    Iterate over FASTA records, supporting wrapped sequences.
+
+    Args:
+        fasta_path (Path): FASTA 檔案路徑 / FASTA file path.
+
+    Yields:
+        tuple[bytes, bytes]: 標頭 (不含 ">") 與序列 / Header without ">" and sequence.
+    """
+    header: bytes | None = None
+    chunks: list[bytes] = []
+
+    with open(fasta_path, "rb", buffering=BLOCK_SIZE) as f:
+        for line in f:
+            line = line.rstrip(b"\r\n")
+            if line.startswith(b">"):
+                if header is not None:
+                    yield header, b"".join(chunks)
+                header = line[1:]
+                chunks = []
+            elif line:
+                chunks.append(line)
+
+    if header is not None:
+        yield header, b"".join(chunks)
+
+
+def open_fastx(path: Path) -> BinaryIO:
+    """以二進位模式開啟 FASTQ / FASTA 檔案 (支援 .gz)
+
+    Open a FASTQ / FASTA file in binary mode, transparently handling .gz files.
+
+    Args:
+        path (Path): 檔案路徑 / File path.
+
+    Returns:
+        BinaryIO: 二進位檔案物件 / Binary file object.
+    """
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    return open(path, "rb", buffering=BLOCK_SIZE)
+
+
+def create_fastx(path: Path) -> BinaryIO:
+    """以二進位模式建立 FASTQ / FASTA 檔案 (.gz 以最快的壓縮等級寫出)
+
+    Create a FASTQ / FASTA file in binary mode; .gz files use the fastest compression level.
+
+    Args:
+        path (Path): 檔案路徑 / File path.
+
+    Returns:
+        BinaryIO: 二進位檔案物件 / Binary file object.
+    """
+    if path.suffix == ".gz":
+        return gzip.open(path, "wb", compresslevel=1)
+    return open(path, "wb", buffering=BLOCK_SIZE)
+
+
+def iter_fastq_batches(
+    fastq_path: Path, batch_size: int = FASTQ_BATCH_SIZE
+) -> Iterator[list[FastqRecord]]:
+    """分批讀取 FASTQ 紀錄
+
+    Iterate over FASTQ records in batches.
+
+    Args:
+        fastq_path (Path): FASTQ 檔案路徑 (可為 .gz) / FASTQ file path, optionally gzipped.
+        batch_size (int): 每批紀錄數 / Records per batch.
+
+    Yields:
+        list[FastqRecord]: 一批 (標頭, 序列, 品質) / A batch of (header, sequence, quality).
+    """
+    batch: list[FastqRecord] = []
+
+    with open_fastx(fastq_path) as f:
+        while True:
+            header = f.readline()
+            if not header:
+                break
+            seq = f.readline().rstrip(b"\r\n")
+            f.readline()
+            qual = f.readline().rstrip(b"\r\n")
+            batch.append((header[1:].rstrip(b"\r\n"), seq, qual))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+    if batch:
+        yield batch
+
+
+def iter_fastq_pair_batches(
+    r1_path: Path, r2_path: Path, batch_size: int = FASTQ_BATCH_SIZE
+) -> Iterator[tuple[list[FastqRecord], list[FastqRecord]]]:
+    """同步分批讀取 R1 與 R2
+
+    Iterate over R1 and R2 batches in lockstep.
+
+    Args:
+        r1_path (Path): R1 檔案路徑 / R1 file path.
+        r2_path (Path): R2 檔案路徑 / R2 file path.
+        batch_size (int): 每批紀錄數 / Records per batch.
+
+    Yields:
+        tuple[list[FastqRecord], list[FastqRecord]]: R1 與 R2 批次 / R1 and R2 batches.
+
+    Raises:
+        ValueError: R1 與 R2 的讀序數不一致時 / When R1 and R2 differ in read count.
+    """
+    batches = zip(
+        iter_fastq_batches(r1_path, batch_size),
+        iter_fastq_batches(r2_path, batch_size),
+        strict=False,
+    )
+    for batch1, batch2 in batches:
+        if len(batch1) != len(batch2):
+            raise ValueError(f"R1 與 R2 的讀序數不一致: {r1_path.name} / {r2_path.name}")
+        yield batch1, batch2
+
+
+def format_fastq_records(records: list[FastqRecord]) -> bytes:
+    """將 FASTQ 紀錄格式化為位元組
+
+    Format FASTQ records as bytes.
+
+    Args:
+        records (list[FastqRecord]): FASTQ 紀錄 / FASTQ records.
+
+    Returns:
+        bytes: FASTQ 內容 / FASTQ content.
+    """
+    return b"".join(
+        b"@" + header + b"\n" + seq + b"\n+\n" + qual + b"\n" for header, seq, qual in records
+    )
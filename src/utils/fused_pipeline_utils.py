@@ -0,0 +1,294 @@
+"""單一樣本串流處理流程 (修剪、合併、品質、長度、去重複)
+
+Fused streaming per-sample pipeline: trim, merge, quality, length and dereplication.
+
+每批配對讀序在同一個子程序中依序經過引子修剪、配對合併、品質截斷與長度過濾,
+只有合併後的讀序 (OTU 表格步驟需要) 與去重複結果會寫入磁碟; 其餘中間檔僅在除錯時輸出。
+
+Every batch of read pairs goes through primer trimming, pair merging, quality truncation and
+length filtering inside one worker. Only the merged reads (needed by the OTU table step) and
+the dereplicated uniques are written to disk; other intermediates are dumped only for
+debugging.
+"""
+
+from collections import Counter
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO
+
+import numpy as np
+
+from src.utils.fastx_utils import FastqRecord, format_fastq_records, iter_fastq_pair_batches
+from src.utils.kernel_utils import PHRED_OFFSET
+from src.utils.logger_utils import get_logger
+from src.utils.merge_utils import MergeSettings, MergeStats, merge_records
+from src.utils.primer_trim_utils import (
+    LinkedAdapter,
+    PrimerTrimSettings,
+    PrimerTrimStats,
+    trim_pair_records,
+    write_cutadapt_report,
+)
+from src.utils.scheduler_utils import ordered_process_map
+
+logger = get_logger(__name__)
+
+
+@dataclass(slots=True, frozen=True)
+class FusedSettings:
+    """串流流程參數
+
+    Fused pipeline parameters.
+    """
+
+    adapter1: LinkedAdapter
+    adapter2: LinkedAdapter
+    quality_threshold: int
+    length_threshold: int
+    trim: PrimerTrimSettings = field(default_factory=PrimerTrimSettings)
+    merge: MergeSettings = field(default_factory=MergeSettings)
+
+
+@dataclass(slots=True, frozen=True)
+class FusedOutputs:
+    """串流流程輸出路徑
+
+    Fused pipeline output paths.
+
+    除錯路徑為 None 時不寫出該中間檔。
+
+    A debug path left as None means that intermediate file is not written.
+    """
+
+    merged_fastq: Path
+    uniques_fasta: Path
+    trim_report: Path
+    trimmed_r1: Path | None = None
+    trimmed_r2: Path | None = None
+    quality_fastq: Path | None = None
+    length_fasta: Path | None = None
+
+    @property
+    def debug_paths(self) -> dict[str, Path]:
+        """需要寫出的除錯中間檔
+
+        Debug intermediates to write.
+        """
+        paths = {
+            "trimmed_r1": self.trimmed_r1,
+            "trimmed_r2": self.trimmed_r2,
+            "quality_fastq": self.quality_fastq,
+            "length_fasta": self.length_fasta,
+        }
+        return {key: path for key, path in paths.items() if path is not None}
+
+    def report_outputs(self, r1_path: Path, r2_path: Path) -> tuple[Path, Path]:
+        """修剪報告中記錄的修剪輸出路徑
+
+        Trimmed output paths recorded in the trimming report.
+
+        未寫出修剪中間檔時沿用逐步流程的檔名。
+
+        Falls back to the staged workflow names when the trimmed intermediates are not written.
+
+        Args:
+            r1_path (Path): R1 輸入檔案 / R1 input file.
+            r2_path (Path): R2 輸入檔案 / R2 input file.
+
+        Returns:
+            tuple[Path, Path]: R1 與 R2 修剪輸出路徑 / R1 and R2 trimmed output paths.
+        """
+        return (
+            self.trimmed_r1 or r1_path.with_name(f"{r1_path.name}_TRIMMED_R1.fastq"),
+            self.trimmed_r2 or r2_path.with_name(f"{r2_path.name}_TRIMMED_R2.fastq"),
+        )
+
+
+@dataclass(slots=True)
+class FusedStats:
+    """串流流程統計
+
+    Fused pipeline statistics.
+    """
+
+    trim: PrimerTrimStats = field(default_factory=PrimerTrimStats)
+    merge: MergeStats = field(default_factory=MergeStats)
+    quality_passed: int = 0
+    length_passed: int = 0
+    uniques: int = 0
+
+
+def truncate_quality(records: list[FastqRecord], threshold: int) -> list[FastqRecord]:
+    """於第一個品質分數 <= threshold 的位置截斷讀序 (usearch -fastq_truncqual)
+
+    Truncate each read at its first base with quality <= threshold, like
+    ``usearch -fastq_truncqual``; reads truncated to zero length are dropped.
+
+    Args:
+        records (list[FastqRecord]): FASTQ 紀錄 / FASTQ records.
+        threshold (int): 品質分數門檻 / Quality threshold.
+
+    Returns:
+        list[FastqRecord]: 截斷後的紀錄 / Truncated records.
+    """
+    if not records:
+        return []
+
+    lengths = np.fromiter(
+        (len(record[2]) for record in records), dtype=np.int64, count=len(records)
+    )
+    starts = np.cumsum(lengths) - lengths
+    flat = np.frombuffer(b"".join(record[2] for record in records), dtype=np.uint8)
+    cuts = lengths.copy()
+
+    low = np.flatnonzero(flat <= threshold + PHRED_OFFSET)
+    if low.size:
+        owners = np.searchsorted(starts, low, side="right") - 1
+        first_owners, first_index = np.unique(owners, return_index=True)
+        cuts[first_owners] = low[first_index] - starts[first_owners]
+
+    return [
+        (header, seq[:cut], qual[:cut])
+        for (header, seq, qual), cut in zip(records, cuts.tolist(), strict=True)
+        if cut > 0
+    ]
+
+
+def _process_batch(
+    batch1: list[FastqRecord],
+    batch2: list[FastqRecord],
+    settings: FusedSettings,
+    debug_keys: frozenset[str],
+) -> tuple[bytes, Counter, FusedStats, dict[str, bytes]]:
+    """以串流方式處理一批配對讀序 (可於子程序中執行)
+
+    Run one batch of read pairs through every fused stage; safe to run in a worker process.
+
+    Args:
+        batch1 (list[FastqRecord]): R1 紀錄 / R1 records.
+        batch2 (list[FastqRecord]): R2 紀錄 / R2 records.
+        settings (FusedSettings): 串流流程參數 / Fused pipeline parameters.
+        debug_keys (frozenset[str]): 需要輸出的除錯中間檔 / Debug intermediates to emit.
+
+    Returns:
+        tuple[bytes, Counter, FusedStats, dict[str, bytes]]: 合併讀序、序列計數、統計與除錯內容 /
+        Merged reads, sequence counts, statistics and debug content.
+    """
+    stats = FusedStats()
+    debug: dict[str, bytes] = {}
+
+    trimmed1, trimmed2, stats.trim = trim_pair_records(
+        batch1, batch2, settings.adapter1, settings.adapter2, settings.trim
+    )
+    merged, stats.merge = merge_records(trimmed1, trimmed2, settings.merge)
+    qualified = truncate_quality(merged, settings.quality_threshold)
+    long_enough = [record for record in qualified if len(record[1]) >= settings.length_threshold]
+    stats.quality_passed = len(qualified)
+    stats.length_passed = len(long_enough)
+
+    if "trimmed_r1" in debug_keys:
+        debug["trimmed_r1"] = format_fastq_records(trimmed1)
+    if "trimmed_r2" in debug_keys:
+        debug["trimmed_r2"] = format_fastq_records(trimmed2)
+    if "quality_fastq" in debug_keys:
+        debug["quality_fastq"] = format_fastq_records(qualified)
+    if "length_fasta" in debug_keys:
+        debug["length_fasta"] = b"".join(
+            b">" + header + b"\n" + seq + b"\n" for header, seq, _ in long_enough
+        )
+
+    counts = Counter(record[1] for record in long_enough)
+    return format_fastq_records(merged), counts, stats, debug
+
+
+def write_uniques(uniques_fasta: Path, counts: Counter) -> int:
+    """依豐度由高到低寫出去重複序列 (usearch -fastx_uniques -sizeout -relabel Uniq)
+
+    Write dereplicated sequences by decreasing abundance, like
+    ``usearch -fastx_uniques -sizeout -relabel Uniq``; ties keep first-seen order.
+
+    Args:
+        uniques_fasta (Path): 輸出 FASTA 路徑 / Output FASTA path.
+        counts (Counter): 序列計數 (依首次出現順序) / Sequence counts in first-seen order.
+
+    Returns:
+        int: 不重複序列數 / Number of unique sequences.
+    """
+    ranked = sorted(counts.items(), key=lambda item: -item[1])
+    with open(uniques_fasta, "wb") as f:
+        f.write(
+            b"".join(
+                b">Uniq%d;size=%d\n%s\n" % (rank, size, seq)
+                for rank, (seq, size) in enumerate(ranked, start=1)
+            )
+        )
+    return len(ranked)
+
+
+def run_fused_sample(
+    r1_path: Path,
+    r2_path: Path,
+    settings: FusedSettings,
+    outputs: FusedOutputs,
+    cores: int = 1,
+) -> FusedStats:
+    """以單次串流完成單一樣本的修剪至去重複
+
+    Run trimming through dereplication for one sample in a single streaming pass.
+
+    Args:
+        r1_path (Path): R1 檔案路徑 / R1 file path.
+        r2_path (Path): R2 檔案路徑 / R2 file path.
+        settings (FusedSettings): 串流流程參數 / Fused pipeline parameters.
+        outputs (FusedOutputs): 輸出路徑 / Output paths.
+        cores (int): 使用的核心數 / Number of cores.
+
+    Returns:
+        FusedStats: 串流流程統計 / Fused pipeline statistics.
+    """
+    stats = FusedStats()
+    counts: Counter = Counter()
+    debug_paths = outputs.debug_paths
+
+    with ExitStack() as stack:
+        debug_handles: dict[str, BinaryIO] = {
+            key: stack.enter_context(open(path, "wb")) for key, path in debug_paths.items()
+        }
+        f_merged = stack.enter_context(open(outputs.merged_fastq, "wb"))
+
+        batches = (
+            (batch1, batch2, settings, frozenset(debug_paths))
+            for batch1, batch2 in iter_fastq_pair_batches(r1_path, r2_path)
+        )
+        for merged, batch_counts, batch_stats, debug in ordered_process_map(
+            _process_batch, batches, cores
+        ):
+            f_merged.write(merged)
+            counts.update(batch_counts)
+            stats.trim.merge(batch_stats.trim)
+            stats.merge.merge(batch_stats.merge)
+            stats.quality_passed += batch_stats.quality_passed
+            stats.length_passed += batch_stats.length_passed
+            for key, content in debug.items():
+                debug_handles[key].write(content)
+
+    stats.uniques = write_uniques(outputs.uniques_fasta, counts)
+    write_cutadapt_report(
+        outputs.trim_report,
+        stats.trim,
+        r1_path,
+        r2_path,
+        *outputs.report_outputs(r1_path, r2_path),
+        settings.adapter1,
+        settings.adapter2,
+        settings.trim,
+        cores,
+    )
+
+    logger.info(
+        f"串流處理完成: {r1_path.name} 輸入 {stats.trim.input_pairs} 對, "
+        f"修剪 {stats.trim.output_pairs}, 合併 {stats.merge.merged}, "
+        f"品質 {stats.quality_passed}, 長度 {stats.length_passed}, 不重複 {stats.uniques}"
+    )
+    return stats
@@ -0,0 +1,29 @@
+"""雜湊相關工具函式
+
+Hashing utility functions.
+"""
+
+import hashlib
+from pathlib import Path
+
+# 每次讀取的區塊大小 (1 MiB)
+# Size of each block read while hashing (1 MiB)
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_digest(file_path: Path | str) -> str:
+    """計算檔案內容的雜湊值
+
+    Compute the content digest of a file (BLAKE2b, 128-bit).
+
+    Args:
+        file_path (Path | str): 檔案路徑 / File path.
+
+    Returns:
+        str: 十六進位雜湊字串 / Hexadecimal digest string.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
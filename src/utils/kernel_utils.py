@@ -0,0 +1,367 @@
+"""序列運算核心 (NumPy 向量化)
+
+Vectorized NumPy sequence kernels.
+
+所有核心都作用在 SequenceBatch 上: 一整批序列串接成單一連續的 uint8 緩衝區, 並以
+offsets 記錄每條序列的邊界, 因此可以一次對整批資料做查表與歸約, 不需要逐條迴圈。
+
+Every kernel works on a SequenceBatch: a whole batch of sequences concatenated into one
+contiguous uint8 buffer with offsets marking each sequence boundary, so lookups and
+reductions run over the whole batch at once instead of looping per sequence.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from itertools import pairwise
+
+import numpy as np
+
+PHRED_OFFSET = 33
+
+# 品質分數上限 (Phred+33 可表示的最大值)
+# Highest quality representable in Phred+33
+MAX_QUALITY = 93
+
+# 無效的 2 位元代碼 (非 ACGT)
+# Invalid 2-bit code (anything other than ACGT)
+INVALID_CODE = 4
+
+# ASCII -> 2 位元代碼 (A=0, C=1, G=2, T=3, 其他=4)
+# ASCII -> 2-bit code (A=0, C=1, G=2, T=3, anything else 4)
+TWO_BIT_CODES = np.full(256, INVALID_CODE, dtype=np.uint8)
+for _code, _bases in enumerate((b"Aa", b"Cc", b"Gg", b"Tt")):
+    for _base in _bases:
+        TWO_BIT_CODES[_base] = _code
+TWO_BIT_BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+
+# ASCII -> 4 位元 IUPAC 代碼 (每個位元代表 A/C/G/T 其中之一)
+# ASCII -> 4-bit IUPAC code, one bit per A/C/G/T
+FOUR_BIT_CODES = np.zeros(256, dtype=np.uint8)
+for _symbol, _mask in {
+    "A": 1,
+    "C": 2,
+    "G": 4,
+    "T": 8,
+    "U": 8,
+    "R": 5,
+    "Y": 10,
+    "S": 6,
+    "W": 9,
+    "K": 12,
+    "M": 3,
+    "B": 14,
+    "D": 13,
+    "H": 11,
+    "V": 7,
+    "N": 15,
+}.items():
+    FOUR_BIT_CODES[ord(_symbol)] = _mask
+    FOUR_BIT_CODES[ord(_symbol.lower())] = _mask
+FOUR_BIT_BASES = np.frombuffer(b"-ACMGRSVTWYHKDBN", dtype=np.uint8)
+
+# 互補鹼基查表 (含 IUPAC 簡併碼, 保留大小寫)
+# Complement lookup table, covering IUPAC codes and preserving case
+COMPLEMENT_TABLE = bytes.maketrans(
+    b"ACGTURYSWKMBDHVNacgturyswkmbdhvn", b"TGCAAYRSWMKVHDBNtgcaayrswmkvhdbn"
+)
+COMPLEMENT_CODES = np.frombuffer(COMPLEMENT_TABLE, dtype=np.uint8)
+
+# 品質分數 -> 錯誤機率
+# Quality score -> error probability
+ERROR_PROBABILITIES = 10.0 ** (-np.arange(MAX_QUALITY + 1, dtype=np.float64) / 10.0)
+
+
+@dataclass(slots=True)
+class SequenceBatch:
+    """以單一連續緩衝區儲存的一批序列
+
+    A batch of sequences stored in one contiguous buffer.
+
+    第 i 條序列為 data[offsets[i]:offsets[i + 1]]。
+
+    Sequence i is data[offsets[i]:offsets[i + 1]].
+    """
+
+    data: np.ndarray
+    offsets: np.ndarray
+
+    @classmethod
+    def from_bytes(cls, items: Sequence[bytes]) -> "SequenceBatch":
+        """由位元組序列建立
+
+        Build a batch from byte strings.
+
+        Args:
+            items (Sequence[bytes]): 序列或品質字串 / Sequence or quality strings.
+
+        Returns:
+            SequenceBatch: 序列批次 / Sequence batch.
+        """
+        offsets = np.zeros(len(items) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, items), dtype=np.int64, count=len(items)), out=offsets[1:])
+        data = np.frombuffer(b"".join(items), dtype=np.uint8)
+        return cls(data=data, offsets=offsets)
+
+    def __len__(self) -> int:
+        """序列數
+
+        Number of sequences.
+        """
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """每條序列的長度
+
+        Length of every sequence.
+        """
+        return np.diff(self.offsets)
+
+    @property
+    def owners(self) -> np.ndarray:
+        """緩衝區中每個位置所屬的序列編號
+
+        Index of the sequence owning each buffer position.
+        """
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    def to_bytes(self) -> list[bytes]:
+        """轉回位元組序列
+
+        Convert back to byte strings.
+
+        Returns:
+            list[bytes]: 序列 / Sequences.
+        """
+        raw = self.data.tobytes()
+        bounds = self.offsets.tolist()
+        return [raw[start:end] for start, end in pairwise(bounds)]
+
+
+def encode_2bit(batch: SequenceBatch) -> np.ndarray:
+    """將鹼基轉為 2 位元代碼 (非 ACGT 為 INVALID_CODE)
+
+    Translate bases to 2-bit codes; anything other than ACGT becomes INVALID_CODE.
+
+    Args:
+        batch (SequenceBatch): 序列批次 / Sequence batch.
+
+    Returns:
+        np.ndarray: 與緩衝區等長的 uint8 代碼 / uint8 codes, one per buffer position.
+    """
+    return TWO_BIT_CODES[batch.data]
+
+
+def pack_2bit(codes: np.ndarray) -> np.ndarray:
+    """將 2 位元代碼每 4 個壓成 1 個位元組 (第一個鹼基位於最高位)
+
+    Pack 2-bit codes four per byte, first base in the most significant bits.
+
+    無效代碼會被視為 A; 需要保留 N 時請使用 4 位元格式。
+
+    Invalid codes are packed as A; use the 4-bit format when N must survive.
+
+    Args:
+        codes (np.ndarray): 2 位元代碼 / 2-bit codes.
+
+    Returns:
+        np.ndarray: 壓縮後的位元組 / Packed bytes.
+    """
+    padded = np.zeros(-(-codes.size // 4) * 4, dtype=np.uint8)
+    padded[: codes.size] = codes & 3
+    quads = padded.reshape(-1, 4)
+    return (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]
+
+
+def unpack_2bit(packed: np.ndarray, length: int) -> np.ndarray:
+    """還原 pack_2bit 的結果為 ASCII 鹼基
+
+    Unpack the output of pack_2bit back to ASCII bases.
+
+    Args:
+        packed (np.ndarray): 壓縮後的位元組 / Packed bytes.
+        length (int): 鹼基數 / Number of bases.
+
+    Returns:
+        np.ndarray: ASCII 鹼基 / ASCII bases.
+    """
+    shifts = np.array([6, 4, 2, 0], dtype=np.uint8)
+    codes = (packed[:, None] >> shifts) & 3
+    return TWO_BIT_BASES[codes.reshape(-1)[:length]]
+
+
+def pack_4bit(batch: SequenceBatch) -> np.ndarray:
+    """將鹼基轉為 4 位元 IUPAC 代碼並每 2 個壓成 1 個位元組
+
+    Encode bases as 4-bit IUPAC codes packed two per byte, first base in the high nibble.
+
+    Args:
+        batch (SequenceBatch): 序列批次 / Sequence batch.
+
+    Returns:
+        np.ndarray: 壓縮後的位元組 / Packed bytes.
+    """
+    codes = FOUR_BIT_CODES[batch.data]
+    padded = np.zeros(-(-codes.size // 2) * 2, dtype=np.uint8)
+    padded[: codes.size] = codes
+    pairs = padded.reshape(-1, 2)
+    return (pairs[:, 0] << 4) | pairs[:, 1]
+
+
+def unpack_4bit(packed: np.ndarray, length: int) -> np.ndarray:
+    """還原 pack_4bit 的結果為 ASCII (IUPAC) 鹼基
+
+    Unpack the output of pack_4bit back to ASCII IUPAC bases.
+
+    Args:
+        packed (np.ndarray): 壓縮後的位元組 / Packed bytes.
+        length (int): 鹼基數 / Number of bases.
+
+    Returns:
+        np.ndarray: ASCII 鹼基 / ASCII bases.
+    """
+    codes = np.empty(packed.size * 2, dtype=np.uint8)
+    codes[0::2] = packed >> 4
+    codes[1::2] = packed & 15
+    return FOUR_BIT_BASES[codes[:length]]
+
+
+def _reversed_positions(batch: SequenceBatch) -> np.ndarray:
+    """每個位置在其序列反轉後的來源位置
+
+    Source position of every buffer position once each sequence is reversed.
+
+    Args:
+        batch (SequenceBatch): 序列批次 / Sequence batch.
+
+    Returns:
+        np.ndarray: 來源位置 / Source positions.
+    """
+    mirrors = batch.offsets[:-1] + batch.offsets[1:] - 1
+    return np.repeat(mirrors, batch.lengths) - np.arange(batch.data.size)
+
+
+def reverse_complement_batch(batch: SequenceBatch) -> SequenceBatch:
+    """一次計算整批序列的反向互補序列
+
+    Reverse-complement a whole batch at once.
+
+    Args:
+        batch (SequenceBatch): 序列批次 / Sequence batch.
+
+    Returns:
+        SequenceBatch: 反向互補後的批次 (offsets 相同) / Reverse-complemented batch, same offsets.
+    """
+    source = _reversed_positions(batch)
+    return SequenceBatch(data=COMPLEMENT_CODES[batch.data[source]], offsets=batch.offsets)
+
+
+def reverse_batch(batch: SequenceBatch) -> SequenceBatch:
+    """反轉每條序列 (例如品質字串)
+
+    Reverse every sequence, for example quality strings.
+
+    Args:
+        batch (SequenceBatch): 序列批次 / Sequence batch.
+
+    Returns:
+        SequenceBatch: 反轉後的批次 / Reversed batch.
+    """
+    return SequenceBatch(data=batch.data[_reversed_positions(batch)], offsets=batch.offsets)
+
+
+def decode_phred(batch: SequenceBatch, offset: int = PHRED_OFFSET) -> np.ndarray:
+    """將 Phred+33 品質字元解碼為 uint8 分數
+
+    Decode Phred+33 quality characters to uint8 scores.
+
+    Args:
+        batch (SequenceBatch): 品質字串批次 / Batch of quality strings.
+        offset (int): ASCII 位移 / ASCII offset.
+
+    Returns:
+        np.ndarray: 品質分數 / Quality scores.
+
+    Raises:
+        ValueError: 出現超出範圍的品質字元時 / When a quality character is out of range.
+    """
+    data = batch.data
+    if data.size and (data.min() < offset or data.max() > offset + MAX_QUALITY):
+        raise ValueError("品質字元超出 Phred+33 範圍")
+    return data - np.uint8(offset)
+
+
+def expected_errors(batch: SequenceBatch, offset: int = PHRED_OFFSET) -> np.ndarray:
+    """計算每條讀序的期望錯誤數 (各鹼基錯誤機率總和)
+
+    Compute the expected number of errors of each read, the sum of its base error
+    probabilities.
+
+    Args:
+        batch (SequenceBatch): 品質字串批次 / Batch of quality strings.
+        offset (int): ASCII 位移 / ASCII offset.
+
+    Returns:
+        np.ndarray: 每條讀序的期望錯誤數 / Expected errors per read.
+    """
+    probabilities = ERROR_PROBABILITIES[decode_phred(batch, offset)]
+    totals = np.zeros(len(batch), dtype=np.float64)
+    non_empty = batch.lengths > 0
+    if probabilities.size:
+        totals[non_empty] = np.add.reduceat(probabilities, batch.offsets[:-1][non_empty])
+    return totals
+
+
+def kmer_hashes(
+    batch: SequenceBatch, k: int, canonical: bool = False
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """計算整批序列所有 k-mer 的 2 位元雜湊值
+
+    Compute the 2-bit packed hash of every k-mer in the batch.
+
+    含非 ACGT 鹼基或跨越序列邊界的 k-mer 會被略過。canonical=True 時取 k-mer 與其
+    反向互補中較小者。
+
+    k-mers containing a non-ACGT base or crossing a sequence boundary are skipped. With
+    canonical=True the smaller of the k-mer and its reverse complement is returned.
+
+    Args:
+        batch (SequenceBatch): 序列批次 / Sequence batch.
+        k (int): k-mer 長度 (1-32) / k-mer length (1-32).
+        canonical (bool): 是否取正規 k-mer / Whether to return canonical k-mers.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: 雜湊值、所屬序列、序列內起點 /
+        Hashes, owning sequence and start within the sequence.
+
+    Raises:
+        ValueError: k 超出範圍時 / When k is out of range.
+    """
+    if not 1 <= k <= 32:
+        raise ValueError(f"k 必須介於 1 與 32 之間: {k}")
+
+    codes = encode_2bit(batch)
+    windows = codes.size - k + 1
+    if windows <= 0:
+        empty = np.empty(0, dtype=np.int64)
+        return np.empty(0, dtype=np.uint64), empty, empty
+
+    forward = np.zeros(windows, dtype=np.uint64)
+    reverse = np.zeros(windows, dtype=np.uint64)
+    invalid = np.zeros(windows, dtype=bool)
+    for i in range(k):
+        window = codes[i : i + windows]
+        invalid |= window == INVALID_CODE
+        values = (window & 3).astype(np.uint64)
+        forward = (forward << np.uint64(2)) | values
+        if canonical:
+            reverse |= (np.uint64(3) - values) << np.uint64(2 * i)
+
+    owners = batch.owners
+    starts = np.arange(windows)
+    # k-mer 的最後一個鹼基必須與第一個鹼基屬於同一條序列
+    # The last base of a k-mer must belong to the same sequence as its first base
+    valid = ~invalid & (owners[:windows] == owners[k - 1 :])
+    hashes = np.minimum(forward, reverse) if canonical else forward
+    owner = owners[:windows][valid]
+    return hashes[valid], owner, starts[valid] - batch.offsets[owner]
@@ -1,12 +1,41 @@
 """日誌工具模組
 
 Logger utility module.
+
+所有日誌紀錄都經由佇列送到主程序中唯一的監聽器, 由監聽器負責終端與檔案輸出; 子程序
+以相同的佇列送出紀錄, 因此不同程序的日誌不會交錯、遺失或競爭同一個檔案。日誌檔依大小
+輪替。每筆紀錄帶有目前的步驟與樣本 (見 log_context)。
+
+Every log record goes through a queue to a single listener in the main process, which does
+the console and file output. Worker processes send their records to the same queue, so lines
+from different processes never interleave, get lost or contend for the log file. The log file
+rotates by size. Each record carries the current stage and sample (see log_context).
 """
 
+import atexit
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
 import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import multiprocessing
+from multiprocessing.queues import Queue
 from pathlib import Path
 import sys
-from typing import ClassVar, Literal
+from typing import Any, ClassVar, Literal
+
+# 日誌檔輪替的大小上限與保留的舊檔數
+# Size limit before the log file rotates, and the number of old files kept
+LOG_MAX_BYTES = 10 * 1024**2
+LOG_BACKUP_COUNT = 5
+
+# 沒有步驟或樣本時顯示的值
+# Value shown when there is no stage or sample
+NO_CONTEXT = "-"
+
+_log_context: ContextVar[dict[str, str] | None] = ContextVar("log_context", default=None)
+_log_queue: Queue | None = None
+_listener: QueueListener | None = None
 
 
 class ColoredFormatter(logging.Formatter):
@@ -43,30 +72,149 @@ class ColoredFormatter(logging.Formatter):
         return result
 
 
+class ContextFilter(logging.Filter):
+    """為日誌紀錄加上目前的步驟與樣本
+
+    Add the current stage and sample to log records.
+
+    子程序送來的紀錄已帶有這些欄位, 不會被覆蓋。
+
+    Records sent by worker processes already carry these fields and are left unchanged.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """加上步驟與樣本欄位
+
+        Add the stage and sample fields.
+
+        Args:
+            record (logging.LogRecord): 日誌記錄 / Log record.
+
+        Returns:
+            bool: 一律為 True / Always True.
+        """
+        context = _log_context.get() or {}
+        for field in ("stage", "sample"):
+            if not hasattr(record, field):
+                setattr(record, field, context.get(field, NO_CONTEXT))
+        return True
+
+
+@contextmanager
+def log_context(**fields: str) -> Iterator[None]:
+    """在區塊內為日誌紀錄加上步驟或樣本等欄位
+
+    Attach fields such as the stage or sample to log records inside a block.
+
+    Args:
+        **fields (str): 欄位名稱與值 (stage、sample) / Field names and values (stage, sample).
+    """
+    token = _log_context.set({**(_log_context.get() or {}), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def current_log_context() -> dict[str, str]:
+    """取得目前的日誌欄位
+
+    Get the current log fields.
+
+    Returns:
+        dict[str, str]: 欄位名稱與值 / Field names and values.
+    """
+    return dict(_log_context.get() or {})
+
+
+def _install_queue_handler(queue: Queue, level: int) -> None:
+    """以佇列處理器取代根 Logger 的處理器
+
+    Replace the root logger handlers with a queue handler.
+
+    Args:
+        queue (Queue): 日誌佇列 / Log queue.
+        level (int): 日誌級別 / Log level.
+    """
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    root_logger.handlers.clear()
+    queue_handler = QueueHandler(queue)
+    queue_handler.addFilter(ContextFilter())
+    root_logger.addHandler(queue_handler)
+
+
+def _init_worker_logging(queue: Queue, level: int, context: dict[str, str]) -> None:
+    """子程序的日誌初始化 (ProcessPoolExecutor initializer)
+
+    Logging setup of a worker process, used as the ProcessPoolExecutor initializer.
+
+    Args:
+        queue (Queue): 主程序的日誌佇列 / Log queue of the main process.
+        level (int): 日誌級別 / Log level.
+        context (dict[str, str]): 建立子程序時的日誌欄位 / Log fields when the worker was
+            created.
+    """
+    _install_queue_handler(queue, level)
+    _log_context.set(context)
+
+
+def worker_logging() -> tuple[Callable[..., None] | None, tuple[Any, ...]]:
+    """取得讓子程序將日誌送回主程序的 initializer 與參數
+
+    Get the initializer and arguments that make worker processes send their logs to the main
+    process.
+
+    Returns:
+        tuple[Callable[..., None] | None, tuple[Any, ...]]: 未初始化佇列日誌時為 (None, ()) /
+        (None, ()) when queue logging is not initialized.
+    """
+    if _log_queue is None:
+        return None, ()
+    level = logging.getLogger().level
+    return _init_worker_logging, (_log_queue, level, current_log_context())
+
+
+def shutdown_logger() -> None:
+    """停止監聽器並輸出佇列中剩餘的紀錄
+
+    Stop the listener and flush the records left in the queue.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
 def init_logger(
     level: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = "INFO",
     log_file: Path | str | None = None,
     use_color: bool = True,
+    max_bytes: int = LOG_MAX_BYTES,
+    backup_count: int = LOG_BACKUP_COUNT,
 ) -> None:
     """初始化根 Logger
 
-    Initialize root logger (should be called once at application startup).
+    Initialize root logger (should be called once at application startup, in the main process).
 
     Args:
         level (Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]): 日誌級別 / Log level.
         log_file (Path | str | None): 日誌檔案路徑, None 表示不寫入檔案 / Log file path, None means no file output.
         use_color (bool): 是否在終端使用彩色輸出 / Whether to use colored output in terminal.
+        max_bytes (int): 日誌檔輪替的大小上限 / Size limit before the log file rotates.
+        backup_count (int): 保留的舊日誌檔數 / Number of old log files kept.
     """
-    root_logger = logging.getLogger()
-    root_logger.setLevel(getattr(logging, level))
-
-    if root_logger.handlers:
-        root_logger.handlers.clear()
+    global _log_queue, _listener
+    shutdown_logger()
 
     detailed_format = (
-        "%(asctime)s | %(levelname)-8s | %(filename)s:%(lineno)d | %(funcName)s() | %(message)s"
+        "%(asctime)s | %(levelname)-8s | %(processName)s | %(stage)s | %(sample)s | "
+        "%(filename)s:%(lineno)d | %(funcName)s() | %(message)s"
+    )
+    simple_format = (
+        "%(asctime)s | %(levelname)-8s | %(processName)s | %(stage)s | %(sample)s | "
+        "%(filename)s:%(lineno)d | %(message)s"
     )
-    simple_format = "%(asctime)s | %(levelname)-8s | %(filename)s:%(lineno)d | %(message)s"
     date_format = "%Y-%m-%d %H:%M:%S"
 
     console_handler = logging.StreamHandler(sys.stdout)
@@ -78,16 +226,24 @@ def init_logger(
         console_formatter = logging.Formatter(detailed_format, datefmt=date_format)
 
     console_handler.setFormatter(console_formatter)
-    root_logger.addHandler(console_handler)
+    handlers: list[logging.Handler] = [console_handler]
 
     if log_file:
         log_path = Path(log_file)
         log_path.parent.mkdir(parents=True, exist_ok=True)
-        file_handler = logging.FileHandler(log_path, encoding="utf-8", mode="a")
+        file_handler = RotatingFileHandler(
+            log_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
         file_handler.setLevel(getattr(logging, level))
         file_formatter = logging.Formatter(simple_format, datefmt=date_format)
         file_handler.setFormatter(file_formatter)
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    _log_queue = multiprocessing.Queue(-1)
+    _install_queue_handler(_log_queue, getattr(logging, level))
+    _listener = QueueListener(_log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logger)
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -0,0 +1,499 @@
+"""雙端讀序合併工具 (usearch -fastq_mergepairs 相容)
+
+Paired-end read merging compatible with ``usearch -fastq_mergepairs``.
+
+以 k-mer 對角線投票找出 R1 與 R2 反向互補序列的重疊位置, 再以向量化方式一次驗證整批讀序
+的錯配數與一致度; 票選對角線未通過的配對 (例如重疊區為串聯重複時) 改為逐一比對所有無空位
+的重疊, 與 usearch 相同。重疊區的品質分數依 Edgar & Flyvbjerg (2015) 的後驗機率計算。
+
+The R1 / reverse-complemented R2 overlap is located by k-mer diagonal voting, then the
+mismatches and identity of a whole batch are verified at once with NumPy. Pairs whose voted
+diagonal fails, for example with a tandem repeat in the overlap, fall back to scoring every
+ungapped overlap as usearch does. Qualities in the overlap are posterior probabilities
+following Edgar & Flyvbjerg (2015).
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from src.utils.fastx_utils import FastqRecord, format_fastq_records, iter_fastq_pair_batches
+from src.utils.kernel_utils import (
+    COMPLEMENT_TABLE,
+    MAX_QUALITY,
+    PHRED_OFFSET,
+    SequenceBatch,
+    kmer_hashes,
+)
+from src.utils.logger_utils import get_logger
+from src.utils.scheduler_utils import ordered_process_map
+
+logger = get_logger(__name__)
+
+# 輸入品質分數上限與輸出品質分數上限 (usearch -fastq_qmaxout 預設 41)
+# Highest input quality and highest output quality (usearch -fastq_qmaxout defaults to 41)
+MAX_INPUT_QUALITY = MAX_QUALITY
+MAX_OUTPUT_QUALITY = 41
+
+# 尋找重疊位置的 k-mer 長度
+# k-mer length used to locate the overlap
+SEED_KMER = 10
+
+# 找不到重疊時的位移
+# Offset of a pair without an overlap
+NO_OFFSET = np.iinfo(np.int64).min
+
+
+def _posterior_tables() -> tuple[np.ndarray, np.ndarray]:
+    """建立重疊區品質分數的後驗表
+
+    Build the posterior quality tables for the overlap.
+
+    一致時 P = (pX pY / 3) / (1 - pX - pY + 4 pX pY / 3);
+    不一致時取品質較高的鹼基 X, P = pX (1 - pY / 3) / (pX + pY - 4 pX pY / 3)。
+
+    Agreeing bases use P = (pX pY / 3) / (1 - pX - pY + 4 pX pY / 3); for disagreeing bases
+    the higher-quality base X wins with P = pX (1 - pY / 3) / (pX + pY - 4 pX pY / 3).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: 一致表 [qX, qY] 與不一致表 [q高, q低] /
+        Agreement table [qX, qY] and disagreement table [q_high, q_low].
+    """
+    q = np.arange(MAX_INPUT_QUALITY + 1, dtype=np.float64)
+    p = 10.0 ** (-q / 10.0)
+    px = p[:, None]
+    py = p[None, :]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        agree = (px * py / 3.0) / (1.0 - px - py + 4.0 * px * py / 3.0)
+        disagree = px * (1.0 - py / 3.0) / (px + py - 4.0 * px * py / 3.0)
+
+    def to_quality(prob: np.ndarray) -> np.ndarray:
+        prob = np.clip(np.nan_to_num(prob, nan=1.0), 1e-12, 1.0)
+        return np.clip(np.rint(-10.0 * np.log10(prob)), 0, MAX_OUTPUT_QUALITY).astype(np.uint8)
+
+    return to_quality(agree), to_quality(disagree)
+
+
+AGREE_QUALITY, DISAGREE_QUALITY = _posterior_tables()
+
+
+@dataclass(slots=True, frozen=True)
+class MergeSettings:
+    """合併參數 (預設值與 usearch 相同)
+
+    Merging parameters, defaulting to the usearch values.
+    """
+
+    min_overlap: int = 16
+    max_diffs: int = 5
+    min_pct_id: float = 90.0
+    # 是否合併 staggered 配對並修除突出端 (usearch -fastq_allowmergestagger), 預設丟棄
+    # Whether staggered pairs are merged with their overhangs trimmed
+    # (usearch -fastq_allowmergestagger); they are discarded by default
+    allow_stagger: bool = False
+
+
+@dataclass(slots=True)
+class MergeStats:
+    """合併統計
+
+    Merging statistics.
+    """
+
+    pairs: int = 0
+    merged: int = 0
+    no_alignment: int = 0
+    staggered: int = 0
+    too_many_diffs: int = 0
+
+    @property
+    def merged_pct(self) -> float:
+        """合併比例 (%)
+
+        Percentage of merged pairs.
+        """
+        return 100.0 * self.merged / self.pairs if self.pairs else 0.0
+
+    def merge(self, other: "MergeStats") -> None:
+        """合併另一批的統計
+
+        Merge the statistics of another batch.
+
+        Args:
+            other (MergeStats): 另一批統計 / Statistics of another batch.
+        """
+        self.pairs += other.pairs
+        self.merged += other.merged
+        self.no_alignment += other.no_alignment
+        self.staggered += other.staggered
+        self.too_many_diffs += other.too_many_diffs
+
+
+def _pack(seqs: list[bytes]) -> tuple[np.ndarray, np.ndarray]:
+    """將序列排成以 0 填充的矩陣
+
+    Pack sequences into a zero-padded matrix.
+
+    Args:
+        seqs (list[bytes]): 序列 / Sequences.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: 矩陣與長度 / Matrix and lengths.
+    """
+    lengths = np.fromiter(map(len, seqs), dtype=np.int64, count=len(seqs))
+    matrix = np.zeros((len(seqs), max(int(lengths.max(initial=0)), 1)), dtype=np.uint8)
+    flat = np.frombuffer(b"".join(seqs), dtype=np.uint8)
+    if flat.size:
+        rows = np.repeat(np.arange(len(seqs)), lengths)
+        cols = np.arange(flat.size) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        matrix[rows, cols] = flat
+    return matrix, lengths
+
+
+def _kmer_keys(seqs: list[bytes]) -> tuple[np.ndarray, np.ndarray]:
+    """計算每條序列所有 k-mer 的 (讀序編號, k-mer) 鍵值
+
+    Compute (read index, k-mer) keys for every k-mer of every sequence.
+
+    Args:
+        seqs (list[bytes]): 序列 / Sequences.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: 鍵值與 k-mer 起點 / Keys and k-mer start positions.
+    """
+    hashes, owners, starts = kmer_hashes(SequenceBatch.from_bytes(seqs), SEED_KMER)
+    keys = (owners << (2 * SEED_KMER)) | hashes.astype(np.int64)
+    return keys, starts
+
+
+def _find_offsets(seqs1: list[bytes], seqs2: list[bytes]) -> np.ndarray:
+    """以 k-mer 對角線投票找出每對讀序的重疊位移
+
+    Find each pair's overlap offset by k-mer diagonal voting.
+
+    位移 s 表示 R2 反向互補序列的第一個鹼基位於 R1 的位置 s。
+
+    An offset s means the first base of reverse-complemented R2 sits at R1 position s.
+
+    Args:
+        seqs1 (list[bytes]): R1 序列 / R1 sequences.
+        seqs2 (list[bytes]): R2 反向互補序列 / Reverse-complemented R2 sequences.
+
+    Returns:
+        np.ndarray: 每對讀序的位移 (找不到時為 NO_OFFSET) / Offset per pair (NO_OFFSET if none).
+    """
+    offsets = np.full(len(seqs1), NO_OFFSET, dtype=np.int64)
+
+    keys1, starts1 = _kmer_keys(seqs1)
+    keys2, starts2 = _kmer_keys(seqs2)
+    if keys1.size == 0 or keys2.size == 0:
+        return offsets
+
+    order = np.argsort(keys1, kind="stable")
+    keys1 = keys1[order]
+    starts1 = starts1[order]
+    idx = np.minimum(np.searchsorted(keys1, keys2), keys1.size - 1)
+    hit = keys1[idx] == keys2
+    if not hit.any():
+        return offsets
+
+    reads = keys2[hit] >> (2 * SEED_KMER)
+    diagonals = starts1[idx[hit]] - starts2[hit]
+
+    # 以 (讀序, 對角線) 計票, 每條讀序取票數最多的對角線
+    # Count votes per (read, diagonal) and keep each read's most voted diagonal
+    span = max(map(len, seqs2)) + 1
+    stride = max(map(len, seqs1)) + span
+    combined = reads * stride + diagonals + span
+    unique, counts = np.unique(combined, return_counts=True)
+    unique_reads = unique // stride
+    ranked = np.lexsort((counts, unique_reads))
+    last = np.r_[unique_reads[ranked][1:] != unique_reads[ranked][:-1], True]
+    best = ranked[last]
+    offsets[unique_reads[best]] = unique[best] % stride - span
+    return offsets
+
+
+def _overlap_diffs(
+    offsets: np.ndarray,
+    seq1: np.ndarray,
+    len1: np.ndarray,
+    seq2: np.ndarray,
+    len2: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """計算每對讀序在指定位移下的重疊範圍與錯配數 (含 N 的位置不計)
+
+    Compute each pair's overlap range and mismatches at the given offsets; positions with an
+    N are not counted.
+
+    Args:
+        offsets (np.ndarray): 每對讀序的位移 / Offset per pair.
+        seq1 (np.ndarray): R1 序列矩陣 / R1 sequence matrix.
+        len1 (np.ndarray): R1 長度 / R1 lengths.
+        seq2 (np.ndarray): R2 反向互補序列矩陣 / Reverse-complemented R2 sequence matrix.
+        len2 (np.ndarray): R2 長度 / R2 lengths.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: R1 上的重疊起點、終點、
+        重疊長度與錯配數 / Overlap start and end on R1, overlap length and mismatches.
+    """
+    start = np.maximum(offsets, 0)
+    end = np.minimum(len1, offsets + len2)
+    overlap = end - start
+
+    width = max(int(overlap.max(initial=0)), 1)
+    cols = np.arange(width)[None, :]
+    valid = cols < overlap[:, None]
+    idx1 = np.clip(start[:, None] + cols, 0, seq1.shape[1] - 1)
+    idx2 = np.clip(start[:, None] - offsets[:, None] + cols, 0, seq2.shape[1] - 1)
+    b1 = np.take_along_axis(seq1, idx1, axis=1)
+    b2 = np.take_along_axis(seq2, idx2, axis=1)
+    has_n = (b1 == ord("N")) | (b2 == ord("N"))
+    diffs = np.count_nonzero(valid & (b1 != b2) & ~has_n, axis=1)
+    return start, end, overlap, diffs
+
+
+def _passes(
+    offsets: np.ndarray,
+    overlap: np.ndarray,
+    diffs: np.ndarray,
+    len1: np.ndarray,
+    len2: np.ndarray,
+    settings: MergeSettings,
+) -> np.ndarray:
+    """位移是否通過重疊長度、staggered、錯配數與一致度的檢查
+
+    Whether offsets pass the overlap length, stagger, mismatch and identity checks.
+
+    Args:
+        offsets (np.ndarray): 位移 / Offsets.
+        overlap (np.ndarray): 重疊長度 / Overlap lengths.
+        diffs (np.ndarray): 錯配數 / Mismatches.
+        len1 (np.ndarray): R1 長度 / R1 lengths.
+        len2 (np.ndarray): R2 長度 / R2 lengths.
+        settings (MergeSettings): 合併參數 / Merging parameters.
+
+    Returns:
+        np.ndarray: 是否可合併 / Whether the pair can be merged.
+    """
+    pct_id = 100.0 * (overlap - diffs) / np.maximum(overlap, 1)
+    ok = (
+        (overlap >= settings.min_overlap)
+        & (diffs <= settings.max_diffs)
+        & (pct_id >= settings.min_pct_id)
+    )
+    if not settings.allow_stagger:
+        ok &= (offsets >= 0) & (offsets + len2 >= len1)
+    return ok
+
+
+def _scan_diagonals(
+    seq1: np.ndarray,
+    len1: np.ndarray,
+    seq2: np.ndarray,
+    len2: np.ndarray,
+    settings: MergeSettings,
+) -> np.ndarray:
+    """比對每對讀序所有無空位的重疊, 取可合併者中錯配最少、其次重疊最長的位移
+
+    Score every ungapped overlap of each pair and keep the passing offset with the fewest
+    mismatches, then the longest overlap.
+
+    Args:
+        seq1 (np.ndarray): R1 序列矩陣 / R1 sequence matrix.
+        len1 (np.ndarray): R1 長度 / R1 lengths.
+        seq2 (np.ndarray): R2 反向互補序列矩陣 / Reverse-complemented R2 sequence matrix.
+        len2 (np.ndarray): R2 長度 / R2 lengths.
+        settings (MergeSettings): 合併參數 / Merging parameters.
+
+    Returns:
+        np.ndarray: 每對讀序的位移 (沒有可合併的重疊時為 NO_OFFSET) / Offset per pair
+        (NO_OFFSET without a passing overlap).
+    """
+    n = len(len1)
+    best = np.full(n, NO_OFFSET, dtype=np.int64)
+    best_diffs = np.full(n, np.iinfo(np.int64).max, dtype=np.int64)
+    best_overlap = np.zeros(n, dtype=np.int64)
+
+    first = 0 if not settings.allow_stagger else settings.min_overlap - seq2.shape[1]
+    for offset in range(first, seq1.shape[1] - settings.min_overlap + 1):
+        offsets = np.full(n, offset, dtype=np.int64)
+        _, _, overlap, diffs = _overlap_diffs(offsets, seq1, len1, seq2, len2)
+        better = _passes(offsets, overlap, diffs, len1, len2, settings) & (
+            (diffs < best_diffs) | ((diffs == best_diffs) & (overlap > best_overlap))
+        )
+        best[better] = offset
+        best_diffs[better] = diffs[better]
+        best_overlap[better] = overlap[better]
+    return best
+
+
+def merge_records(
+    batch1: list[FastqRecord], batch2: list[FastqRecord], settings: MergeSettings
+) -> tuple[list[FastqRecord], MergeStats]:
+    """合併一批配對讀序並回傳合併後的紀錄
+
+    Merge one batch of read pairs and return the merged records.
+
+    Args:
+        batch1 (list[FastqRecord]): R1 紀錄 / R1 records.
+        batch2 (list[FastqRecord]): R2 紀錄 / R2 records.
+        settings (MergeSettings): 合併參數 / Merging parameters.
+
+    Returns:
+        tuple[list[FastqRecord], MergeStats]: 合併後的紀錄與統計 / Merged records and statistics.
+    """
+    n = len(batch1)
+    stats = MergeStats(pairs=n)
+
+    seqs1 = [record[1] for record in batch1]
+    seqs2 = [record[1].translate(COMPLEMENT_TABLE)[::-1] for record in batch2]
+    seq1, len1 = _pack(seqs1)
+    qual1, _ = _pack([record[2] for record in batch1])
+    seq2, len2 = _pack(seqs2)
+    qual2, _ = _pack([record[2][::-1] for record in batch2])
+
+    offsets = _find_offsets(seqs1, seqs2)
+    found = offsets != NO_OFFSET
+    offsets = np.where(found, offsets, 0)
+    start, end, overlap, diffs = _overlap_diffs(offsets, seq1, len1, seq2, len2)
+
+    # 票選對角線未通過的配對改為比對所有重疊 (重複序列可能使票選落在錯誤的對角線)
+    # Pairs failing on the voted diagonal are scored on every overlap, since repeats can
+    # make the vote land on a wrong diagonal
+    failed = np.flatnonzero(~(found & _passes(offsets, overlap, diffs, len1, len2, settings)))
+    if failed.size:
+        rescued = _scan_diagonals(seq1[failed], len1[failed], seq2[failed], len2[failed], settings)
+        hit = rescued != NO_OFFSET
+        if hit.any():
+            offsets[failed[hit]] = rescued[hit]
+            found[failed[hit]] = True
+            start, end, overlap, diffs = _overlap_diffs(offsets, seq1, len1, seq2, len2)
+
+    aligned = found & (overlap >= settings.min_overlap)
+    stats.no_alignment = int(n - aligned.sum())
+
+    # R2 反向互補序列起點早於 R1, 或 R1 延伸超過 R2 反向互補序列終點 (讀穿插入片段)
+    # 時為 staggered; 與 usearch 相同, 預設不合併
+    # A pair is staggered when reverse-complemented R2 starts before R1 or R1 runs past
+    # its end (reading through the insert); like usearch, such pairs are not merged by default
+    if not settings.allow_stagger:
+        staggered = aligned & ((offsets < 0) | (offsets + len2 < len1))
+        stats.staggered = int(staggered.sum())
+        aligned &= ~staggered
+
+    merged = aligned & _passes(offsets, overlap, diffs, len1, len2, settings)
+    stats.too_many_diffs = int((aligned & ~merged).sum())
+    stats.merged = int(merged.sum())
+
+    width = max(int(overlap[merged].max(initial=0)), 1)
+    cols = np.arange(width)[None, :]
+    idx1 = np.clip(start[:, None] + cols, 0, seq1.shape[1] - 1)
+    idx2 = np.clip(start[:, None] - offsets[:, None] + cols, 0, seq2.shape[1] - 1)
+
+    b1 = np.take_along_axis(seq1, idx1, axis=1)
+    b2 = np.take_along_axis(seq2, idx2, axis=1)
+    q1 = np.clip(
+        np.take_along_axis(qual1, idx1, axis=1).astype(np.int64) - PHRED_OFFSET,
+        0,
+        MAX_INPUT_QUALITY,
+    )
+    q2 = np.clip(
+        np.take_along_axis(qual2, idx2, axis=1).astype(np.int64) - PHRED_OFFSET,
+        0,
+        MAX_INPUT_QUALITY,
+    )
+
+    agree = b1 == b2
+    first_wins = q1 >= q2
+    consensus = np.where(agree | first_wins, b1, b2)
+    quality = np.where(
+        agree,
+        AGREE_QUALITY[q1, q2],
+        DISAGREE_QUALITY[np.maximum(q1, q2), np.minimum(q1, q2)],
+    ) + np.uint8(PHRED_OFFSET)
+
+    records: list[FastqRecord] = []
+    for i in np.flatnonzero(merged).tolist():
+        header, r1_seq, r1_qual = batch1[i]
+        s, a, b, ov = int(offsets[i]), int(start[i]), int(end[i]), int(overlap[i])
+        tail = slice(b - s, int(len2[i]))
+        r2_seq = seq2[i, tail].tobytes()
+        r2_qual = qual2[i, tail].tobytes()
+        records.append(
+            (
+                header,
+                r1_seq[:a] + consensus[i, :ov].tobytes() + r2_seq,
+                r1_qual[:a] + quality[i, :ov].tobytes() + r2_qual,
+            )
+        )
+    return records, stats
+
+
+def _merge_batch(
+    batch1: list[FastqRecord], batch2: list[FastqRecord], settings: MergeSettings
+) -> tuple[bytes, MergeStats]:
+    """合併一批配對讀序並格式化輸出 (可於子程序中執行)
+
+    Merge one batch of read pairs and format the output; safe to run in a worker process.
+
+    Args:
+        batch1 (list[FastqRecord]): R1 紀錄 / R1 records.
+        batch2 (list[FastqRecord]): R2 紀錄 / R2 records.
+        settings (MergeSettings): 合併參數 / Merging parameters.
+
+    Returns:
+        tuple[bytes, MergeStats]: 合併後的 FASTQ 與統計 / Merged FASTQ and statistics.
+    """
+    records, stats = merge_records(batch1, batch2, settings)
+    return format_fastq_records(records), stats
+
+
+def merge_pairs(
+    r1_path: Path,
+    r2_path: Path,
+    output_fastq: Path,
+    settings: MergeSettings | None = None,
+    cores: int = 1,
+) -> MergeStats:
+    """合併雙端讀序並寫出 FASTQ
+
+    Merge paired-end reads and write a FASTQ file.
+
+    合併讀序保留 R1 的標頭。讀序超出另一條讀序端點的 staggered 配對會被丟棄;
+    settings.allow_stagger 為 True 時改為修除突出部分後合併。
+
+    Merged reads keep the R1 header. Staggered pairs, where a read runs past the other
+    read's end, are discarded unless settings.allow_stagger is set, which trims the
+    overhangs instead.
+
+    Args:
+        r1_path (Path): R1 檔案路徑 / R1 file path.
+        r2_path (Path): R2 檔案路徑 / R2 file path.
+        output_fastq (Path): 輸出 FASTQ 路徑 / Output FASTQ path.
+        settings (MergeSettings | None): 合併參數 / Merging parameters.
+        cores (int): 使用的核心數 / Number of cores.
+
+    Returns:
+        MergeStats: 合併統計 / Merging statistics.
+    """
+    settings = settings or MergeSettings()
+    stats = MergeStats()
+
+    with open(output_fastq, "wb") as f_out:
+        batches = (
+            (batch1, batch2, settings)
+            for batch1, batch2 in iter_fastq_pair_batches(r1_path, r2_path)
+        )
+        for chunk, batch_stats in ordered_process_map(_merge_batch, batches, cores):
+            f_out.write(chunk)
+            stats.merge(batch_stats)
+
+    logger.info(
+        f"合併完成: {stats.pairs} 對讀序, 合併 {stats.merged} ({stats.merged_pct:.1f}%), "
+        f"無重疊 {stats.no_alignment}, staggered {stats.staggered}, "
+        f"差異過多 {stats.too_many_diffs}"
+    )
+    return stats
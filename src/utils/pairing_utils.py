@@ -0,0 +1,306 @@
+"""配對輸入檔案的預檢
+
+Pre-flight checks of paired input files.
+
+依檔名中的 R1 / R2 標記配對檔案 (而非依排序後兩兩一組), 再以串流方式同步掃描每一對
+檔案, 確認讀序數與讀序 ID 一致、檔案沒有被截斷。各樣本於子程序中平行檢查, 任何問題
+都會在昂貴的步驟開始前回報。
+
+Files are paired by the R1 / R2 token in their names rather than two at a time in sorted
+order. Every pair is then streamed in lockstep to confirm that read counts and read IDs agree
+and that neither file is truncated. Samples are checked in parallel worker processes and any
+problem is reported before an expensive stage starts.
+
+需要輸入品質檢查時, 品質統計在同一次掃描中累計, 每個 FASTQ 只讀取一次。
+
+When the input QC is wanted, its statistics are accumulated in the same scan, so every FASTQ
+is read only once.
+"""
+
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+import re
+from typing import Any
+
+import natsort
+import numpy as np
+
+from src.utils.fastx_index_utils import gather_lines, iter_fastq_line_blocks
+from src.utils.logger_utils import get_logger
+from src.utils.qc_utils import FastqQC, summarize_pair
+from src.utils.scheduler_utils import ordered_process_map
+
+logger = get_logger(__name__)
+
+FASTQ_SUFFIX_PATTERN = r"\.(?:fastq|fq)(?:\.gz)?"
+FASTQ_NAME_PATTERN = re.compile(rf".*{FASTQ_SUFFIX_PATTERN}$", re.IGNORECASE)
+
+# 讀序標記的檔名規則: 先比對 Illumina 命名 (..._R1_001.fastq), 再比對 ..._1.fastq
+# File name patterns of the read token: Illumina names (..._R1_001.fastq) first, then ..._1.fastq
+READ_PATTERNS = (
+    re.compile(
+        rf"^(?P<prefix>.*[._-])R(?P<read>[12])(?P<suffix>(?:[._-]\d+)?{FASTQ_SUFFIX_PATTERN})$",
+        re.IGNORECASE,
+    ),
+    re.compile(
+        rf"^(?P<prefix>.*[._-])(?P<read>[12])(?P<suffix>{FASTQ_SUFFIX_PATTERN})$", re.IGNORECASE
+    ),
+)
+
+HEADER_MARKER = ord("@")
+SEPARATOR_MARKER = ord("+")
+MATE_SEPARATOR = ord("/")
+MATE_DIGITS = (ord("1"), ord("2"))
+SPACE = ord(" ")
+TAB = ord("\t")
+
+
+@dataclass(slots=True, frozen=True)
+class ReadPair:
+    """一個樣本的 R1 / R2 檔案
+
+    The R1 / R2 files of one sample.
+    """
+
+    sample: str
+    r1: Path
+    r2: Path
+
+
+@dataclass(slots=True, frozen=True)
+class PairCheck:
+    """一對檔案的預檢結果
+
+    Pre-flight result of one file pair.
+
+    發現錯誤時即停止掃描, 讀序數為停止時已讀取的數量。
+
+    Scanning stops at the first error, so read counts are those seen up to that point.
+    """
+
+    pair: ReadPair
+    r1_reads: int
+    r2_reads: int
+    error: str | None = None
+    # 一併累計的輸入品質檢查結果 (未要求或掃描未完成時為 None)
+    # Input QC accumulated along the way; None when not requested or the scan did not finish
+    qc: dict[str, Any] | None = None
+
+    @property
+    def ok(self) -> bool:
+        """是否通過預檢
+
+        Whether the pair passed the pre-flight check.
+        """
+        return self.error is None
+
+
+def is_fastq_file(path: Path) -> bool:
+    """檔名是否為可配對的 FASTQ (.fastq / .fq, 可加 .gz)
+
+    Whether a file name is a FASTQ that can be paired: .fastq or .fq, optionally gzipped.
+
+    Args:
+        path (Path): 檔案路徑 / File path.
+
+    Returns:
+        bool: 是否為 FASTQ / Whether the file is a FASTQ.
+    """
+    return FASTQ_NAME_PATTERN.match(path.name) is not None
+
+
+def pair_fastq_files(files: Sequence[Path]) -> tuple[list[ReadPair], list[str]]:
+    """依檔名中的 R1 / R2 標記配對檔案
+
+    Pair files by the R1 / R2 token in their names.
+
+    Args:
+        files (Sequence[Path]): FASTQ 檔案 / FASTQ files.
+
+    Returns:
+        tuple[list[ReadPair], list[str]]: 依樣本名稱自然排序的配對, 以及無法配對的問題描述 /
+        Pairs in natural sample order and descriptions of files that could not be paired.
+    """
+    slots: dict[tuple[str, str], dict[str, Path]] = {}
+    problems: list[str] = []
+
+    for path in files:
+        match = next(
+            (m for pattern in READ_PATTERNS if (m := pattern.match(path.name)) is not None), None
+        )
+        if match is None:
+            problems.append(f"無法從檔名判斷 R1 / R2: {path.name}")
+            continue
+        slot = slots.setdefault((match["prefix"], match["suffix"].lower()), {})
+        if match["read"] in slot:
+            problems.append(f"重複的 R{match['read']}: {slot[match['read']].name} / {path.name}")
+            continue
+        slot[match["read"]] = path
+
+    pairs: list[ReadPair] = []
+    for (prefix, _), slot in slots.items():
+        if "1" not in slot or "2" not in slot:
+            present = next(iter(slot.values()))
+            problems.append(f"缺少配對的 R{'2' if '1' in slot else '1'}: {present.name}")
+            continue
+        pairs.append(ReadPair(sample=prefix.rstrip("._-"), r1=slot["1"], r2=slot["2"]))
+
+    return natsort.natsorted(pairs, key=lambda pair: pair.r1.name), problems
+
+
+def iter_read_ids(fastq_path: Path, qc: FastqQC | None = None) -> Iterator[list[bytes]]:
+    """分批讀取讀序 ID (標頭第一個空白前的部分, 去除 /1 或 /2) 並檢查紀錄格式
+
+    Read read IDs in batches, checking the record layout along the way. An ID is the header up
+    to its first blank, without a trailing /1 or /2.
+
+    Args:
+        fastq_path (Path): FASTQ 檔案路徑 / FASTQ file path.
+        qc (FastqQC | None): 一併累計品質字串的統計 / Statistics that also accumulate the
+            quality strings.
+
+    Yields:
+        list[bytes]: 一批讀序 ID / A batch of read IDs.
+
+    Raises:
+        ValueError: 紀錄格式錯誤或檔案被截斷時 / When a record is malformed or the file is
+            truncated.
+    """
+    seen = 0
+    for buffer, line_starts, line_ends in iter_fastq_line_blocks(fastq_path):
+        header_starts = line_starts[:, 0]
+        header_ends = line_ends[:, 0]
+        separator_starts = line_starts[:, 2]
+        valid = (
+            (header_ends > header_starts)
+            & (buffer[header_starts] == HEADER_MARKER)
+            & (line_ends[:, 2] > separator_starts)
+            & (buffer[separator_starts] == SEPARATOR_MARKER)
+            & (line_ends[:, 1] - line_starts[:, 1] == line_ends[:, 3] - line_starts[:, 3])
+        )
+        if not valid.all():
+            bad = seen + int(np.flatnonzero(~valid)[0]) + 1
+            raise ValueError(f"第 {bad} 筆紀錄格式錯誤: {fastq_path.name}")
+        if qc is not None:
+            qc.update(gather_lines(buffer, line_starts[:, 3], line_ends[:, 3]))
+
+        # ID 於標頭的第一個空白處結束
+        # The ID ends at the first blank of the header
+        blanks = np.flatnonzero((buffer == SPACE) | (buffer == TAB))
+        blanks = np.append(blanks, buffer.size)
+        id_ends = np.minimum(blanks[np.searchsorted(blanks, header_starts)], header_ends)
+        has_mate = (
+            (id_ends - header_starts >= 3)
+            & (buffer[id_ends - 2] == MATE_SEPARATOR)
+            & np.isin(buffer[id_ends - 1], MATE_DIGITS)
+        )
+        id_ends -= 2 * has_mate
+
+        raw = buffer.tobytes()
+        seen += len(header_starts)
+        yield [
+            raw[start + 1 : end]
+            for start, end in zip(header_starts.tolist(), id_ends.tolist(), strict=True)
+        ]
+
+
+def check_read_pair(pair: ReadPair, with_qc: bool = False) -> PairCheck:
+    """同步掃描一對檔案, 檢查讀序數與讀序 ID 是否一致
+
+    Stream a file pair in lockstep and check that read counts and read IDs agree.
+
+    Args:
+        pair (ReadPair): R1 / R2 檔案 / R1 / R2 files.
+        with_qc (bool): 是否一併累計輸入品質檢查 / Whether to accumulate the input QC as well.
+
+    Returns:
+        PairCheck: 預檢結果 / Pre-flight result.
+    """
+    qcs = (FastqQC(), FastqQC()) if with_qc else (None, None)
+    streams = (iter_read_ids(pair.r1, qcs[0]), iter_read_ids(pair.r2, qcs[1]))
+    pending: list[list[bytes]] = [[], []]
+    counts = [0, 0]
+    exhausted = [False, False]
+    compared = 0
+
+    try:
+        while True:
+            for side in (0, 1):
+                if not pending[side] and not exhausted[side]:
+                    ids = next(streams[side], None)
+                    if ids is None:
+                        exhausted[side] = True
+                    else:
+                        pending[side] = ids
+                        counts[side] += len(ids)
+
+            size = min(len(pending[0]), len(pending[1]))
+            if size == 0:
+                if pending[0] or pending[1]:
+                    # 其中一個檔案已讀完, 讀完另一個以回報完整的讀序數
+                    # One file has ended; finish the other to report its full read count
+                    side = 0 if pending[0] else 1
+                    counts[side] += sum(len(ids) for ids in streams[side])
+                    error = f"R1 與 R2 的讀序數不一致 ({counts[0]} / {counts[1]})"
+                    return PairCheck(pair, counts[0], counts[1], error, _pair_qc(pair, qcs))
+                return PairCheck(pair, counts[0], counts[1], qc=_pair_qc(pair, qcs))
+
+            ids1, ids2 = pending[0][:size], pending[1][:size]
+            if ids1 != ids2:
+                index = next(i for i, (a, b) in enumerate(zip(ids1, ids2, strict=True)) if a != b)
+                error = (
+                    f"第 {compared + index + 1} 筆讀序 ID 不一致: "
+                    f"{ids1[index].decode(errors='replace')} / {ids2[index].decode(errors='replace')}"
+                )
+                return PairCheck(pair, counts[0], counts[1], error)
+            pending = [pending[0][size:], pending[1][size:]]
+            compared += size
+    except (OSError, ValueError, EOFError) as e:
+        return PairCheck(pair, counts[0], counts[1], str(e))
+
+
+def _pair_qc(pair: ReadPair, qcs: tuple[FastqQC | None, FastqQC | None]) -> dict | None:
+    """整理完整掃描後的品質統計
+
+    Summarize the statistics of a completed scan.
+
+    Args:
+        pair (ReadPair): R1 / R2 檔案 / R1 / R2 files.
+        qcs (tuple[FastqQC | None, FastqQC | None]): R1 與 R2 統計 / R1 and R2 statistics.
+
+    Returns:
+        dict | None: 品質檢查結果 (未累計時為 None) / QC result, None when not accumulated.
+    """
+    qc1, qc2 = qcs
+    if qc1 is None or qc2 is None:
+        return None
+    return summarize_pair(pair.r1, qc1, pair.r2, qc2)
+
+
+def preflight_read_pairs(
+    pairs: Sequence[ReadPair], workers: int = 1, with_qc: bool = False
+) -> list[PairCheck]:
+    """平行預檢所有樣本的 R1 / R2
+
+    Pre-flight the R1 / R2 files of every sample in parallel.
+
+    Args:
+        pairs (Sequence[ReadPair]): 樣本檔案配對 / Sample file pairs.
+        workers (int): 子程序數 / Number of worker processes.
+        with_qc (bool): 是否一併累計輸入品質檢查 (結果存於 PairCheck.qc) / Whether to
+            accumulate the input QC as well, stored in PairCheck.qc.
+
+    Returns:
+        list[PairCheck]: 依輸入順序的預檢結果 / Pre-flight results in input order.
+    """
+    workers = max(min(workers, len(pairs)), 1)
+    checks = list(
+        ordered_process_map(check_read_pair, ((pair, with_qc) for pair in pairs), workers)
+    )
+    for check in checks:
+        if check.ok:
+            logger.debug(f"預檢通過: {check.pair.sample} ({check.r1_reads} 對讀序)")
+        else:
+            logger.error(f"預檢失敗: {check.pair.sample}: {check.error}")
+    return checks
@@ -95,6 +95,17 @@ def get_blastn_path() -> Path:
     return get_project_root() / "dependencies" / "blast+" / "bin" / "blastn.exe"
 
 
+def get_blastdbcmd_path() -> Path:
+    """取得 blastdbcmd.exe 路徑
+
+    Get the blastdbcmd.exe path.
+
+    Returns:
+        Path: blastdbcmd.exe 路徑 / blastdbcmd.exe path.
+    """
+    return get_project_root() / "dependencies" / "blast+" / "bin" / "blastdbcmd.exe"
+
+
 def get_trimmomatic_path() -> Path:
     """取得 Trimmomatic jar 檔案路徑
 
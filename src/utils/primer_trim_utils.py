@@ -0,0 +1,1055 @@
+"""雙端引子修剪工具 (cutadapt 連結式接頭相容)
+
+Paired-end primer trimming compatible with cutadapt linked adapters.
+
+對應 ``cutadapt -a FWD...REV -A REV'...FWD' --discard-untrimmed``: 未錨定的連結式接頭兩端
+皆非必要, 找到 5' 或 3' 引子任一端即算修剪成功 (5' 引子找到時, 3' 引子只在其後尋找);
+兩條讀序皆修剪成功的配對才會保留 (雙端 -a/-A 的預設 --pair-filter=any)。整批讀序先以
+Myers 位元平行演算法篩選可能含有引子者, 再以逐欄向量化的動態規劃重現 cutadapt 的比對計分
+與位置選擇 (錯配與插入/缺失); 引子可包含 IUPAC 簡併碼。
+
+Mirrors ``cutadapt -a FWD...REV -A REV'...FWD' --discard-untrimmed``. Neither end of an
+un-anchored linked adapter is required, so a read counts as trimmed when its 5' or its 3'
+primer is found; when the 5' primer is found, the 3' primer is only searched after it. A pair
+is kept only when both reads were trimmed, the default --pair-filter=any for paired -a/-A.
+Whole batches of reads are first screened with Myers' bit-parallel algorithm, then a
+column-wise vectorized dynamic programming reproduces cutadapt's alignment scoring and choice
+of position (mismatches and indels); primers may contain IUPAC degenerate codes.
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+import json
+from pathlib import Path
+import platform
+
+import numpy as np
+
+from src.utils.fastx_utils import FastqRecord, format_fastq_records, iter_fastq_pair_batches
+from src.utils.logger_utils import get_logger
+from src.utils.scheduler_utils import ordered_process_map
+from src.utils.sequence_utils import IUPAC_CODES, reverse_complement
+
+logger = get_logger(__name__)
+
+# cutadapt 的預設最大錯誤率與最小重疊長度
+# cutadapt's default maximum error rate and minimum overlap
+DEFAULT_ERROR_RATE = 0.1
+DEFAULT_MIN_OVERLAP = 3
+
+# 位元平行比對使用 64 位元字組, 引子長度上限為 64
+# Bit-parallel matching uses one 64-bit word, so primers are limited to 64 bases
+MAX_PRIMER_LENGTH = 64
+
+# 批次矩陣中的填充代碼: 0 不匹配任何鹼基, 1 匹配所有鹼基 (用於部分重疊)
+# Padding codes in the batch matrix: 0 matches nothing, 1 matches anything (partial overlaps)
+END_CODE = 0
+WILDCARD_CODE = 1
+
+# 3' 引子相鄰鹼基統計記錄的鹼基
+# Bases tracked by the adjacent-base statistics of 3' primers
+ADJACENT_BASES = ("A", "C", "G", "T")
+
+# 報告相容的 cutadapt 版本與 JSON 格式版本
+# cutadapt version and JSON schema version the report is compatible with
+CUTADAPT_COMPAT_VERSION = "4.0"
+REPORT_SCHEMA_VERSION = [0, 3]
+
+
+@dataclass(slots=True, frozen=True)
+class LinkedAdapter:
+    """連結式接頭 (5' 引子...3' 引子)
+
+    Linked adapter (5' primer ... 3' primer).
+    """
+
+    front: str
+    back: str
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "LinkedAdapter":
+        """由 cutadapt 格式 "FRONT...BACK" 建立
+
+        Build from the cutadapt "FRONT...BACK" notation.
+
+        Args:
+            spec (str): 接頭描述 / Adapter specification.
+
+        Returns:
+            LinkedAdapter: 連結式接頭 / Linked adapter.
+
+        Raises:
+            ValueError: 格式錯誤或引子過長時 / When malformed or a primer is too long.
+        """
+        front, sep, back = spec.upper().partition("...")
+        if not sep or not front or not back:
+            raise ValueError(f"連結式接頭格式錯誤: {spec}")
+        for primer in (front, back):
+            if len(primer) > MAX_PRIMER_LENGTH:
+                raise ValueError(f"引子長度超過 {MAX_PRIMER_LENGTH}: {primer}")
+            if unknown := set(primer) - IUPAC_CODES.keys():
+                raise ValueError(f"引子包含無效的 IUPAC 代碼 {sorted(unknown)}: {primer}")
+        return cls(front=front, back=back)
+
+    @classmethod
+    def primer_pair(cls, forward: str, reverse: str) -> tuple["LinkedAdapter", "LinkedAdapter"]:
+        """建立 R1 與 R2 的接頭 (與 NGS 流程的 cutadapt 參數相同)
+
+        Build the R1 and R2 adapters, matching the cutadapt arguments of the NGS workflow.
+
+        Args:
+            forward (str): 正向引子 / Forward primer.
+            reverse (str): 反向引子 / Reverse primer.
+
+        Returns:
+            tuple[LinkedAdapter, LinkedAdapter]: R1 與 R2 接頭 / R1 and R2 adapters.
+        """
+        return (
+            cls.from_spec(f"{forward}...{reverse}"),
+            cls.from_spec(f"{reverse_complement(reverse)}...{reverse_complement(forward)}"),
+        )
+
+    @property
+    def spec(self) -> str:
+        """cutadapt 格式的接頭描述
+
+        Adapter specification in cutadapt notation.
+        """
+        return f"{self.front}...{self.back}"
+
+
+@dataclass(slots=True, frozen=True)
+class PrimerTrimSettings:
+    """引子修剪參數
+
+    Primer trimming parameters.
+    """
+
+    error_rate: float = DEFAULT_ERROR_RATE
+    min_overlap: int = DEFAULT_MIN_OVERLAP
+
+
+@dataclass(slots=True)
+class EndStats:
+    """單一引子端的比對統計
+
+    Match statistics of one primer end.
+    """
+
+    # (移除長度, 錯誤數) -> 讀序數
+    # (removed length, errors) -> read count
+    trimmed: Counter = field(default_factory=Counter)
+    # 3' 引子前一個鹼基 -> 讀序數
+    # Base preceding a 3' primer -> read count
+    adjacent: Counter = field(default_factory=Counter)
+
+    def merge(self, other: "EndStats") -> None:
+        """合併另一批的統計
+
+        Merge the statistics of another batch.
+
+        Args:
+            other (EndStats): 另一批統計 / Statistics of another batch.
+        """
+        self.trimmed.update(other.trimmed)
+        self.adjacent.update(other.adjacent)
+
+
+@dataclass(slots=True)
+class PrimerTrimStats:
+    """引子修剪統計
+
+    Primer trimming statistics.
+    """
+
+    input_pairs: int = 0
+    output_pairs: int = 0
+    read1_with_adapter: int = 0
+    read2_with_adapter: int = 0
+    input_bp: list[int] = field(default_factory=lambda: [0, 0])
+    output_bp: list[int] = field(default_factory=lambda: [0, 0])
+    ends: dict[str, EndStats] = field(
+        default_factory=lambda: {
+            key: EndStats() for key in ("read1_front", "read1_back", "read2_front", "read2_back")
+        }
+    )
+
+    @property
+    def discarded_pairs(self) -> int:
+        """因未修剪而丟棄的配對數
+
+        Number of pairs discarded as untrimmed.
+        """
+        return self.input_pairs - self.output_pairs
+
+    def merge(self, other: "PrimerTrimStats") -> None:
+        """合併另一批的統計
+
+        Merge the statistics of another batch.
+
+        Args:
+            other (PrimerTrimStats): 另一批統計 / Statistics of another batch.
+        """
+        self.input_pairs += other.input_pairs
+        self.output_pairs += other.output_pairs
+        self.read1_with_adapter += other.read1_with_adapter
+        self.read2_with_adapter += other.read2_with_adapter
+        for i in range(2):
+            self.input_bp[i] += other.input_bp[i]
+            self.output_bp[i] += other.output_bp[i]
+        for key, end_stats in other.ends.items():
+            self.ends[key].merge(end_stats)
+
+
+@lru_cache(maxsize=32)
+def _match_table(pattern: str) -> np.ndarray:
+    """建立讀序位元組與引子各位置的匹配表
+
+    Build the table of which read bytes match each primer position.
+
+    Args:
+        pattern (str): 引子序列 (IUPAC) / Primer sequence (IUPAC).
+
+    Returns:
+        np.ndarray: (256, 引子長度) 的布林矩陣 / (256, primer length) boolean matrix.
+    """
+    table = np.zeros((256, len(pattern)), dtype=bool)
+    for i, code in enumerate(pattern):
+        # 引子中的 N 也匹配讀序中的 N
+        # An N in the primer also matches an N in the read
+        for base in IUPAC_CODES[code] + ("N" if code == "N" else ""):
+            table[ord(base), i] = True
+            table[ord(base.lower()), i] = True
+    return table
+
+
+@lru_cache(maxsize=32)
+def _compile_pattern(pattern: str) -> np.ndarray:
+    """建立位元平行比對的 Peq 表 (以讀序位元組索引)
+
+    Build the Peq table for bit-parallel matching, indexed by read byte.
+
+    Args:
+        pattern (str): 引子序列 (IUPAC) / Primer sequence (IUPAC).
+
+    Returns:
+        np.ndarray: 長度 256 的 uint64 位元遮罩 / 256 uint64 bit masks.
+    """
+    bits = np.left_shift(np.uint64(1), np.arange(len(pattern), dtype=np.uint64))
+    peq = np.bitwise_or.reduce(np.where(_match_table(pattern), bits, np.uint64(0)), axis=1)
+    peq[WILDCARD_CODE] = np.uint64((1 << len(pattern)) - 1)
+    return peq
+
+
+def _pack_batch(seqs: list[bytes], pad: int) -> tuple[np.ndarray, np.ndarray]:
+    """將一批序列排成矩陣, 前方填入萬用代碼, 後方填入結束代碼
+
+    Pack a batch of sequences into a matrix with wildcard left padding and end-code filling.
+
+    Args:
+        seqs (list[bytes]): 序列 / Sequences.
+        pad (int): 前方萬用代碼的寬度 / Width of the wildcard left padding.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: 序列矩陣與長度 / Sequence matrix and lengths.
+    """
+    lengths = np.fromiter(map(len, seqs), dtype=np.int64, count=len(seqs))
+    width = pad + int(lengths.max(initial=0))
+    texts = np.full((len(seqs), width), END_CODE, dtype=np.uint8)
+    texts[:, :pad] = WILDCARD_CODE
+
+    flat = np.frombuffer(b"".join(seqs), dtype=np.uint8)
+    if flat.size:
+        rows = np.repeat(np.arange(len(seqs)), lengths)
+        starts = np.cumsum(lengths) - lengths
+        cols = pad + np.arange(flat.size) - np.repeat(starts, lengths)
+        texts[rows, cols] = flat
+    return texts, lengths
+
+
+def _n_prefix(pattern: str) -> np.ndarray:
+    """引子各前綴中 N 的數目 (cutadapt 計算錯誤率時不計入 N)
+
+    Number of Ns in every prefix of the primer; cutadapt leaves Ns out of the error rate.
+
+    Args:
+        pattern (str): 引子序列 / Primer sequence.
+
+    Returns:
+        np.ndarray: 長度為引子長度 + 1 的累計數 / Cumulative counts, primer length + 1 long.
+    """
+    return np.concatenate(([0], np.cumsum([code == "N" for code in pattern]))).astype(np.int32)
+
+
+def _find_candidates(
+    pattern: str, seqs: list[bytes], settings: PrimerTrimSettings, front: bool
+) -> tuple[np.ndarray, np.ndarray]:
+    """以 Myers 位元平行演算法找出可能含有引子的讀序
+
+    Find the reads that may contain the primer with Myers' bit-parallel algorithm.
+
+    每一欄同時更新所有讀序的位元向量, 得到每個位置的最小編輯距離。這是 cutadapt 接受條件的
+    上界篩選: 沒有候選位置的讀序不可能比對成功。5' 引子 (front=True) 以前方的萬用填充允許
+    引子只與讀序開頭部分重疊 (至少重疊最小長度); 3' 引子另以最後一欄的垂直差值檢查與讀序
+    結尾的部分重疊。
+
+    Every column updates the bit vectors of all reads at once and yields the minimum edit
+    distance at each position. This over-approximates cutadapt's acceptance test: a read
+    without a candidate position cannot match. For 5' primers (front=True) a wildcard left
+    padding lets the primer overlap the start of the read partially, by at least the minimum
+    overlap; for 3' primers the vertical deltas of the last column cover partial overlaps
+    with the end of the read.
+
+    Args:
+        pattern (str): 引子序列 / Primer sequence.
+        seqs (list[bytes]): 讀序 / Reads.
+        settings (PrimerTrimSettings): 修剪參數 / Trimming parameters.
+        front (bool): 是否為 5' 引子 / Whether the primer is a 5' primer.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: 第一個完整重疊候選欄 (1 起算, 無則為 0) 與結尾是否有部分
+        重疊候選 / First column with a full-overlap candidate (1-based, 0 if none) and whether
+        the end of the read has a partial-overlap candidate.
+    """
+    m = len(pattern)
+    pad = max(m - settings.min_overlap, 0) if front else 0
+    peq = _compile_pattern(pattern)
+    texts, lengths = _pack_batch(seqs, pad)
+    n = len(seqs)
+    n_prefix = _n_prefix(pattern)
+
+    mask = np.uint64((1 << m) - 1)
+    high = np.uint64(1 << (m - 1))
+    one = np.uint64(1)
+    pv = np.full(n, mask, dtype=np.uint64)
+    mv = np.zeros(n, dtype=np.uint64)
+    score = np.full(n, m, dtype=np.int64)
+
+    effective = int(m - n_prefix[-1])
+    max_errors = int(effective * settings.error_rate)
+    first = np.zeros(n, dtype=np.int64)
+    last_pv = np.zeros(n, dtype=np.uint64)
+    last_mv = np.zeros(n, dtype=np.uint64)
+    text_ends = lengths + pad
+
+    for j in range(texts.shape[1]):
+        eq = peq[texts[:, j]]
+        xv = eq | mv
+        xh = ((((eq & pv) + pv) & mask) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        score += (ph & high) != 0
+        score -= (mh & high) != 0
+        ph = (ph << one) & mask
+        mh = (mh << one) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+
+        # 結束於第 column 欄的比對最多重疊 column + max_errors 個引子鹼基
+        # An alignment ending at this column overlaps at most column + max_errors primer bases
+        column = j + 1 - pad
+        if column > 0:
+            allowed = int(min(effective, column + max_errors) * settings.error_rate)
+            hit = (score <= allowed) & (first == 0) & (j < text_ends)
+            first[hit] = column
+        last = text_ends == j + 1
+        last_pv[last] = pv[last]
+        last_mv[last] = mv[last]
+
+    partial = np.zeros(n, dtype=bool)
+    if not front and m > 1:
+        # 最後一欄第 i 列的編輯距離為前 i 個垂直差值之和
+        # The edit distance of row i in the last column is the sum of the first i vertical deltas
+        shifts = np.arange(m - 1, dtype=np.uint64)
+        plus = (last_pv[:, None] >> shifts) & one
+        minus = (last_mv[:, None] >> shifts) & one
+        costs = np.cumsum(plus.astype(np.int64) - minus.astype(np.int64), axis=1)
+        rows = np.arange(1, m)
+        ok = (costs <= (rows - n_prefix[1:m]) * settings.error_rate) & (
+            rows >= settings.min_overlap
+        )
+        partial = ok.any(axis=1) & (lengths > 0)
+    return first, partial
+
+
+def _dp_column(
+    cost: np.ndarray,
+    score: np.ndarray,
+    origin: np.ndarray,
+    match: np.ndarray,
+    column: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """以 cutadapt 的計分規則計算下一欄
+
+    Compute the next alignment column with cutadapt's scoring rules.
+
+    每格保存編輯距離、分數 (匹配 +1、錯配 -1、插入/缺失 -2) 與比對在讀序中的起點; 同分時依
+    對角、插入、缺失的順序選擇來源。插入沿欄向下傳遞, 以累計最小值一次向量化計算。
+
+    Every cell keeps the edit distance, the score (match +1, mismatch -1, indel -2) and where
+    the alignment starts in the read; ties prefer the diagonal, then insertion, then deletion.
+    Insertions run down the column and are vectorized with a running minimum.
+
+    Args:
+        cost (np.ndarray): 前一欄編輯距離 / Edit distances of the previous column.
+        score (np.ndarray): 前一欄分數 / Scores of the previous column.
+        origin (np.ndarray): 前一欄比對起點 / Alignment origins of the previous column.
+        match (np.ndarray): 本欄讀序鹼基與引子各位置是否匹配 / Whether this column's read base
+            matches each primer position.
+        column (np.ndarray): 本欄在讀序中的位置 (1 起算) / 1-based read position of the column.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: 本欄的編輯距離、分數與比對起點 /
+        Edit distances, scores and alignment origins of the column.
+    """
+    rows = np.arange(cost.shape[1], dtype=np.int32)
+    diag_cost = cost[:, :-1] + ~match
+    del_cost = cost[:, 1:] + 1
+    use_diag = diag_cost <= del_cost
+
+    new_cost = np.zeros_like(cost)
+    new_cost[:, 1:] = np.where(use_diag, diag_cost, del_cost)
+    new_cost = np.minimum.accumulate(new_cost - rows, axis=1) + rows
+
+    new_score = np.zeros_like(score)
+    new_score[:, 1:] = np.where(use_diag, score[:, :-1] + np.where(match, 1, -1), score[:, 1:] - 2)
+    new_origin = np.empty_like(origin)
+    new_origin[:, 0] = column
+    new_origin[:, 1:] = np.where(use_diag, origin[:, :-1], origin[:, 1:])
+
+    # 對角不是最小值且上一格 +1 即為最小值時來自插入, 分數與起點取自插入鏈的起點
+    # A cell comes from an insertion when the diagonal is not minimal and the cell above + 1
+    # is; its score and origin come from the start of the insertion chain
+    insert = np.zeros(cost.shape, dtype=bool)
+    insert[:, 1:] = (diag_cost != new_cost[:, 1:]) & (new_cost[:, :-1] + 1 == new_cost[:, 1:])
+    if insert.any():
+        source = np.maximum.accumulate(np.where(insert, 0, rows), axis=1)
+        chain = np.take_along_axis(new_score, source, axis=1) - 2 * (rows - source)
+        new_score = np.where(insert, chain, new_score)
+        new_origin = np.where(insert, np.take_along_axis(new_origin, source, axis=1), new_origin)
+    return new_cost, new_score, new_origin
+
+
+def _align(
+    pattern: str,
+    seqs: list[bytes],
+    settings: PrimerTrimSettings,
+    front: bool,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """在整批讀序中找出 cutadapt 會選擇的引子比對
+
+    Find, in a batch of reads, the primer alignment cutadapt would choose.
+
+    先以 Myers 篩選候選讀序, 再對候選讀序逐欄向量化地計算 cutadapt 的比對矩陣: 引子可從讀序
+    任意位置開始; 5' 引子可只與讀序開頭部分重疊, 3' 引子可只與結尾部分重疊。重疊長度 L
+    (不含引子中的 N) 最多容許 L * error_rate 個錯誤, 並取分數最高者; 逐欄掃描時遇到完全匹配
+    或比對起點已遠離目前最佳比對即停止, 與 cutadapt 相同。動態規劃只從第一個候選位置前
+    2 * 引子長度處開始, 更早的起點不可能落在最佳比對上。
+
+    Myers first picks the candidate reads, then cutadapt's alignment matrix is computed
+    column by column, vectorized over the candidates. The primer may start anywhere in the
+    read; a 5' primer may overlap only the start of the read and a 3' primer only its end.
+    An overlap of L bases, Ns in the primer excluded, allows L * error_rate errors and the
+    highest score wins. Like cutadapt, the scan stops at an exact match or once alignments
+    start too far past the current best one. The dynamic programming starts twice the primer
+    length before the first candidate position, as earlier origins cannot be optimal.
+
+    Args:
+        pattern (str): 引子序列 / Primer sequence.
+        seqs (list[bytes]): 讀序 / Reads.
+        settings (PrimerTrimSettings): 修剪參數 / Trimming parameters.
+        front (bool): 是否為 5' 引子 / Whether the primer is a 5' primer.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: 是否找到、比對在讀序中的起點與
+        終點、錯誤數 / Whether found, start and end of the alignment in the read, and errors.
+    """
+    m = len(pattern)
+    n = len(seqs)
+    found = np.zeros(n, dtype=bool)
+    query_start = np.zeros(n, dtype=np.int64)
+    query_stop = np.zeros(n, dtype=np.int64)
+    errors = np.zeros(n, dtype=np.int64)
+
+    first, partial = _find_candidates(pattern, seqs, settings, front)
+    ids = np.flatnonzero((first > 0) | partial)
+    if not ids.size:
+        return found, query_start, query_stop, errors
+
+    # 依掃描欄數由多到少排序, 每一欄仍在掃描的讀序即為前綴
+    # Sort by number of scanned columns, longest first, so reads still scanning form a prefix
+    lengths = np.fromiter(map(len, seqs), dtype=np.int64, count=n)[ids]
+    offsets = np.maximum(np.where(first[ids] > 0, first[ids], lengths) - 2 * m - 1, 0)
+    spans = lengths - offsets
+    order = np.argsort(-spans, kind="stable")
+    ids, offsets, spans = ids[order], offsets[order], spans[order]
+    texts, _ = _pack_batch(
+        [seqs[i][offset:] for i, offset in zip(ids.tolist(), offsets.tolist(), strict=True)], 0
+    )
+
+    rows = np.arange(m + 1, dtype=np.int32)
+    cost = np.tile(rows, (ids.size, 1))
+    score = -2 * cost
+    origin = np.repeat(offsets.astype(np.int32)[:, None], m + 1, axis=1)
+    if front:
+        # 5' 引子可只與讀序開頭部分重疊: 第 0 欄各列免費, 起點記為負的引子位置
+        # A 5' primer may overlap the read start partially: column 0 is free, with the
+        # negative primer position as origin
+        at_start = offsets == 0
+        cost[at_start] = 0
+        score[at_start] = 0
+        origin[at_start] = -rows
+
+    table = _match_table(pattern)
+    n_prefix = _n_prefix(pattern)
+
+    def acceptable(cost: np.ndarray, origin: np.ndarray, row: np.ndarray | int) -> np.ndarray:
+        overlap = row + np.minimum(origin, 0)
+        skipped = np.minimum(np.maximum(-origin, 0), m)
+        usable = overlap - (n_prefix[row] - n_prefix[skipped])
+        return (overlap >= settings.min_overlap) & (cost <= usable * settings.error_rate)
+
+    # 每條讀序的最佳比對: 編輯距離、分數、起點、終點
+    # Best alignment of every read: edit distance, score, origin and stop
+    has_best = np.zeros(ids.size, dtype=bool)
+    best = np.zeros((ids.size, 4), dtype=np.int64)
+    done = np.zeros(ids.size, dtype=bool)
+
+    def record(rows: np.ndarray) -> None:
+        rows = rows[has_best[rows]]
+        found[ids[rows]] = True
+        query_start[ids[rows]] = np.maximum(best[rows, 2], 0)
+        query_stop[ids[rows]] = best[rows, 3]
+        errors[ids[rows]] = best[rows, 0]
+
+    for t in range(int(spans[0])):
+        if done.sum() * 4 > done.size:
+            # 已結束的讀序移出狀態矩陣
+            # Drop finished reads from the state matrices
+            record(np.flatnonzero(done))
+            keep = ~done
+            ids, offsets, spans, texts, cost, score, origin, has_best, best, done = (
+                array[keep]
+                for array in (ids, offsets, spans, texts, cost, score, origin, has_best, best, done)
+            )
+        active = int(np.count_nonzero(spans > t))
+        if not active:
+            break
+        columns = offsets[:active] + t + 1
+        cost[:active], score[:active], origin[:active] = _dp_column(
+            cost[:active], score[:active], origin[:active], table[texts[:active, t]], columns
+        )
+
+        # 最後一列: 比對起點已遠離最佳比對時停止, 否則分數較高者取代最佳比對,
+        # 完全匹配時停止
+        # Last row: stop once alignments start too far past the best one, otherwise a higher
+        # score replaces the best alignment, and an exact match stops the scan
+        last_cost, last_score, last_origin = cost[:active, m], score[:active, m], origin[:active, m]
+        pending = ~done[:active]
+        stale = pending & has_best[:active] & (best[:active, 2] >= 0)
+        stale &= last_origin > best[:active, 2] + m // 2
+        done[:active] |= stale
+        better = pending & ~stale & acceptable(last_cost, last_origin, m)
+        better &= ~has_best[:active] | (last_score > best[:active, 1])
+        hit = np.flatnonzero(better)
+        best[hit] = np.stack(
+            [last_cost[hit], last_score[hit], last_origin[hit], columns[hit]], axis=1
+        )
+        has_best[hit] = True
+        done[hit[(last_cost[hit] == 0) & (last_origin[hit] >= 0)]] = True
+
+        # 讀序的最後一欄: 3' 引子也接受與讀序結尾部分重疊的列 (同分取較長者),
+        # 5' 引子只看最後一列
+        # Last column of a read: 3' primers also accept rows overlapping the read end
+        # partially, longer first on ties; 5' primers only look at the last row
+        ending = np.flatnonzero(~done[:active] & (spans[:active] == t + 1))
+        if ending.size:
+            ok = acceptable(cost[ending], origin[ending], rows)
+            if front:
+                ok[:, :m] = False
+            ranked = np.where(ok, score[ending], np.iinfo(np.int32).min)
+            top = m - np.argmax(ranked[:, ::-1], axis=1)
+            top_score = ranked[np.arange(ending.size), top]
+            better = ok.any(axis=1) & (~has_best[ending] | (top_score > best[ending, 1]))
+            hit, top = ending[better], top[better]
+            best[hit] = np.stack(
+                [cost[hit, top], score[hit, top], origin[hit, top], columns[hit]], axis=1
+            )
+            has_best[hit] = True
+            done[ending] = True
+
+    record(np.arange(ids.size))
+    return found, query_start, query_stop, errors
+
+
+def trim_linked_batch(
+    seqs: list[bytes],
+    adapter: LinkedAdapter,
+    settings: PrimerTrimSettings,
+    stats: EndStats,
+    back_stats: EndStats,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """在一批讀序中修剪連結式接頭
+
+    Trim a linked adapter from a batch of reads.
+
+    Args:
+        seqs (list[bytes]): 讀序 / Reads.
+        adapter (LinkedAdapter): 連結式接頭 / Linked adapter.
+        settings (PrimerTrimSettings): 修剪參數 / Trimming parameters.
+        stats (EndStats): 5' 引子統計 (就地更新) / 5' primer statistics, updated in place.
+        back_stats (EndStats): 3' 引子統計 (就地更新) / 3' primer statistics, updated in place.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: 是否修剪、保留起點、保留終點 /
+        Whether trimmed, surviving start and surviving end.
+    """
+    n = len(seqs)
+    starts = np.zeros(n, dtype=np.int64)
+    ends = np.fromiter(map(len, seqs), dtype=np.int64, count=n)
+    if n == 0:
+        return np.zeros(0, dtype=bool), starts, ends
+
+    front_found, _, front_stop, front_errors = _align(adapter.front, seqs, settings, front=True)
+    starts[front_found] = front_stop[front_found]
+
+    # 3' 引子在 5' 引子之後的區段 (未找到 5' 引子時為整條讀序) 中尋找
+    # The 3' primer is searched after the 5' primer, or in the whole read when there is no
+    # 5' match
+    remainders = [seq[start:] for seq, start in zip(seqs, starts.tolist(), strict=True)]
+    back_found, back_start, _, back_errors = _align(adapter.back, remainders, settings, front=False)
+    ends[back_found] = starts[back_found] + back_start[back_found]
+
+    for i in np.flatnonzero(front_found).tolist():
+        stats.trimmed[(int(starts[i]), int(front_errors[i]))] += 1
+    for i in np.flatnonzero(back_found).tolist():
+        back_stats.trimmed[(len(seqs[i]) - int(ends[i]), int(back_errors[i]))] += 1
+        # cutadapt 只記錄 A/C/G/T, 其他鹼基 (如 N) 與空字串合併計算
+        # cutadapt only tracks A/C/G/T; other bases such as N count as the empty string
+        adjacent = seqs[i][ends[i] - 1 : ends[i]].decode() if ends[i] > starts[i] else ""
+        back_stats.adjacent[adjacent if adjacent in ADJACENT_BASES else ""] += 1
+
+    return front_found | back_found, starts, ends
+
+
+def trim_pair_records(
+    batch1: list[FastqRecord],
+    batch2: list[FastqRecord],
+    adapter1: LinkedAdapter,
+    adapter2: LinkedAdapter,
+    settings: PrimerTrimSettings,
+) -> tuple[list[FastqRecord], list[FastqRecord], PrimerTrimStats]:
+    """修剪一批配對讀序並回傳保留的紀錄
+
+    Trim one batch of read pairs and return the kept records.
+
+    Args:
+        batch1 (list[FastqRecord]): R1 紀錄 / R1 records.
+        batch2 (list[FastqRecord]): R2 紀錄 / R2 records.
+        adapter1 (LinkedAdapter): R1 接頭 / R1 adapter.
+        adapter2 (LinkedAdapter): R2 接頭 / R2 adapter.
+        settings (PrimerTrimSettings): 修剪參數 / Trimming parameters.
+
+    Returns:
+        tuple[list[FastqRecord], list[FastqRecord], PrimerTrimStats]: 保留的 R1、R2 紀錄與統計 /
+        Kept R1 records, kept R2 records and statistics.
+    """
+    stats = PrimerTrimStats(input_pairs=len(batch1))
+    seqs1 = [record[1] for record in batch1]
+    seqs2 = [record[1] for record in batch2]
+    stats.input_bp = [sum(map(len, seqs1)), sum(map(len, seqs2))]
+
+    trimmed1, starts1, ends1 = trim_linked_batch(
+        seqs1, adapter1, settings, stats.ends["read1_front"], stats.ends["read1_back"]
+    )
+    trimmed2, starts2, ends2 = trim_linked_batch(
+        seqs2, adapter2, settings, stats.ends["read2_front"], stats.ends["read2_back"]
+    )
+    stats.read1_with_adapter = int(trimmed1.sum())
+    stats.read2_with_adapter = int(trimmed2.sum())
+
+    # 兩條讀序皆有接頭 (-a 與 -A) 時 --discard-untrimmed 使用預設的 --pair-filter=any:
+    # 任一條未修剪即丟棄整個配對
+    # With adapters on both reads (-a and -A), --discard-untrimmed uses the default
+    # --pair-filter=any and drops a pair when either read is untrimmed
+    keep = np.flatnonzero(trimmed1 & trimmed2)
+    stats.output_pairs = int(keep.size)
+    stats.output_bp = [
+        int((ends1[keep] - starts1[keep]).sum()),
+        int((ends2[keep] - starts2[keep]).sum()),
+    ]
+
+    kept1 = _slice_records(batch1, keep, starts1, ends1)
+    kept2 = _slice_records(batch2, keep, starts2, ends2)
+    return kept1, kept2, stats
+
+
+def _trim_pair_batch(
+    batch1: list[FastqRecord],
+    batch2: list[FastqRecord],
+    adapter1: LinkedAdapter,
+    adapter2: LinkedAdapter,
+    settings: PrimerTrimSettings,
+) -> tuple[bytes, bytes, PrimerTrimStats]:
+    """修剪一批配對讀序並格式化輸出 (可於子程序中執行)
+
+    Trim one batch of read pairs and format the output; safe to run in a worker process.
+
+    Args:
+        batch1 (list[FastqRecord]): R1 紀錄 / R1 records.
+        batch2 (list[FastqRecord]): R2 紀錄 / R2 records.
+        adapter1 (LinkedAdapter): R1 接頭 / R1 adapter.
+        adapter2 (LinkedAdapter): R2 接頭 / R2 adapter.
+        settings (PrimerTrimSettings): 修剪參數 / Trimming parameters.
+
+    Returns:
+        tuple[bytes, bytes, PrimerTrimStats]: R1 輸出、R2 輸出與統計 / R1 output, R2 output and statistics.
+    """
+    kept1, kept2, stats = trim_pair_records(batch1, batch2, adapter1, adapter2, settings)
+    return format_fastq_records(kept1), format_fastq_records(kept2), stats
+
+
+def _slice_records(
+    batch: list[FastqRecord], keep: np.ndarray, starts: np.ndarray, ends: np.ndarray
+) -> list[FastqRecord]:
+    """擷取保留紀錄的保留區段
+
+    Slice the surviving range of each kept record.
+
+    Args:
+        batch (list[FastqRecord]): 紀錄 / Records.
+        keep (np.ndarray): 保留的索引 / Indices to keep.
+        starts (np.ndarray): 保留起點 / Surviving starts.
+        ends (np.ndarray): 保留終點 / Surviving ends.
+
+    Returns:
+        list[FastqRecord]: 修剪後的紀錄 / Trimmed records.
+    """
+    records: list[FastqRecord] = []
+    for i in keep.tolist():
+        header, seq, qual = batch[i]
+        start, end = int(starts[i]), int(ends[i])
+        records.append((header, seq[start:end], qual[start:end]))
+    return records
+
+
+def trim_primers_paired(
+    r1_path: Path,
+    r2_path: Path,
+    out1_path: Path,
+    out2_path: Path,
+    adapter1: LinkedAdapter,
+    adapter2: LinkedAdapter,
+    json_report: Path,
+    settings: PrimerTrimSettings | None = None,
+    cores: int = 1,
+) -> PrimerTrimStats:
+    """修剪雙端讀序的引子並寫出 cutadapt 相容的 JSON 報告
+
+    Trim primers from paired-end reads and write a cutadapt-compatible JSON report.
+
+    cores > 1 時各批次在子程序中平行處理, 輸出順序與輸入相同。
+
+    With cores > 1 batches are processed in worker processes; output order matches input.
+
+    Args:
+        r1_path (Path): R1 輸入檔案 / R1 input file.
+        r2_path (Path): R2 輸入檔案 / R2 input file.
+        out1_path (Path): R1 輸出檔案 / R1 output file.
+        out2_path (Path): R2 輸出檔案 / R2 output file.
+        adapter1 (LinkedAdapter): R1 接頭 (-a) / R1 adapter (-a).
+        adapter2 (LinkedAdapter): R2 接頭 (-A) / R2 adapter (-A).
+        json_report (Path): JSON 報告路徑 / JSON report path.
+        settings (PrimerTrimSettings | None): 修剪參數 / Trimming parameters.
+        cores (int): 使用的核心數 / Number of cores.
+
+    Returns:
+        PrimerTrimStats: 修剪統計 / Trimming statistics.
+    """
+    settings = settings or PrimerTrimSettings()
+    stats = PrimerTrimStats()
+
+    with open(out1_path, "wb") as f_out1, open(out2_path, "wb") as f_out2:
+        batches = (
+            (batch1, batch2, adapter1, adapter2, settings)
+            for batch1, batch2 in iter_fastq_pair_batches(r1_path, r2_path)
+        )
+        for out1, out2, batch_stats in ordered_process_map(_trim_pair_batch, batches, cores):
+            f_out1.write(out1)
+            f_out2.write(out2)
+            stats.merge(batch_stats)
+
+    write_cutadapt_report(
+        json_report,
+        stats,
+        r1_path,
+        r2_path,
+        out1_path,
+        out2_path,
+        adapter1,
+        adapter2,
+        settings,
+        cores,
+    )
+    logger.info(
+        f"引子修剪完成: {stats.input_pairs} 對讀序, 保留 {stats.output_pairs}, "
+        f"丟棄 {stats.discarded_pairs}"
+    )
+    return stats
+
+
+def _error_lengths(length: int, error_rate: float) -> list[int]:
+    """各容許錯誤數對應的最大重疊長度 (與 cutadapt 的 ErrorRanges 相同)
+
+    Longest overlap allowing each number of errors, as in cutadapt's ErrorRanges.
+
+    第 i 項為最多容許 i 個錯誤的重疊長度, 最後一項恆為引子長度。
+
+    Entry i is the overlap length up to which i errors are allowed; the last entry is always
+    the primer length.
+
+    Args:
+        length (int): 引子有效長度 (不含 N) / Effective primer length, Ns excluded.
+        error_rate (float): 最大錯誤率 / Maximum error rate.
+
+    Returns:
+        list[int]: 長度列表 / List of lengths.
+    """
+    lengths = [int(errors / error_rate) - 1 for errors in range(1, int(error_rate * length) + 1)]
+    if not lengths or lengths[-1] < length:
+        lengths.append(length)
+    return lengths
+
+
+def _end_report(
+    sequence: str,
+    end_type: str,
+    end_stats: EndStats,
+    input_reads: int,
+    settings: PrimerTrimSettings,
+) -> dict:
+    """建立單一引子端的報告
+
+    Build the report of one primer end.
+
+    Args:
+        sequence (str): 引子序列 / Primer sequence.
+        end_type (str): cutadapt 的接頭類型 / cutadapt adapter type.
+        end_stats (EndStats): 比對統計 / Match statistics.
+        input_reads (int): 輸入讀序數 / Number of input reads.
+        settings (PrimerTrimSettings): 修剪參數 / Trimming parameters.
+
+    Returns:
+        dict: 報告內容 / Report content.
+    """
+    by_length: dict[int, Counter] = {}
+    for (length, errors), count in end_stats.trimmed.items():
+        by_length.setdefault(length, Counter())[errors] += count
+
+    trimmed_lengths = []
+    for length in sorted(by_length):
+        errors = by_length[length]
+        trimmed_lengths.append(
+            {
+                "len": length,
+                "expect": round(input_reads * 0.25 ** min(length, len(sequence)), 1),
+                "counts": [errors.get(k, 0) for k in range(max(errors) + 1)],
+            }
+        )
+
+    adjacent = None
+    dominant = None
+    if end_type == "regular_three_prime":
+        adjacent = {base: end_stats.adjacent.get(base, 0) for base in (*ADJACENT_BASES, "")}
+        total = sum(adjacent.values())
+        dominant = max(adjacent, key=adjacent.__getitem__) if total else None
+        if dominant is not None and adjacent[dominant] < 0.8 * total:
+            dominant = None
+
+    return {
+        "type": end_type,
+        "sequence": sequence,
+        "error_rate": settings.error_rate,
+        "indels": True,
+        "error_lengths": _error_lengths(len(sequence) - sequence.count("N"), settings.error_rate),
+        "matches": sum(end_stats.trimmed.values()),
+        "adjacent_bases": adjacent,
+        "dominant_adjacent_base": dominant,
+        "trimmed_lengths": trimmed_lengths,
+    }
+
+
+def write_cutadapt_report(
+    json_report: Path,
+    stats: PrimerTrimStats,
+    r1_path: Path,
+    r2_path: Path,
+    out1_path: Path,
+    out2_path: Path,
+    adapter1: LinkedAdapter,
+    adapter2: LinkedAdapter,
+    settings: PrimerTrimSettings,
+    cores: int,
+) -> None:
+    """寫出 cutadapt 相容的 JSON 報告
+
+    Write a cutadapt-compatible JSON report.
+
+    Args:
+        json_report (Path): JSON 報告路徑 / JSON report path.
+        stats (PrimerTrimStats): 修剪統計 / Trimming statistics.
+        r1_path (Path): R1 輸入檔案 / R1 input file.
+        r2_path (Path): R2 輸入檔案 / R2 input file.
+        out1_path (Path): R1 輸出檔案 / R1 output file.
+        out2_path (Path): R2 輸出檔案 / R2 output file.
+        adapter1 (LinkedAdapter): R1 接頭 / R1 adapter.
+        adapter2 (LinkedAdapter): R2 接頭 / R2 adapter.
+        settings (PrimerTrimSettings): 修剪參數 / Trimming parameters.
+        cores (int): 使用的核心數 / Number of cores.
+    """
+
+    def adapter_report(adapter: LinkedAdapter, read: str, name: str) -> dict:
+        # cutadapt 的 total_matches 為 5' 與 3' 兩端比對數的總和
+        # cutadapt's total_matches adds up the matches of the 5' and the 3' end
+        total = sum(sum(stats.ends[f"{read}_{end}"].trimmed.values()) for end in ("front", "back"))
+        return {
+            "name": name,
+            "total_matches": total,
+            "on_reverse_complement": None,
+            "linked": True,
+            "five_prime_end": _end_report(
+                adapter.front,
+                "regular_five_prime",
+                stats.ends[f"{read}_front"],
+                stats.input_pairs,
+                settings,
+            ),
+            "three_prime_end": _end_report(
+                adapter.back,
+                "regular_three_prime",
+                stats.ends[f"{read}_back"],
+                stats.input_pairs,
+                settings,
+            ),
+        }
+
+    report = {
+        "tag": "Cutadapt report",
+        "schema_version": REPORT_SCHEMA_VERSION,
+        "cutadapt_version": CUTADAPT_COMPAT_VERSION,
+        "engine": "trim2sort",
+        "python_version": platform.python_version(),
+        "command_line_arguments": [
+            "-a",
+            adapter1.spec,
+            "-A",
+            adapter2.spec,
+            "--discard-untrimmed",
+            "-e",
+            str(settings.error_rate),
+            "-O",
+            str(settings.min_overlap),
+            "-j",
+            str(cores),
+            "--json",
+            str(json_report),
+            "-o",
+            str(out1_path),
+            "-p",
+            str(out2_path),
+            str(r1_path),
+            str(r2_path),
+        ],
+        "cores": cores,
+        "input": {
+            "path1": str(r1_path),
+            "path2": str(r2_path),
+            "paired": True,
+            "interleaved": False,
+        },
+        "read_counts": {
+            "input": stats.input_pairs,
+            "filtered": {
+                "too_short": None,
+                "too_long": None,
+                "too_many_n": None,
+                "too_many_expected_errors": None,
+                "casava_filtered": None,
+                "discard_trimmed": None,
+                "discard_untrimmed": stats.discarded_pairs,
+            },
+            "output": stats.output_pairs,
+            "reverse_complemented": None,
+            "read1_with_adapter": stats.read1_with_adapter,
+            "read2_with_adapter": stats.read2_with_adapter,
+        },
+        "basepair_counts": {
+            "input": sum(stats.input_bp),
+            "input_read1": stats.input_bp[0],
+            "input_read2": stats.input_bp[1],
+            "quality_trimmed": None,
+            "quality_trimmed_read1": None,
+            "quality_trimmed_read2": None,
+            "poly_a_trimmed": None,
+            "poly_a_trimmed_read1": None,
+            "poly_a_trimmed_read2": None,
+            "output": sum(stats.output_bp),
+            "output_read1": stats.output_bp[0],
+            "output_read2": stats.output_bp[1],
+        },
+        "adapters_read1": [adapter_report(adapter1, "read1", "1")],
+        "adapters_read2": [adapter_report(adapter2, "read2", "2")],
+        "poly_a_trimmed_read1": None,
+        "poly_a_trimmed_read2": None,
+    }
+
+    with open(json_report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def relocate_cutadapt_report(
+    json_report: Path,
+    r1_path: Path,
+    r2_path: Path,
+    out1_path: Path,
+    out2_path: Path,
+) -> None:
+    """將 cutadapt JSON 報告中的檔案路徑改寫為目前的路徑
+
+    Rewrite the file paths in a cutadapt JSON report to the current ones.
+
+    由步驟快取取出的報告保留了最初產生它的專案路徑, 取出後以此改寫輸入、輸出與報告路徑。
+
+    A report fetched from the stage cache keeps the paths of the project that first produced
+    it, so its input, output and report paths are rewritten after the fetch.
+
+    Args:
+        json_report (Path): JSON 報告路徑 / JSON report path.
+        r1_path (Path): R1 輸入檔案 / R1 input file.
+        r2_path (Path): R2 輸入檔案 / R2 input file.
+        out1_path (Path): R1 輸出檔案 / R1 output file.
+        out2_path (Path): R2 輸出檔案 / R2 output file.
+    """
+    with open(json_report, encoding="utf-8") as f:
+        report = json.load(f)
+
+    inputs = report.get("input", {})
+    # 位置參數以原本的輸入路徑比對, 選項參數以選項名稱比對
+    # Positional arguments are matched by the old input paths, option values by the option
+    positional = {
+        inputs.get("path1"): str(r1_path),
+        inputs.get("path2"): str(r2_path),
+    }
+    options = {"--json": str(json_report), "-o": str(out1_path), "-p": str(out2_path)}
+    arguments = report.get("command_line_arguments", [])
+    for i, argument in enumerate(arguments):
+        if i > 0 and arguments[i - 1] in options:
+            arguments[i] = options[arguments[i - 1]]
+        elif argument in positional:
+            arguments[i] = positional[argument]
+    inputs["path1"] = str(r1_path)
+    inputs["path2"] = str(r2_path)
+
+    with open(json_report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,363 @@
+"""輸入 FASTQ 品質檢查報告
+
+Input FASTQ quality-control report.
+
+每個輸入 FASTQ 只循序讀取一次, 以向量化核心累計讀序數、長度分布、各位置品質分數
+分布與期望錯誤數分布; 品質分位數由各位置的品質直方圖精確求得, 記憶體用量與讀序數
+無關。結果寫成精簡的 JSON 與 HTML 報告, 並檢查 R1 / R2 讀序數是否一致。
+
+Every input FASTQ is read sequentially once while vectorized kernels accumulate the read
+count, length distribution, per-position quality distribution and expected-error
+distribution. Quality quantiles are computed exactly from per-position quality histograms, so
+memory use does not depend on the read count. The results are written as compact JSON and
+HTML reports, together with an R1 / R2 read count consistency check.
+"""
+
+from dataclasses import dataclass, field
+from itertools import pairwise
+import json
+from pathlib import Path
+from typing import Any
+
+import jinja2
+import numpy as np
+
+from src.utils.fastx_index_utils import iter_fastq_arrays
+from src.utils.kernel_utils import MAX_QUALITY, SequenceBatch, decode_phred, expected_errors
+from src.utils.logger_utils import get_logger
+from src.utils.scheduler_utils import ordered_process_map
+
+logger = get_logger(__name__)
+
+REPORT_SCHEMA_VERSION = 1
+
+# 報告中的品質分位數
+# Quality quantiles included in the report
+QUALITY_QUANTILES = {"q10": 0.10, "q25": 0.25, "median": 0.50, "q75": 0.75, "q90": 0.90}
+
+# 期望錯誤數分布的區間邊界 (最後一個區間無上限)
+# Bin edges of the expected-error distribution; the last bin is open-ended
+EXPECTED_ERROR_EDGES = (0.0, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0)
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-Hant">
+<head>
+<meta charset="utf-8">
+<title>Trim2Sort 輸入品質報告 / Input QC report</title>
+<style>
+body { font-family: sans-serif; margin: 2em; color: #222; }
+table { border-collapse: collapse; margin-bottom: 2em; }
+th, td { border: 1px solid #ccc; padding: 4px 10px; text-align: right; }
+th:first-child, td:first-child { text-align: left; }
+.bad { background: #fdd; }
+svg { background: #f8f8f8; border: 1px solid #ddd; }
+</style>
+</head>
+<body>
+<h1>輸入品質報告 / Input QC report</h1>
+<table>
+<tr>
+<th>樣本 / Sample</th><th>R1 reads</th><th>R2 reads</th>
+<th>R1 mean length</th><th>R2 mean length</th>
+<th>R1 mean EE</th><th>R2 mean EE</th><th>R1 EE &lt; 1</th><th>R2 EE &lt; 1</th>
+</tr>
+{% for name, sample in samples.items() %}
+<tr{% if not sample.read_counts_match %} class="bad"{% endif %}>
+<td>{{ name }}</td>
+<td>{{ sample.r1.reads }}</td><td>{{ sample.r2.reads }}</td>
+<td>{{ "%.1f" | format(sample.r1.length.mean) }}</td>
+<td>{{ "%.1f" | format(sample.r2.length.mean) }}</td>
+<td>{{ "%.2f" | format(sample.r1.expected_errors.mean) }}</td>
+<td>{{ "%.2f" | format(sample.r2.expected_errors.mean) }}</td>
+<td>{{ "%.1f%%" | format(100 * sample.r1.expected_errors.below_one_fraction) }}</td>
+<td>{{ "%.1f%%" | format(100 * sample.r2.expected_errors.below_one_fraction) }}</td>
+</tr>
+{% endfor %}
+</table>
+<h2>各位置品質 (中位數與 10-90%) / Quality by position (median and 10-90%)</h2>
+{% for name, plot in plots.items() %}
+<h3>{{ name }}</h3>
+{% for read, lines in plot.items() %}
+<svg width="{{ width }}" height="{{ height }}" viewBox="0 0 {{ width }} {{ height }}">
+<text x="4" y="14" font-size="12">{{ read }}</text>
+<polyline fill="none" stroke="#9ab" points="{{ lines.q10 }}"/>
+<polyline fill="none" stroke="#9ab" points="{{ lines.q90 }}"/>
+<polyline fill="none" stroke="#c33" stroke-width="2" points="{{ lines.median }}"/>
+</svg>
+{% endfor %}
+{% endfor %}
+</body>
+</html>
+"""
+
+PLOT_WIDTH = 480
+PLOT_HEIGHT = 160
+
+
+@dataclass(slots=True)
+class FastqQC:
+    """單一 FASTQ 的品質統計 (可分批累計)
+
+    Quality statistics of one FASTQ, accumulated batch by batch.
+    """
+
+    reads: int = 0
+    bases: int = 0
+    # 長度 -> 讀序數
+    # Length -> read count
+    length_counts: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    # (位置, 品質分數) -> 鹼基數
+    # (position, quality score) -> base count
+    quality_counts: np.ndarray = field(
+        default_factory=lambda: np.zeros((0, MAX_QUALITY + 1), dtype=np.int64)
+    )
+    expected_error_counts: np.ndarray = field(
+        default_factory=lambda: np.zeros(len(EXPECTED_ERROR_EDGES), dtype=np.int64)
+    )
+    expected_error_sum: float = 0.0
+
+    def update(self, qualities: SequenceBatch) -> None:
+        """累計一批讀序的品質字串
+
+        Accumulate the quality strings of a batch of reads.
+
+        Args:
+            qualities (SequenceBatch): 品質字串批次 / Batch of quality strings.
+        """
+        lengths = qualities.lengths
+        if lengths.size == 0:
+            return
+
+        scores = decode_phred(qualities)
+        max_length = int(lengths.max())
+        self._grow(max_length)
+
+        self.reads += lengths.size
+        self.bases += scores.size
+        self.length_counts[: max_length + 1] += np.bincount(lengths, minlength=max_length + 1)
+
+        # 每個鹼基在讀序內的位置 -> 直方圖格子編號 (位置 * 品質分數種類數 + 品質分數)
+        # Position of every base within its read -> histogram cell (position * scores + score)
+        dtype = np.int32 if scores.size < 2**31 else np.int64
+        cells = np.arange(scores.size, dtype=dtype)
+        cells -= np.repeat(qualities.offsets[:-1].astype(dtype), lengths)
+        cells *= MAX_QUALITY + 1
+        cells += scores
+        self.quality_counts[:max_length] += np.bincount(
+            cells, minlength=max_length * (MAX_QUALITY + 1)
+        ).reshape(max_length, MAX_QUALITY + 1)
+
+        errors = expected_errors(qualities)
+        bins = np.searchsorted(EXPECTED_ERROR_EDGES, errors, side="right") - 1
+        self.expected_error_counts += np.bincount(bins, minlength=len(EXPECTED_ERROR_EDGES))
+        self.expected_error_sum += float(errors.sum())
+
+    def merge(self, other: "FastqQC") -> None:
+        """合併另一份統計
+
+        Merge another set of statistics into this one.
+
+        Args:
+            other (FastqQC): 另一份統計 / Other statistics.
+        """
+        self._grow(len(other.quality_counts))
+        self.reads += other.reads
+        self.bases += other.bases
+        self.length_counts[: len(other.length_counts)] += other.length_counts
+        self.quality_counts[: len(other.quality_counts)] += other.quality_counts
+        self.expected_error_counts += other.expected_error_counts
+        self.expected_error_sum += other.expected_error_sum
+
+    def _grow(self, max_length: int) -> None:
+        """擴充陣列以容納較長的讀序
+
+        Grow the arrays to hold longer reads.
+
+        Args:
+            max_length (int): 讀序長度上限 / Maximum read length.
+        """
+        if max_length < len(self.quality_counts):
+            return
+        extra = max_length - len(self.quality_counts)
+        self.quality_counts = np.pad(self.quality_counts, ((0, extra), (0, 0)))
+        self.length_counts = np.pad(
+            self.length_counts, (0, max_length + 1 - len(self.length_counts))
+        )
+
+    def quality_quantiles(self) -> dict[str, list[float]]:
+        """由直方圖計算各位置的品質分位數與平均
+
+        Compute per-position quality quantiles and means from the histograms.
+
+        Returns:
+            dict[str, list[float]]: 分位數名稱 -> 各位置的值 / Quantile name -> value per
+            position.
+        """
+        counts = self.quality_counts
+        totals = counts.sum(axis=1)
+        covered = totals > 0
+        counts = counts[covered]
+        totals = totals[covered]
+        cumulative = np.cumsum(counts, axis=1)
+
+        result: dict[str, list[float]] = {}
+        for name, fraction in QUALITY_QUANTILES.items():
+            # 第一個累計數達到 fraction 的品質分數
+            # First quality score whose cumulative count reaches the fraction
+            reached = cumulative >= np.ceil(fraction * totals)[:, None]
+            result[name] = reached.argmax(axis=1).tolist()
+        scores = np.arange(MAX_QUALITY + 1)
+        result["mean"] = np.round((counts * scores).sum(axis=1) / totals, 2).tolist()
+        return result
+
+    def to_dict(self, path: Path) -> dict[str, Any]:
+        """轉為精簡的可序列化字典
+
+        Convert to a compact serializable dictionary.
+
+        Args:
+            path (Path): FASTQ 檔案路徑 / FASTQ file path.
+
+        Returns:
+            dict[str, Any]: 品質統計 / Quality statistics.
+        """
+        lengths = np.flatnonzero(self.length_counts)
+        reads = max(self.reads, 1)
+        labels = [f"{low:g}-{high:g}" for low, high in pairwise(EXPECTED_ERROR_EDGES)]
+        labels.append(f"{EXPECTED_ERROR_EDGES[-1]:g}+")
+        below_one = int(self.expected_error_counts[: EXPECTED_ERROR_EDGES.index(1.0)].sum())
+        return {
+            "file": path.name,
+            "reads": self.reads,
+            "bases": self.bases,
+            "length": {
+                "min": int(lengths[0]) if lengths.size else 0,
+                "max": int(lengths[-1]) if lengths.size else 0,
+                "mean": round(self.bases / reads, 2),
+                "histogram": {
+                    str(length): int(self.length_counts[length]) for length in lengths.tolist()
+                },
+            },
+            "quality_by_position": self.quality_quantiles(),
+            "expected_errors": {
+                "mean": round(self.expected_error_sum / reads, 4),
+                "below_one_fraction": round(below_one / reads, 4),
+                "bins": labels,
+                "counts": self.expected_error_counts.tolist(),
+            },
+        }
+
+
+def scan_fastq(fastq_path: Path) -> FastqQC:
+    """循序掃描單一 FASTQ 並累計品質統計
+
+    Scan one FASTQ sequentially and accumulate its quality statistics.
+
+    Args:
+        fastq_path (Path): FASTQ 檔案路徑 (可為 .gz) / FASTQ file path, optionally gzipped.
+
+    Returns:
+        FastqQC: 品質統計 / Quality statistics.
+    """
+    qc = FastqQC()
+    for _, qualities in iter_fastq_arrays(fastq_path, with_sequences=False):
+        qc.update(qualities)
+    return qc
+
+
+def scan_fastq_pair(r1_path: Path, r2_path: Path, workers: int = 1) -> dict[str, Any]:
+    """掃描一對 R1 / R2 並檢查讀序數是否一致
+
+    Scan an R1 / R2 pair and check that their read counts agree.
+
+    Args:
+        r1_path (Path): R1 檔案路徑 / R1 file path.
+        r2_path (Path): R2 檔案路徑 / R2 file path.
+        workers (int): 同時掃描檔案的子程序數 (1 或 2) / Worker processes scanning the files
+            concurrently (1 or 2).
+
+    Returns:
+        dict[str, Any]: R1 與 R2 的品質統計及一致性 / R1 and R2 statistics and consistency.
+    """
+    qc1, qc2 = ordered_process_map(scan_fastq, ((r1_path,), (r2_path,)), min(workers, 2))
+    return summarize_pair(r1_path, qc1, r2_path, qc2)
+
+
+def summarize_pair(r1_path: Path, qc1: FastqQC, r2_path: Path, qc2: FastqQC) -> dict[str, Any]:
+    """將一對 R1 / R2 的品質統計整理為報告內容並檢查讀序數是否一致
+
+    Turn the statistics of an R1 / R2 pair into report content and check that their read
+    counts agree.
+
+    Args:
+        r1_path (Path): R1 檔案路徑 / R1 file path.
+        qc1 (FastqQC): R1 品質統計 / R1 statistics.
+        r2_path (Path): R2 檔案路徑 / R2 file path.
+        qc2 (FastqQC): R2 品質統計 / R2 statistics.
+
+    Returns:
+        dict[str, Any]: R1 與 R2 的品質統計及一致性 / R1 and R2 statistics and consistency.
+    """
+    match = qc1.reads == qc2.reads
+    if not match:
+        logger.warning(
+            f"R1 與 R2 的讀序數不一致: {r1_path.name} ({qc1.reads}) / {r2_path.name} ({qc2.reads})"
+        )
+    return {"r1": qc1.to_dict(r1_path), "r2": qc2.to_dict(r2_path), "read_counts_match": match}
+
+
+def _polyline(values: list[float], length: int) -> str:
+    """將各位置的品質轉為 SVG polyline 座標
+
+    Convert per-position qualities to SVG polyline points.
+
+    Args:
+        values (list[float]): 各位置的品質 / Quality per position.
+        length (int): 橫軸的位置數 / Number of positions on the x axis.
+
+    Returns:
+        str: polyline 座標 / Polyline points.
+    """
+    scale_x = PLOT_WIDTH / max(length - 1, 1)
+    scale_y = (PLOT_HEIGHT - 20) / 45
+    return " ".join(
+        f"{i * scale_x:.1f},{PLOT_HEIGHT - min(value, 45) * scale_y:.1f}"
+        for i, value in enumerate(values)
+    )
+
+
+def write_qc_report(json_path: Path, html_path: Path, samples: dict[str, dict[str, Any]]) -> None:
+    """寫出 JSON 與 HTML 品質報告
+
+    Write the JSON and HTML quality reports.
+
+    Args:
+        json_path (Path): JSON 報告路徑 / JSON report path.
+        html_path (Path): HTML 報告路徑 / HTML report path.
+        samples (dict[str, dict[str, Any]]): 樣本名稱 -> scan_fastq_pair 的結果 /
+            Sample name -> result of scan_fastq_pair.
+    """
+    report = {"schema_version": REPORT_SCHEMA_VERSION, "samples": samples}
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False)
+
+    plots = {}
+    for name, sample in samples.items():
+        plots[name] = {}
+        for read in ("r1", "r2"):
+            quantiles = sample[read]["quality_by_position"]
+            length = len(quantiles["median"])
+            plots[name][read.upper()] = {
+                key: _polyline(quantiles[key], length) for key in ("q10", "median", "q90")
+            }
+
+    environment = jinja2.Environment(autoescape=True)
+    html = environment.from_string(HTML_TEMPLATE).render(
+        samples=samples, plots=plots, width=PLOT_WIDTH, height=PLOT_HEIGHT
+    )
+    html_path.write_text(html, encoding="utf-8")
+
+    mismatched = [name for name, sample in samples.items() if not sample["read_counts_match"]]
+    logger.info(f"已寫出輸入品質報告: {json_path} ({len(samples)} 個樣本)")
+    if mismatched:
+        logger.warning(f"R1 / R2 讀序數不一致的樣本: {', '.join(mismatched)}")
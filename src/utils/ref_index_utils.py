@@ -0,0 +1,605 @@
+"""參考序列完全比對索引
+
+Exact-match reference index used to short-circuit BLAST.
+
+索引建在 BLAST 資料庫旁 (<db_name>.exactidx/), 內容為資料庫的所有序列、
+全長序列雜湊, 以及每隔 step 個位置取樣的 2-bit k-mer。
+
+查詢序列若與至少 max_hits (-max_target_seqs) 條參考序列完全相同或為其子序列, 便直接產生
+identity 100 / coverage 100 的結果: blastn 回傳的 max_hits 個結果此時也都是全長完全比對,
+輸出與 blastn 相同 (僅同分結果的順序可能不同)。完全比對不足 max_hits 條時, blastn
+會以其他近似序列 (可能是其他物種的 >= 97% 命中) 補足, 因此這些查詢仍送入 blastn。
+
+The index lives next to the BLAST database (<db_name>.exactidx/) and stores every database
+sequence, a hash of each full sequence and 2-bit k-mers sampled every `step` positions.
+
+A query identical to, or contained in, at least max_hits (-max_target_seqs) references gets
+identity 100 / coverage 100 results directly: the max_hits targets blastn would report are
+then all full-length exact matches too, so the output is the same apart from the order of
+equally scoring hits. With fewer exact matches blastn fills the remaining slots with other
+near-identical targets, possibly >= 97% hits of other species, so those queries still go to
+blastn.
+"""
+
+from collections.abc import Callable, Sequence
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+from src.utils.fastx_utils import iter_fasta
+from src.utils.logger_utils import get_logger
+from src.utils.subprocess_utils import iter_command_lines
+
+logger = get_logger(__name__)
+
+INDEX_SUFFIX = ".exactidx"
+KMER_SIZE = 32
+KMER_STEP = 16
+
+# 索引可直接產生的 outfmt 6 欄位
+# outfmt 6 fields the index can produce
+SUPPORTED_FIELDS = frozenset({"qseqid", "pident", "qcovs", "sscinames", "sacc", "qlen"})
+
+# A/C/G/T -> 0..3, 其他鹼基 -> 255
+# A/C/G/T -> 0..3, any other base -> 255
+_BASE_CODES = np.full(256, 255, dtype=np.uint8)
+for _code, _base in enumerate(b"ACGT"):
+    _BASE_CODES[_base] = _code
+    _BASE_CODES[ord(chr(_base).lower())] = _code
+_KMER_SHIFTS = np.arange(2 * (KMER_SIZE - 1), -1, -2, dtype=np.uint64)
+
+
+def _sequence_hash(seq: bytes) -> int:
+    """計算序列的 64-bit 雜湊
+
+    Compute a 64-bit hash of a sequence.
+
+    Args:
+        seq (bytes): 序列 / Sequence.
+
+    Returns:
+        int: 雜湊值 / Hash value.
+    """
+    return int.from_bytes(hashlib.blake2b(seq, digest_size=8).digest(), "little")
+
+
+def _kmer_codes(seq: bytes, positions: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """計算 2-bit 編碼的 k-mer (略過含非 ACGT 鹼基的 k-mer)
+
+    Compute 2-bit packed k-mers, skipping k-mers that contain non-ACGT bases.
+
+    Args:
+        seq (bytes): 序列 / Sequence.
+        positions (np.ndarray | None): 要計算的起始位置, None 表示全部 / Start positions, None for all.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: k-mer 編碼與對應位置 / K-mer codes and their positions.
+    """
+    if len(seq) < KMER_SIZE:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+
+    codes = _BASE_CODES[np.frombuffer(seq, dtype=np.uint8)]
+    windows = np.lib.stride_tricks.sliding_window_view(codes, KMER_SIZE)
+    if positions is None:
+        positions = np.arange(windows.shape[0])
+    windows = windows[positions]
+
+    valid = ~(windows == 255).any(axis=1)
+    windows = windows[valid].astype(np.uint64)
+    kmers = np.bitwise_or.reduce(windows << _KMER_SHIFTS, axis=1)
+    return kmers, positions[valid]
+
+
+class ExactMatchIndex:
+    """參考序列完全比對索引
+
+    Exact and substring match index over a reference database.
+    """
+
+    def __init__(self, index_dir: Path) -> None:
+        """載入索引 (序列與 k-mer 以記憶體映射方式讀取)
+
+        Load an index; sequence and k-mer arrays are memory-mapped.
+
+        Args:
+            index_dir (Path): 索引目錄 / Index directory.
+        """
+        self.index_dir = index_dir
+        meta = json.loads((index_dir / "meta.json").read_text(encoding="utf-8"))
+        self.kmer_size: int = meta["kmer_size"]
+        self.kmer_step: int = meta["kmer_step"]
+        self.sequences = np.load(index_dir / "sequences.npy", mmap_mode="r")
+        self.offsets = np.load(index_dir / "offsets.npy", mmap_mode="r")
+        self.seq_hashes = np.load(index_dir / "seq_hashes.npy", mmap_mode="r")
+        self.hash_refs = np.load(index_dir / "hash_refs.npy", mmap_mode="r")
+        self.kmers = np.load(index_dir / "kmers.npy", mmap_mode="r")
+        self.kmer_refs = np.load(index_dir / "kmer_refs.npy", mmap_mode="r")
+        self.accessions = (index_dir / "accessions.txt").read_text(encoding="utf-8").splitlines()
+        self.species = (index_dir / "species.txt").read_text(encoding="utf-8").splitlines()
+
+    @staticmethod
+    def index_dir_for(db_dir: Path | str, db_name: str) -> Path:
+        """取得資料庫對應的索引目錄
+
+        Get the index directory of a database.
+
+        Args:
+            db_dir (Path | str): 資料庫目錄 / Database directory.
+            db_name (str): 資料庫名稱 / Database name.
+
+        Returns:
+            Path: 索引目錄 / Index directory.
+        """
+        return Path(db_dir) / f"{db_name}{INDEX_SUFFIX}"
+
+    @classmethod
+    def load(cls, db_dir: Path | str, db_name: str) -> "ExactMatchIndex | None":
+        """載入資料庫旁的索引, 不存在時回傳 None
+
+        Load the index next to a database, or None if it has not been built.
+
+        Args:
+            db_dir (Path | str): 資料庫目錄 / Database directory.
+            db_name (str): 資料庫名稱 / Database name.
+
+        Returns:
+            ExactMatchIndex | None: 索引或 None / Index or None.
+        """
+        index_dir = cls.index_dir_for(db_dir, db_name)
+        if not (index_dir / "meta.json").exists():
+            return None
+        try:
+            return cls(index_dir)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"完全比對索引讀取失敗, 將全部使用 BLAST: {e}")
+            return None
+
+    @staticmethod
+    def build(
+        records: Sequence[tuple[str, str, bytes]],
+        index_dir: Path,
+        kmer_step: int = KMER_STEP,
+    ) -> None:
+        """由參考序列建立索引
+
+        Build an index from reference records.
+
+        Args:
+            records (Sequence[tuple[str, str, bytes]]): (accession, 物種名, 序列) / (accession, species, sequence).
+            index_dir (Path): 索引輸出目錄 / Index output directory.
+            kmer_step (int): k-mer 取樣間隔 / K-mer sampling step.
+        """
+        index_dir.mkdir(parents=True, exist_ok=True)
+        (index_dir / "meta.json").unlink(missing_ok=True)
+
+        lengths = np.fromiter((len(seq) for _, _, seq in records), dtype=np.int64)
+        offsets = np.zeros(len(records) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        sequences = np.empty(int(offsets[-1]), dtype=np.uint8)
+
+        seq_hashes = np.empty(len(records), dtype=np.uint64)
+        kmer_parts: list[np.ndarray] = []
+        kmer_ref_parts: list[np.ndarray] = []
+
+        for ref_id, (_, _, seq) in enumerate(records):
+            seq = seq.upper()
+            sequences[offsets[ref_id] : offsets[ref_id + 1]] = np.frombuffer(seq, dtype=np.uint8)
+            seq_hashes[ref_id] = _sequence_hash(seq)
+
+            if len(seq) >= KMER_SIZE:
+                positions = np.arange(0, len(seq) - KMER_SIZE + 1, kmer_step)
+                kmers, _ = _kmer_codes(seq, positions)
+                kmer_parts.append(kmers)
+                kmer_ref_parts.append(np.full(len(kmers), ref_id, dtype=np.uint32))
+
+        kmers = np.concatenate(kmer_parts) if kmer_parts else np.empty(0, dtype=np.uint64)
+        kmer_refs = (
+            np.concatenate(kmer_ref_parts) if kmer_ref_parts else np.empty(0, dtype=np.uint32)
+        )
+        kmer_order = np.argsort(kmers, kind="stable")
+        hash_order = np.argsort(seq_hashes, kind="stable")
+
+        np.save(index_dir / "sequences.npy", sequences)
+        np.save(index_dir / "offsets.npy", offsets)
+        np.save(index_dir / "seq_hashes.npy", seq_hashes[hash_order])
+        np.save(index_dir / "hash_refs.npy", hash_order.astype(np.uint32))
+        np.save(index_dir / "kmers.npy", kmers[kmer_order])
+        np.save(index_dir / "kmer_refs.npy", kmer_refs[kmer_order])
+        (index_dir / "accessions.txt").write_text(
+            "".join(f"{accession}\n" for accession, _, _ in records), encoding="utf-8"
+        )
+        (index_dir / "species.txt").write_text(
+            "".join(f"{species}\n" for _, species, _ in records), encoding="utf-8"
+        )
+        # meta.json 最後寫入, 作為索引完整的標記
+        # meta.json is written last and marks the index as complete
+        (index_dir / "meta.json").write_text(
+            json.dumps(
+                {"kmer_size": KMER_SIZE, "kmer_step": kmer_step, "references": len(records)}
+            ),
+            encoding="utf-8",
+        )
+        logger.info(f"完全比對索引建立完成: {index_dir} (共 {len(records)} 條序列)")
+
+    def _reference(self, ref_id: int) -> bytes:
+        """取得參考序列
+
+        Get a reference sequence.
+
+        Args:
+            ref_id (int): 參考序列編號 / Reference id.
+
+        Returns:
+            bytes: 序列 / Sequence.
+        """
+        return self.sequences[self.offsets[ref_id] : self.offsets[ref_id + 1]].tobytes()
+
+    def lookup(self, query: bytes, max_hits: int) -> list[int]:
+        """查詢完全相同或包含查詢序列的參考序列
+
+        Find references identical to, or containing, the query.
+
+        完全相同者排在前面; 長度不足 kmer_size + kmer_step - 1 的查詢只做全長比對。
+
+        Identical references come first; queries shorter than kmer_size + kmer_step - 1 are
+        only matched over their full length.
+
+        Args:
+            query (bytes): 查詢序列 / Query sequence.
+            max_hits (int): 最多回傳的參考序列數 / Maximum number of references returned.
+
+        Returns:
+            list[int]: 參考序列編號 / Reference ids.
+        """
+        query = query.upper()
+        hits: list[int] = []
+
+        query_hash = np.uint64(_sequence_hash(query))
+        left = int(np.searchsorted(self.seq_hashes, query_hash, side="left"))
+        right = int(np.searchsorted(self.seq_hashes, query_hash, side="right"))
+        for ref_id in self.hash_refs[left:right]:
+            if self._reference(int(ref_id)) == query:
+                hits.append(int(ref_id))
+                if len(hits) >= max_hits:
+                    return hits
+
+        if len(query) < self.kmer_size + self.kmer_step - 1:
+            return hits
+
+        query_kmers, _ = _kmer_codes(query, np.arange(self.kmer_step))
+        if query_kmers.size == 0:
+            return hits
+        lefts = np.searchsorted(self.kmers, query_kmers, side="left")
+        rights = np.searchsorted(self.kmers, query_kmers, side="right")
+        candidates = np.unique(
+            np.concatenate(
+                [self.kmer_refs[lo:hi] for lo, hi in zip(lefts, rights, strict=True)]
+            ).astype(np.int64)
+        )
+
+        for ref_id in candidates:
+            ref_id = int(ref_id)
+            if ref_id in hits:
+                continue
+            if query in self._reference(ref_id):
+                hits.append(ref_id)
+                if len(hits) >= max_hits:
+                    break
+        return hits
+
+    def format_hit(self, query_id: str, query: bytes, ref_id: int, fields: Sequence[str]) -> str:
+        """依 BLAST outfmt 6 欄位格式化命中結果
+
+        Format a hit as a BLAST outfmt 6 line.
+
+        Args:
+            query_id (str): 查詢序列編號 / Query id.
+            query (bytes): 查詢序列 / Query sequence.
+            ref_id (int): 參考序列編號 / Reference id.
+            fields (Sequence[str]): outfmt 6 欄位 / outfmt 6 fields.
+
+        Returns:
+            str: 一行 BLAST 結果 / One BLAST result line.
+        """
+        values = {
+            "qseqid": query_id,
+            "pident": "100.000",
+            "qcovs": "100",
+            "sscinames": self.species[ref_id],
+            "sacc": self.accessions[ref_id],
+            "qlen": str(len(query)),
+        }
+        return "\t".join(values[field] for field in fields)
+
+
+class CombinedExactMatchIndex:
+    """多個 volume 索引的組合 (對應 .nal alias 資料庫)
+
+    Combination of per-volume indexes, matching a .nal alias database.
+
+    參考序列編號為全域編號: 第 i 個 volume 的編號加上前面所有 volume 的序列數。
+
+    Reference ids are global: ids of volume i are offset by the number of references in all
+    preceding volumes.
+    """
+
+    def __init__(self, volumes: Sequence[ExactMatchIndex]) -> None:
+        """初始化組合索引
+
+        Initialize combined index.
+
+        Args:
+            volumes (Sequence[ExactMatchIndex]): 各 volume 的索引 / Per-volume indexes.
+        """
+        self.volumes = list(volumes)
+        self.bases = np.cumsum([0] + [len(volume.accessions) for volume in self.volumes])
+
+    def _locate(self, ref_id: int) -> tuple[ExactMatchIndex, int]:
+        """將全域編號轉為 (volume, 區域編號)
+
+        Convert a global id into (volume, local id).
+
+        Args:
+            ref_id (int): 全域參考序列編號 / Global reference id.
+
+        Returns:
+            tuple[ExactMatchIndex, int]: volume 索引與區域編號 / Volume index and local id.
+        """
+        volume_id = int(np.searchsorted(self.bases, ref_id, side="right")) - 1
+        return self.volumes[volume_id], ref_id - int(self.bases[volume_id])
+
+    def lookup(self, query: bytes, max_hits: int) -> list[int]:
+        """在所有 volume 中查詢 (完全相同者優先)
+
+        Look up a query in every volume, identical references first.
+
+        Args:
+            query (bytes): 查詢序列 / Query sequence.
+            max_hits (int): 最多回傳的參考序列數 / Maximum number of references returned.
+
+        Returns:
+            list[int]: 全域參考序列編號 / Global reference ids.
+        """
+        exact: list[int] = []
+        contained: list[int] = []
+        for base, volume in zip(self.bases, self.volumes, strict=False):
+            for ref_id in volume.lookup(query, max_hits):
+                target = exact if len(volume._reference(ref_id)) == len(query) else contained
+                target.append(int(base) + ref_id)
+        return (exact + contained)[:max_hits]
+
+    def format_hit(self, query_id: str, query: bytes, ref_id: int, fields: Sequence[str]) -> str:
+        """依 BLAST outfmt 6 欄位格式化命中結果
+
+        Format a hit as a BLAST outfmt 6 line.
+
+        Args:
+            query_id (str): 查詢序列編號 / Query id.
+            query (bytes): 查詢序列 / Query sequence.
+            ref_id (int): 全域參考序列編號 / Global reference id.
+            fields (Sequence[str]): outfmt 6 欄位 / outfmt 6 fields.
+
+        Returns:
+            str: 一行 BLAST 結果 / One BLAST result line.
+        """
+        volume, local_id = self._locate(ref_id)
+        return volume.format_hit(query_id, query, local_id, fields)
+
+
+ReferenceIndex = ExactMatchIndex | CombinedExactMatchIndex
+
+
+def read_alias_volumes(alias_path: Path) -> list[str]:
+    """讀取 .nal alias 的 DBLIST
+
+    Read the DBLIST of a .nal alias.
+
+    Args:
+        alias_path (Path): alias 檔案路徑 / Alias file path.
+
+    Returns:
+        list[str]: volume (或其他 alias) 名稱 / Names of volumes or nested aliases.
+    """
+    volume_names: list[str] = []
+    for line in alias_path.read_text(encoding="utf-8", errors="replace").splitlines():
+        if line.startswith("DBLIST"):
+            volume_names.extend(name.strip('"') for name in line.split()[1:])
+    return volume_names
+
+
+def load_exact_index(db_dir: Path | str, db_name: str) -> ReferenceIndex | None:
+    """載入資料庫的完全比對索引 (支援 .nal alias)
+
+    Load the exact-match index of a database, resolving .nal aliases.
+
+    alias 本身沒有索引時, 若 DBLIST 中的每個 volume 都有索引, 便組合使用。
+
+    When the alias has no index of its own but every DBLIST volume does, the volume indexes
+    are combined.
+
+    Args:
+        db_dir (Path | str): 資料庫目錄 / Database directory.
+        db_name (str): 資料庫名稱 / Database name.
+
+    Returns:
+        ReferenceIndex | None: 索引或 None / Index or None.
+    """
+    index = ExactMatchIndex.load(db_dir, db_name)
+    if index is not None:
+        return index
+
+    alias_path = Path(db_dir) / f"{db_name}.nal"
+    if not alias_path.exists():
+        return None
+
+    volumes = [ExactMatchIndex.load(db_dir, name) for name in read_alias_volumes(alias_path)]
+    if not volumes or any(volume is None for volume in volumes):
+        return None
+    return CombinedExactMatchIndex([volume for volume in volumes if volume is not None])
+
+
+def build_exact_index_from_db(
+    blastdbcmd_path: Path | str, db_dir: Path | str, db_name: str
+) -> Path:
+    """以 blastdbcmd 匯出資料庫序列並建立索引
+
+    Export database sequences with blastdbcmd and build the exact-match index.
+
+    Args:
+        blastdbcmd_path (Path | str): blastdbcmd 執行檔路徑 / blastdbcmd executable path.
+        db_dir (Path | str): 資料庫目錄 / Database directory.
+        db_name (str): 資料庫名稱 / Database name.
+
+    Returns:
+        Path: 索引目錄 / Index directory.
+    """
+    index_dir = ExactMatchIndex.index_dir_for(db_dir, db_name)
+    cmd = [
+        str(blastdbcmd_path),
+        "-db",
+        db_name,
+        "-entry",
+        "all",
+        "-outfmt",
+        "%a\t%S\t%s",
+    ]
+    logger.info(f"匯出資料庫序列以建立完全比對索引: {db_name}")
+
+    # 逐行讀取 blastdbcmd 的輸出, 不保留整份文字輸出
+    # Stream blastdbcmd output line by line instead of holding the whole text output
+    records: list[tuple[str, str, bytes]] = []
+    for line in iter_command_lines(cmd, cwd=db_dir):
+        parts = line.split("\t")
+        if len(parts) == 3 and parts[2]:
+            records.append((parts[0], parts[1], parts[2].encode("ascii", errors="replace")))
+
+    ExactMatchIndex.build(records, index_dir)
+    return index_dir
+
+
+def split_resolved_queries(
+    index: ReferenceIndex,
+    query_fasta: Path,
+    unresolved_fasta: Path,
+    fields: Sequence[str],
+    max_hits: int,
+) -> tuple[list[str], dict[str, list[str]]]:
+    """以索引解析查詢, 未解析者寫入另一個 FASTA 檔案供 blastn 使用
+
+    Resolve queries through the index and write the rest to a FASTA file for blastn.
+
+    只有找到 max_hits 條完全比對參考序列的查詢才由索引解析, 其餘 (包含部分完全比對者)
+    都送入 blastn, 以保留其他物種的近似命中。
+
+    Only queries with max_hits exact references are resolved by the index; all others,
+    including partially resolved ones, go to blastn so near-identical hits of other species
+    are kept.
+
+    Args:
+        index (ReferenceIndex): 完全比對索引 / Exact-match index.
+        query_fasta (Path): 查詢 FASTA 檔案路徑 / Query FASTA file path.
+        unresolved_fasta (Path): 未解析查詢的輸出路徑 / Output path for unresolved queries.
+        fields (Sequence[str]): outfmt 6 欄位 / outfmt 6 fields.
+        max_hits (int): 每個查詢最多的結果數 (-max_target_seqs) / Maximum hits per query.
+
+    Returns:
+        tuple[list[str], dict[str, list[str]]]: 查詢順序與已解析的結果行 / Query order and resolved result lines.
+    """
+    query_order: list[str] = []
+    resolved: dict[str, list[str]] = {}
+
+    with open(unresolved_fasta, "wb") as f_out:
+        for header, seq in iter_fasta(query_fasta):
+            query_id = header.split()[0].decode("utf-8", errors="replace") if header else ""
+            query_order.append(query_id)
+            hits = index.lookup(seq, max_hits)
+            if len(hits) >= max_hits:
+                resolved[query_id] = [
+                    index.format_hit(query_id, seq, ref_id, fields) for ref_id in hits
+                ]
+            else:
+                f_out.write(b">" + header + b"\n" + seq + b"\n")
+
+    logger.info(f"完全比對索引解析 {len(resolved)}/{len(query_order)} 條查詢序列")
+    return query_order, resolved
+
+
+def merge_blast_output(
+    query_order: Sequence[str],
+    resolved: dict[str, list[str]],
+    blast_output: Path | None,
+    output_txt: Path,
+) -> None:
+    """依原始查詢順序合併索引結果與 BLAST 結果
+
+    Merge index results and BLAST results in the original query order.
+
+    Args:
+        query_order (Sequence[str]): 原始查詢順序 / Original query order.
+        resolved (dict[str, list[str]]): 索引解析結果 / Lines resolved by the index.
+        blast_output (Path | None): blastn 結果 (可為 None) / blastn output, may be None.
+        output_txt (Path): 合併後輸出路徑 / Merged output path.
+    """
+    blasted: dict[str, list[str]] = {}
+    if blast_output is not None and blast_output.exists():
+        with open(blast_output, encoding="utf-8") as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if line:
+                    blasted.setdefault(line.split("\t", 1)[0], []).append(line)
+
+    with open(output_txt, "w", encoding="utf-8") as f_out:
+        for query_id in dict.fromkeys(query_order):
+            for line in resolved.get(query_id) or blasted.get(query_id, []):
+                f_out.write(f"{line}\n")
+
+
+def blast_with_exact_index(
+    run_blast: Callable[[Path, Path], None],
+    query_fasta: Path,
+    output_txt: Path,
+    fields: Sequence[str],
+    max_hits: int,
+    index: ReferenceIndex | None,
+) -> None:
+    """先以完全比對索引解析查詢, 只將未解析者送入 blastn
+
+    Resolve queries with the exact-match index first and BLAST only the rest.
+
+    索引不存在或 outfmt 含索引無法產生的欄位時, 直接執行 blastn。
+
+    Falls back to a plain blastn run when there is no index or the outfmt contains fields
+    the index cannot produce.
+
+    Args:
+        run_blast (Callable[[Path, Path], None]): 執行 blastn(query, out) 的函式 / Function running blastn(query, out).
+        query_fasta (Path): 查詢 FASTA 檔案路徑 / Query FASTA file path.
+        output_txt (Path): 輸出檔案路徑 / Output file path.
+        fields (Sequence[str]): outfmt 6 欄位 / outfmt 6 fields.
+        max_hits (int): 每個查詢最多的結果數 / Maximum hits per query.
+        index (ReferenceIndex | None): 完全比對索引 / Exact-match index.
+    """
+    if index is None or not SUPPORTED_FIELDS.issuperset(fields):
+        run_blast(query_fasta, output_txt)
+        return
+
+    unresolved_fasta = output_txt.with_name(f"{output_txt.stem}_unresolved.fasta")
+    unresolved_txt = output_txt.with_name(f"{output_txt.stem}_unresolved.txt")
+    # 失敗時也要移除暫存檔, 殘留的 .txt 會被當成 BLAST 結果
+    # Remove the temporary files on failure too; a leftover .txt would be taken for a result
+    try:
+        query_order, resolved = split_resolved_queries(
+            index, query_fasta, unresolved_fasta, fields, max_hits
+        )
+
+        blast_output = None
+        if len(resolved) < len(set(query_order)):
+            run_blast(unresolved_fasta, unresolved_txt)
+            blast_output = unresolved_txt
+
+        merge_blast_output(query_order, resolved, blast_output, output_txt)
+    finally:
+        unresolved_fasta.unlink(missing_ok=True)
+        unresolved_txt.unlink(missing_ok=True)
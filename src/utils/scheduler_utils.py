@@ -0,0 +1,361 @@
+"""CPU 與記憶體預算排程工具
+
+CPU and memory budget scheduling utilities.
+
+排程器擁有整體的 CPU 與記憶體預算, 並針對每個步驟決定要同時處理多少樣本,
+以及每個外部工具可使用多少執行緒, 避免樣本平行與工具內部平行互相超額使用資源。
+內建步驟在本程序中以 Python 執行, 執行緒會被 GIL 序列化, 因此其核心改交給每個樣本
+的子程序批次處理, 而非同時執行更多樣本。
+
+The scheduler owns the overall CPU and memory budget and decides, per stage, how many
+samples run at once and how many threads each external tool gets, so inter-sample and
+intra-tool parallelism never oversubscribe the host together. Built-in stages run Python in
+this process, where threads are serialized by the GIL, so their cores go to each sample's
+worker processes instead of to more concurrent samples.
+"""
+
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+import ctypes
+from dataclasses import asdict, dataclass
+import os
+import sys
+from typing import Any
+
+from src.utils.logger_utils import get_logger, log_context, worker_logging
+
+logger = get_logger(__name__)
+
+# 保留給作業系統與 GUI 的記憶體比例
+# Fraction of physical memory left for the OS and the GUI
+MEMORY_RESERVE_FRACTION = 0.2
+
+# 偵測失敗時假設的記憶體大小 (8 GiB)
+# Memory assumed when detection fails (8 GiB)
+FALLBACK_MEMORY_BYTES = 8 * 1024**3
+
+# 排程模式: 樣本以執行緒同時執行外部工具, 或每個樣本的批次在子程序中執行
+# Scheduling modes: samples run external tools from threads, or each sample's batches run in
+# worker processes
+THREAD_MODE = "threads"
+PROCESS_MODE = "processes"
+
+
+@dataclass(slots=True, frozen=True)
+class ResourceBudget:
+    """可用的 CPU 與記憶體預算
+
+    Available CPU and memory budget.
+    """
+
+    cpus: int
+    memory_bytes: int
+
+
+@dataclass(slots=True, frozen=True)
+class ToolProfile:
+    """外部工具的資源特性
+
+    Resource profile of an external tool.
+
+    memory_bytes 為每個程序預留的記憶體; 有單一程序記憶體上限的工具 (如 32 位元 usearch
+    的 4 GB) 應直接填入該上限, 因為額外的記憶體只能透過同時執行更多程序來利用。
+
+    memory_bytes is reserved per process. Tools with a per-process ceiling (such as the
+    4 GB of 32-bit usearch) should use that ceiling, since extra memory can only be used by
+    running more processes.
+
+    native 為內建的 Python 步驟: 其執行緒數即為每個樣本的子程序數
+    (ordered_process_map 的 workers), 每個子程序各預留 memory_bytes。
+
+    native marks a built-in Python stage. Its thread count is the number of worker processes
+    per sample (the ``workers`` of ordered_process_map), each reserving memory_bytes.
+    """
+
+    name: str
+    max_threads: int
+    memory_bytes: int
+    native: bool = False
+
+
+@dataclass(slots=True, frozen=True)
+class StagePlan:
+    """單一步驟的排程決策
+
+    Scheduling decision for one stage.
+    """
+
+    stage: str
+    tool: str
+    items: int
+    workers: int
+    threads: int
+    limited_by: str
+    mode: str = THREAD_MODE
+
+
+def ordered_process_map(
+    func: Callable[..., Any], arg_iter: Iterable[tuple[Any, ...]], workers: int
+) -> Iterator[Any]:
+    """以子程序平行處理並依輸入順序產出結果
+
+    Map a function over argument tuples in worker processes, yielding results in input order.
+
+    排隊中的工作數限制為 workers 的兩倍, 輸入可為大型檔案的串流批次。
+    workers <= 1 時直接在目前程序中執行。子程序的日誌會送回主程序並保留呼叫者的步驟與樣本。
+
+    At most twice ``workers`` jobs are queued, so the input may be a stream of batches from a
+    large file. With workers <= 1 everything runs in the current process. Worker processes
+    send their log records to the main process and keep the caller's stage and sample.
+
+    Args:
+        func (Callable[..., Any]): 可序列化的模組層級函式 / Picklable module-level function.
+        arg_iter (Iterable[tuple[Any, ...]]): 每個工作的位置參數 / Positional arguments per job.
+        workers (int): 子程序數 / Number of worker processes.
+
+    Yields:
+        Any: 依輸入順序的結果 / Results in input order.
+    """
+    if workers <= 1:
+        for args in arg_iter:
+            yield func(*args)
+        return
+
+    pending: deque[Future] = deque()
+    initializer, initargs = worker_logging()
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=initializer, initargs=initargs
+    ) as executor:
+        for args in arg_iter:
+            pending.append(executor.submit(func, *args))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _sample_label(args: tuple[Any, ...]) -> str:
+    """由步驟參數中的第一個檔案名稱取得樣本名稱 (第一個 "." 之前的部分)
+
+    Get the sample name from the first file name among stage arguments, up to its first ".".
+
+    Args:
+        args (tuple[Any, ...]): 單一項目的位置參數 / Positional arguments of one item.
+
+    Returns:
+        str: 樣本名稱, 找不到檔案名稱時為 "-" / Sample name, or "-" without a file name.
+    """
+    name = next((arg for arg in args if isinstance(arg, str)), None)
+    return name.split(".")[0] if name else "-"
+
+
+def _run_item(stage: str, func: Callable[..., Any], args: tuple[Any, ...], threads: int) -> None:
+    """在日誌帶有步驟與樣本的情況下執行單一項目
+
+    Run one item with the stage and sample attached to its log records.
+
+    Args:
+        stage (str): 步驟名稱 / Stage name.
+        func (Callable[..., Any]): 處理單一項目的函式 / Function processing one item.
+        args (tuple[Any, ...]): 位置參數 / Positional arguments.
+        threads (int): 工具執行緒數 / Tool thread count.
+    """
+    with log_context(stage=stage, sample=_sample_label(args)):
+        func(*args, threads=threads)
+
+
+def _detect_memory_bytes() -> int:
+    """偵測實體記憶體大小
+
+    Detect the amount of physical memory.
+
+    Returns:
+        int: 實體記憶體位元組數 / Physical memory in bytes.
+    """
+    if sys.platform == "win32":
+
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong),
+                ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("sullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+
+        status = MemoryStatus()
+        status.dwLength = ctypes.sizeof(MemoryStatus)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return int(status.ullTotalPhys)
+        return FALLBACK_MEMORY_BYTES
+
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return FALLBACK_MEMORY_BYTES
+
+
+def detect_resource_budget(
+    cpus: int | None = None, memory_gb: float | None = None
+) -> ResourceBudget:
+    """建立資源預算 (未指定的項目由主機偵測)
+
+    Build a resource budget, detecting unspecified values from the host.
+
+    Args:
+        cpus (int | None): CPU 核心數 / Number of CPU cores.
+        memory_gb (float | None): 記憶體 (GB) / Memory in GB.
+
+    Returns:
+        ResourceBudget: 資源預算 / Resource budget.
+    """
+    if cpus is None:
+        cpus = os.cpu_count() or 1
+    if memory_gb is None:
+        memory_bytes = int(_detect_memory_bytes() * (1 - MEMORY_RESERVE_FRACTION))
+    else:
+        memory_bytes = int(memory_gb * 1024**3)
+    return ResourceBudget(cpus=max(cpus, 1), memory_bytes=max(memory_bytes, 1))
+
+
+class CoreScheduler:
+    """在樣本平行與工具執行緒之間分配 CPU 預算
+
+    Split the CPU budget between concurrent samples and per-tool threads.
+
+    先以樣本數、核心數與記憶體容量決定同時執行的樣本數, 剩餘的核心再分給每個工具的
+    執行緒; 因此樣本少或記憶體受限時, 每個工具會得到較多執行緒。
+
+    The number of concurrent samples is bounded by the item count, the cores and the memory
+    slots; the remaining cores go to each tool's threads. With few samples or tight memory,
+    each tool therefore gets more threads.
+
+    內建步驟則先讓每個樣本使用至多 max_threads 個子程序, 只有核心數超過時才同時執行多個
+    樣本, 避免樣本數不少於核心數時每個樣本都只在本程序中以單一核心執行。
+
+    Built-in stages instead first give each sample up to max_threads worker processes and
+    run several samples at once only when there are more cores than that. Otherwise, with at
+    least as many samples as cores, every sample would run in this process on a single core.
+    """
+
+    def __init__(self, budget: ResourceBudget) -> None:
+        """初始化排程器
+
+        Initialize the scheduler.
+
+        Args:
+            budget (ResourceBudget): 資源預算 / Resource budget.
+        """
+        self.budget = budget
+        self.decisions: list[StagePlan] = []
+
+    def plan(self, stage: str, profile: ToolProfile, items: int) -> StagePlan:
+        """決定單一步驟的樣本平行數與工具執行緒數
+
+        Decide sample concurrency and tool threads for one stage.
+
+        Args:
+            stage (str): 步驟名稱 / Stage name.
+            profile (ToolProfile): 工具資源特性 / Tool resource profile.
+            items (int): 待處理項目數 / Number of items to process.
+
+        Returns:
+            StagePlan: 排程決策 / Scheduling decision.
+        """
+        memory_slots = max(self.budget.memory_bytes // profile.memory_bytes, 1)
+        if profile.native:
+            # 子程序數同時受核心數與記憶體限制, 樣本平行只用來填滿超過 max_threads 的核心
+            # Worker processes are bounded by both cores and memory; sample concurrency only
+            # fills the cores beyond max_threads
+            processes = min(self.budget.cpus, memory_slots)
+            limits = {
+                "items": max(items, 1),
+                "cpus": max(self.budget.cpus // profile.max_threads, 1),
+                "memory": max(memory_slots // profile.max_threads, 1),
+            }
+            mode = PROCESS_MODE
+        else:
+            processes = self.budget.cpus
+            limits = {
+                "items": max(items, 1),
+                "cpus": self.budget.cpus,
+                "memory": memory_slots,
+            }
+            mode = THREAD_MODE
+        limited_by = min(limits, key=limits.__getitem__)
+        workers = limits[limited_by]
+        threads = max(min(profile.max_threads, processes // workers), 1)
+
+        plan = StagePlan(
+            stage=stage,
+            tool=profile.name,
+            items=items,
+            workers=workers,
+            threads=threads,
+            limited_by=limited_by,
+            mode=mode,
+        )
+        self.decisions.append(plan)
+        unit = "子程序" if mode == PROCESS_MODE else "執行緒"
+        logger.info(
+            f"排程 {stage}: {workers} 個樣本同時執行 x {threads} {unit} ({profile.name}, 受限於 {limited_by})"
+        )
+        return plan
+
+    def run(
+        self,
+        stage: str,
+        profile: ToolProfile,
+        func: Callable[..., Any],
+        arg_list: Sequence[tuple[Any, ...]],
+    ) -> None:
+        """依排程決策平行執行步驟
+
+        Run a stage in parallel according to the scheduling decision.
+
+        每個呼叫會收到 threads 關鍵字參數; 任一項目失敗時拋出其例外。
+
+        Each call receives a ``threads`` keyword argument. The first failing item re-raises
+        its exception.
+
+        內建步驟的 threads 為該樣本的子程序數; 同時執行的樣本執行緒只負責讀寫與分派批次。
+
+        For built-in stages ``threads`` is the sample's number of worker processes, and
+        concurrent sample threads only read, write and dispatch batches.
+
+        Args:
+            stage (str): 步驟名稱 / Stage name.
+            profile (ToolProfile): 工具資源特性 / Tool resource profile.
+            func (Callable[..., Any]): 處理單一項目的函式 / Function processing one item.
+            arg_list (Sequence[tuple[Any, ...]]): 每個項目的位置參數 / Positional arguments per item.
+        """
+        plan = self.plan(stage, profile, len(arg_list))
+        if plan.workers == 1:
+            for args in arg_list:
+                _run_item(stage, func, args, plan.threads)
+            return
+
+        with ThreadPoolExecutor(max_workers=plan.workers) as executor:
+            futures = [
+                executor.submit(_run_item, stage, func, args, plan.threads) for args in arg_list
+            ]
+            for future in futures:
+                future.result()
+
+    def to_dict(self) -> dict[str, Any]:
+        """將預算與所有決策轉為可序列化的字典
+
+        Convert the budget and all decisions to a serializable dictionary.
+
+        Returns:
+            dict[str, Any]: 排程紀錄 / Scheduling record.
+        """
+        return {
+            "budget": asdict(self.budget),
+            "stages": [asdict(plan) for plan in self.decisions],
+        }
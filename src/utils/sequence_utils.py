@@ -3,6 +3,48 @@
 Sequence processing utility functions.
 """
 
+# IUPAC 鹼基代碼對應的鹼基集合
+# Nucleotides denoted by each IUPAC code
+IUPAC_CODES = {
+    "A": "A",
+    "C": "C",
+    "G": "G",
+    "T": "T",
+    "U": "T",
+    "R": "AG",
+    "Y": "CT",
+    "S": "CG",
+    "W": "AT",
+    "K": "GT",
+    "M": "AC",
+    "B": "CGT",
+    "D": "AGT",
+    "H": "ACT",
+    "V": "ACG",
+    "N": "ACGT",
+}
+
+# 互補鹼基 (含 IUPAC 簡併碼)
+# Complementary bases, including IUPAC degenerate codes
+COMPLEMENT = {
+    "A": "T",
+    "T": "A",
+    "C": "G",
+    "G": "C",
+    "U": "A",
+    "R": "Y",
+    "Y": "R",
+    "S": "S",
+    "W": "W",
+    "K": "M",
+    "M": "K",
+    "B": "V",
+    "V": "B",
+    "D": "H",
+    "H": "D",
+    "N": "N",
+}
+
 
 def reverse_complement(seq: str) -> str:
     """計算反向互補序列
@@ -15,5 +57,4 @@ def reverse_complement(seq: str) -> str:
     Returns:
         str: 反向互補序列 / Reverse complement sequence.
     """
-    complement = {"A": "T", "T": "A", "C": "G", "G": "C"}
-    return "".join(complement.get(base, base) for base in reversed(seq))
+    return "".join(COMPLEMENT.get(base, base) for base in reversed(seq))
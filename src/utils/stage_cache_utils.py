@@ -0,0 +1,317 @@
+"""以內容定址的步驟快取
+
+Content-addressable stage cache.
+
+每個步驟的輸出以 (輸入內容摘要, 步驟參數, 工具版本) 的雜湊值為鍵存放在快取資料夾中,
+因此不同輸出資料夾甚至不同專案中相同的輸入都能直接取用先前的結果。快取有容量上限,
+超過時依最近使用時間 (LRU) 淘汰。
+
+步驟輸出寫入快取或由快取取出後, 會記錄其摘要為 "<鍵>/<輸出名稱>"; 輸出完全由鍵決定,
+因此下游步驟不必重新讀取整個檔案計算摘要。
+
+Every stage output is stored in the cache folder under a hash of (input content digests,
+stage parameters, tool version), so identical inputs in other output folders or projects
+reuse earlier results. The cache has a size cap and evicts least recently used entries.
+
+Once a stage output is stored in or fetched from the cache, its digest is recorded as
+"<key>/<output name>". The output is fully determined by the key, so downstream stages do not
+need to read the whole file again to digest it.
+"""
+
+from collections.abc import Mapping, Sequence
+from functools import cache
+import hashlib
+import importlib
+import json
+import os
+from pathlib import Path
+import shutil
+import threading
+import time
+from typing import Any
+
+from src.utils.hash_utils import file_digest
+from src.utils.logger_utils import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_VERSION = 1
+INDEX_NAME = "index.json"
+
+# 快取索引中保留的檔案摘要數上限
+# Maximum number of file digests kept in the cache index
+MAX_DIGESTS = 20_000
+
+
+@cache
+def source_fingerprint(*module_names: str) -> str:
+    """計算內建實作模組原始碼的摘要, 作為內建步驟的工具版本
+
+    Digest the source code of built-in implementation modules, used as the tool version of
+    built-in stages.
+
+    Args:
+        *module_names (str): 模組名稱 / Module names.
+
+    Returns:
+        str: 原始碼摘要 / Source digest.
+    """
+    digest = hashlib.sha256()
+    for name in module_names:
+        digest.update(Path(importlib.import_module(name).__file__).read_bytes())
+    return f"native:{digest.hexdigest()}"
+
+
+class StageCache:
+    """以內容定址的步驟快取
+
+    Content-addressable stage cache.
+
+    索引 (index.json) 記錄各項目的大小與最近使用時間, 以及檔案摘要的備忘
+    (以路徑、大小與修改時間為鍵)。同一時間應只有一個程序寫入同一個快取資料夾。
+
+    The index (index.json) records the size and last use of every entry, plus memoized file
+    digests keyed by path, size and modification time. Only one process at a time should
+    write to a cache folder.
+    """
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        """初始化步驟快取
+
+        Initialize the stage cache.
+
+        Args:
+            root (Path): 快取資料夾 / Cache folder.
+            max_bytes (int): 容量上限 / Size cap in bytes.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._entries, self._digests = self._load_index()
+
+    @property
+    def index_path(self) -> Path:
+        """索引檔路徑
+
+        Index file path.
+        """
+        return self.root / INDEX_NAME
+
+    def _load_index(self) -> tuple[dict[str, dict], dict[str, str]]:
+        """讀取索引, 版本不符或損毀時視為空快取
+
+        Load the index; a mismatched version or a corrupt file gives an empty cache.
+
+        Returns:
+            tuple[dict[str, dict], dict[str, str]]: 快取項目與檔案摘要 / Entries and file
+            digests.
+        """
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}, {}
+        if index.get("version") != CACHE_VERSION:
+            return {}, {}
+        return index.get("entries", {}), index.get("digests", {})
+
+    def _save_index(self) -> None:
+        """以原子方式寫出索引 (呼叫者需持有鎖)
+
+        Write the index atomically; the caller must hold the lock.
+        """
+        if len(self._digests) > MAX_DIGESTS:
+            self._digests = dict(list(self._digests.items())[-MAX_DIGESTS:])
+        index = {"version": CACHE_VERSION, "entries": self._entries, "digests": self._digests}
+        temp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(temp_path, self.index_path)
+
+    @staticmethod
+    def _stat_key(path: Path) -> str:
+        """檔案摘要備忘的鍵
+
+        Memo key of a file digest.
+        """
+        stat = path.stat()
+        return f"{path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    def digest(self, path: Path) -> str:
+        """取得檔案內容摘要 (檔案未變動時使用備忘)
+
+        Get the content digest of a file, memoized while the file is unchanged.
+
+        Args:
+            path (Path): 檔案路徑 / File path.
+
+        Returns:
+            str: 內容摘要 / Content digest.
+        """
+        stat_key = self._stat_key(path)
+        with self._lock:
+            digest = self._digests.get(stat_key)
+        if digest is not None:
+            return digest
+
+        digest = file_digest(path)
+        with self._lock:
+            self._digests[stat_key] = digest
+        return digest
+
+    def tool_version(self, executable: str) -> str:
+        """取得外部工具的版本 (執行檔內容摘要)
+
+        Get the version of an external tool as the digest of its executable.
+
+        Args:
+            executable (str): 執行檔路徑或名稱 / Executable path or name.
+
+        Returns:
+            str: 工具版本 / Tool version.
+        """
+        path = Path(executable)
+        if not path.is_file():
+            found = shutil.which(executable)
+            if found is None:
+                return f"tool:{executable}"
+            path = Path(found)
+        return f"tool:{self.digest(path)}"
+
+    def key(self, stage: str, inputs: Sequence[Path], params: Mapping[str, Any], tool: str) -> str:
+        """計算步驟的快取鍵
+
+        Compute the cache key of a stage.
+
+        Args:
+            stage (str): 步驟名稱 / Stage name.
+            inputs (Sequence[Path]): 輸入檔案 / Input files.
+            params (Mapping[str, Any]): 影響輸出的參數 / Parameters affecting the output.
+            tool (str): 工具版本 / Tool version.
+
+        Returns:
+            str: 快取鍵 / Cache key.
+        """
+        payload = {
+            "version": CACHE_VERSION,
+            "stage": stage,
+            "inputs": [self.digest(path) for path in inputs],
+            "params": dict(params),
+            "tool": tool,
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _entry_dir(self, key: str) -> Path:
+        """快取項目的資料夾
+
+        Folder of a cache entry.
+        """
+        return self.root / "objects" / key[:2] / key
+
+    def _remember(self, key: str, outputs: Mapping[str, Path]) -> None:
+        """記錄輸出檔案的摘要為其快取鍵與名稱 (呼叫者需持有鎖)
+
+        Record the digest of output files as their cache key and name; the caller must hold
+        the lock.
+        """
+        for name, path in outputs.items():
+            self._digests[self._stat_key(path)] = f"{key}/{name}"
+
+    def fetch(self, stage: str, key: str, outputs: Mapping[str, Path]) -> bool:
+        """由快取取出步驟輸出
+
+        Fetch stage outputs from the cache.
+
+        Args:
+            stage (str): 步驟名稱 / Stage name.
+            key (str): 快取鍵 / Cache key.
+            outputs (Mapping[str, Path]): 輸出名稱 -> 目的路徑 / Output name -> destination.
+
+        Returns:
+            bool: 是否命中 / Whether the cache was hit.
+        """
+        entry_dir = self._entry_dir(key)
+        with self._lock:
+            hit = key in self._entries and all((entry_dir / name).is_file() for name in outputs)
+            if not hit:
+                self.misses[stage] = self.misses.get(stage, 0) + 1
+                return False
+
+        for name, path in outputs.items():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(entry_dir / name, path)
+
+        with self._lock:
+            self.hits[stage] = self.hits.get(stage, 0) + 1
+            if key in self._entries:
+                self._entries[key]["last_used"] = time.time()
+            self._remember(key, outputs)
+            self._save_index()
+        return True
+
+    def store(self, stage: str, key: str, outputs: Mapping[str, Path]) -> None:
+        """將步驟輸出存入快取, 並在超過容量上限時淘汰最久未使用的項目
+
+        Store stage outputs in the cache, evicting least recently used entries over the cap.
+
+        Args:
+            stage (str): 步驟名稱 / Stage name.
+            key (str): 快取鍵 / Cache key.
+            outputs (Mapping[str, Path]): 輸出名稱 -> 檔案路徑 / Output name -> file path.
+        """
+        size = sum(path.stat().st_size for path in outputs.values())
+        if size > self.max_bytes:
+            logger.debug(f"輸出超過快取上限, 不存入快取: {stage}")
+            return
+
+        entry_dir = self._entry_dir(key)
+        temp_dir = self.root / "tmp" / f"{key}.{os.getpid()}.{threading.get_ident()}"
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        for name, path in outputs.items():
+            shutil.copyfile(path, temp_dir / name)
+
+        with self._lock:
+            if entry_dir.exists():
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            entry_dir.parent.mkdir(parents=True, exist_ok=True)
+            temp_dir.rename(entry_dir)
+            self._entries[key] = {"stage": stage, "size": size, "last_used": time.time()}
+            self._remember(key, outputs)
+            self._evict()
+            self._save_index()
+
+    def _evict(self) -> None:
+        """淘汰最久未使用的項目直到總大小不超過上限 (呼叫者需持有鎖)
+
+        Evict least recently used entries until the total size fits the cap; the caller must
+        hold the lock.
+        """
+        total = sum(entry["size"] for entry in self._entries.values())
+        for key in sorted(self._entries, key=lambda k: self._entries[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= self._entries.pop(key)["size"]
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            logger.debug(f"淘汰快取項目: {key}")
+
+    def to_dict(self) -> dict[str, Any]:
+        """將快取使用情形轉為可序列化的字典
+
+        Convert the cache usage to a serializable dictionary.
+
+        Returns:
+            dict[str, Any]: 快取紀錄 / Cache record.
+        """
+        with self._lock:
+            return {
+                "root": str(self.root),
+                "max_bytes": self.max_bytes,
+                "bytes": sum(entry["size"] for entry in self._entries.values()),
+                "entries": len(self._entries),
+                "hits": dict(self.hits),
+                "misses": dict(self.misses),
+            }
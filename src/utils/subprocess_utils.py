@@ -3,15 +3,28 @@
 Subprocess execution utility module.
 """
 
+from collections.abc import Iterator
 import os
 from pathlib import Path
 import subprocess
+import tempfile
 
 from src.utils.logger_utils import get_logger
 
 logger = get_logger(__name__)
 
 
+def _command_env() -> dict[str, str]:
+    """建立以 UTF-8 輸出的子進程環境變數
+
+    Build the environment for subprocesses with UTF-8 output.
+    """
+    env = os.environ.copy()
+    env["PYTHONIOENCODING"] = "utf-8"
+    env["PYTHONUTF8"] = "1"
+    return env
+
+
 def run_command(
     cmd: list[str] | str,
     cwd: Path | str | None = None,
@@ -34,9 +47,7 @@ def run_command(
     Raises:
         subprocess.CalledProcessError: 當 check=True 且命令失敗時 / When check=True and command fails.
     """
-    env = os.environ.copy()
-    env["PYTHONIOENCODING"] = "utf-8"
-    env["PYTHONUTF8"] = "1"
+    env = _command_env()
 
     if isinstance(cwd, Path):
         cwd = str(cwd)
@@ -63,3 +74,48 @@ def run_command(
     except Exception as e:
         logger.error(f"執行命令時發生未預期錯誤: {e}")
         raise
+
+
+def iter_command_lines(cmd: list[str], cwd: Path | str | None = None) -> Iterator[str]:
+    """執行外部命令並逐行讀取標準輸出, 不將整個輸出保留在記憶體中
+
+    Run an external command and yield its stdout line by line without holding the whole
+    output in memory.
+
+    Args:
+        cmd (list[str]): 命令列表 / Command list.
+        cwd (Path | str | None): 工作目錄 / Working directory.
+
+    Yields:
+        str: 一行輸出 (不含換行字元) / One output line without its terminator.
+
+    Raises:
+        subprocess.CalledProcessError: 命令失敗時 (讀完所有輸出後) / When the command fails,
+            after all output was read.
+    """
+    # 標準錯誤寫入暫存檔, 避免其緩衝區寫滿時阻塞子進程
+    # stderr goes to a temporary file so a full pipe buffer cannot block the subprocess
+    with (
+        tempfile.TemporaryFile() as stderr_file,
+        subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=stderr_file,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            cwd=str(cwd) if isinstance(cwd, Path) else cwd,
+            env=_command_env(),
+        ) as process,
+    ):
+        for line in process.stdout:
+            yield line.rstrip("\r\n")
+        returncode = process.wait()
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode("utf-8", errors="replace")
+
+    if returncode:
+        logger.error(f"命令執行失敗: {' '.join(cmd)}")
+        if stderr:
+            logger.error(f"錯誤訊息: {stderr}")
+        raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr)
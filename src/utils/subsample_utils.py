@@ -0,0 +1,114 @@
+"""配對讀序的蓄水池抽樣
+
+Reservoir sampling of read pairs.
+
+R1 以串流方式讀取一次並以蓄水池抽樣 (Algorithm R) 選出固定數量的讀序, 不需事先知道
+讀序總數; R2 再讀取一次, 取出相同位置的讀序, 因此輸出仍是正確配對且保持原始順序。
+
+R1 is streamed once while reservoir sampling (Algorithm R) picks a fixed number of reads
+without knowing the total in advance. R2 is then streamed once to extract the reads at the
+same positions, so the output stays correctly paired and in the original order.
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+from src.utils.fastx_index_utils import iter_fastq_line_blocks
+from src.utils.fastx_utils import create_fastx
+from src.utils.logger_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def _record_bounds(buffer: np.ndarray, line_starts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """取得區塊中每筆紀錄的起點與終點 (含換行字元)
+
+    Get the start and end of every record in a block, including line terminators.
+
+    Args:
+        buffer (np.ndarray): 由完整紀錄組成的位元組區塊 / Byte block of complete records.
+        line_starts (np.ndarray): (紀錄數, 4) 的行起點 / (records, 4) line starts.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: 紀錄起點與終點 / Record starts and ends.
+    """
+    starts = line_starts[:, 0]
+    ends = np.append(starts[1:], buffer.size)
+    return starts, ends
+
+
+def reservoir_sample_pairs(
+    r1_path: Path,
+    r2_path: Path,
+    output_r1: Path,
+    output_r2: Path,
+    size: int,
+    seed: int = 0,
+) -> tuple[int, int]:
+    """以蓄水池抽樣取出固定數量的配對讀序
+
+    Draw a fixed number of read pairs by reservoir sampling.
+
+    相同的 seed 會得到相同的抽樣結果; 讀序數不超過 size 時輸出全部讀序。
+
+    The same seed gives the same sample. When a file has at most `size` reads, every read
+    is kept.
+
+    Args:
+        r1_path (Path): R1 檔案路徑 / R1 file path.
+        r2_path (Path): R2 檔案路徑 / R2 file path.
+        output_r1 (Path): 輸出 R1 路徑 / Output R1 path.
+        output_r2 (Path): 輸出 R2 路徑 / Output R2 path.
+        size (int): 抽樣的配對數 / Number of pairs to draw.
+        seed (int): 亂數種子 / Random seed.
+
+    Returns:
+        tuple[int, int]: 抽出的配對數與總配對數 / Pairs drawn and total pairs.
+
+    Raises:
+        ValueError: R1 與 R2 的讀序數不一致時 / When R1 and R2 differ in read count.
+    """
+    rng = np.random.default_rng(seed)
+    slot_indices = np.full(size, -1, dtype=np.int64)
+    slot_records: list[bytes] = [b""] * size
+    seen = 0
+
+    for buffer, line_starts, _ in iter_fastq_line_blocks(r1_path):
+        count = len(line_starts)
+        positions = np.arange(seen, seen + count)
+        # 第 t 筆讀序 (0 起算) 以 size / (t + 1) 的機率取代蓄水池中隨機的一筆
+        # Read t (0-based) replaces a random reservoir slot with probability size / (t + 1)
+        slots = np.where(positions < size, positions, rng.integers(0, positions + 1))
+        accepted = np.flatnonzero(slots < size)
+        if accepted.size:
+            raw = buffer.tobytes()
+            starts, ends = _record_bounds(buffer, line_starts)
+            for i in accepted.tolist():
+                slot_indices[slots[i]] = positions[i]
+                slot_records[slots[i]] = raw[starts[i] : ends[i]]
+        seen += count
+
+    filled = np.flatnonzero(slot_indices >= 0)
+    order = filled[np.argsort(slot_indices[filled])]
+    wanted = slot_indices[order]
+    with create_fastx(output_r1) as f:
+        f.write(b"".join(slot_records[i] for i in order.tolist()))
+
+    r2_seen = 0
+    with create_fastx(output_r2) as f:
+        for buffer, line_starts, _ in iter_fastq_line_blocks(r2_path):
+            count = len(line_starts)
+            low, high = np.searchsorted(wanted, [r2_seen, r2_seen + count])
+            if high > low:
+                raw = buffer.tobytes()
+                starts, ends = _record_bounds(buffer, line_starts)
+                for i in (wanted[low:high] - r2_seen).tolist():
+                    f.write(raw[starts[i] : ends[i]])
+            r2_seen += count
+
+    if r2_seen != seen:
+        raise ValueError(f"R1 與 R2 的讀序數不一致: {r1_path.name} / {r2_path.name}")
+
+    logger.info(f"抽樣 {len(wanted)} / {seen} 對讀序: {r1_path.name}")
+    return len(wanted), seen
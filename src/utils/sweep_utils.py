@@ -0,0 +1,221 @@
+"""品質與長度門檻的參數掃描
+
+Parameter sweeps over the quality and length thresholds.
+
+引子修剪與配對合併不受 quality_threshold / length_threshold 影響, 因此每個樣本只執行
+一次; 各組設定由同一份合併讀序分支: 相同品質門檻的設定共用一次品質截斷, 只有長度過濾
+與去重複依設定分開計算。所有分支在單次讀取合併讀序時完成。
+
+Primer trimming and pair merging do not depend on quality_threshold / length_threshold, so
+they run once per sample. Every setting branches from the same merged reads: settings with the
+same quality threshold share one quality truncation, and only length filtering and
+dereplication are computed per setting. All branches are derived in a single read of the
+merged reads.
+"""
+
+from collections import Counter
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from itertools import product
+from pathlib import Path
+
+import pandas as pd
+
+from src.utils.fastx_utils import FastqRecord, iter_fastq_batches
+from src.utils.fused_pipeline_utils import truncate_quality, write_uniques
+from src.utils.logger_utils import get_logger
+from src.utils.scheduler_utils import ordered_process_map
+
+logger = get_logger(__name__)
+
+# 比較表的欄位順序
+# Column order of the comparison table
+COMPARISON_COLUMNS = (
+    "Setting",
+    "Quality_threshold",
+    "Length_threshold",
+    "Sample",
+    "Merged_reads",
+    "Quality_passed",
+    "Length_passed",
+    "Uniques",
+    "ZOTUs",
+    "Assigned_reads",
+    "Species",
+)
+
+
+@dataclass(slots=True, frozen=True)
+class SweepSetting:
+    """一組掃描設定
+
+    One sweep setting.
+    """
+
+    quality_threshold: int
+    length_threshold: int
+
+    @property
+    def label(self) -> str:
+        """設定名稱 (亦作為輸出資料夾名稱)
+
+        Setting name, also used as its output folder name.
+        """
+        return f"Q{self.quality_threshold}_L{self.length_threshold}"
+
+
+@dataclass(slots=True)
+class BranchStats:
+    """單一樣本在一組設定下的讀序統計
+
+    Read statistics of one sample under one setting.
+    """
+
+    merged_reads: int = 0
+    quality_passed: int = 0
+    length_passed: int = 0
+    uniques: int = 0
+
+
+def sweep_grid(
+    quality_thresholds: Iterable[int], length_thresholds: Iterable[int]
+) -> list[SweepSetting]:
+    """建立品質與長度門檻的所有組合 (保留輸入順序並去除重複)
+
+    Build every combination of quality and length thresholds, keeping input order and
+    dropping duplicates.
+
+    Args:
+        quality_thresholds (Iterable[int]): 品質門檻 / Quality thresholds.
+        length_thresholds (Iterable[int]): 長度門檻 / Length thresholds.
+
+    Returns:
+        list[SweepSetting]: 掃描設定 / Sweep settings.
+    """
+    settings = (
+        SweepSetting(quality, length)
+        for quality, length in product(quality_thresholds, list(length_thresholds))
+    )
+    return list(dict.fromkeys(settings))
+
+
+def _branch_batch(
+    batch: list[FastqRecord], by_quality: Mapping[int, list[SweepSetting]]
+) -> tuple[int, dict[SweepSetting, tuple[int, int, Counter]]]:
+    """計算一批合併讀序在各設定下的通過數與序列計數 (可於子程序中執行)
+
+    Count the passing reads and sequences of one batch of merged reads under every setting;
+    safe to run in a worker process.
+
+    Args:
+        batch (list[FastqRecord]): 合併讀序紀錄 / Merged read records.
+        by_quality (Mapping[int, list[SweepSetting]]): 品質門檻 -> 設定 / Quality threshold
+            -> settings.
+
+    Returns:
+        tuple[int, dict[SweepSetting, tuple[int, int, Counter]]]: 讀序數, 以及各設定的品質
+        通過數、長度通過數與序列計數 / Read count, and the quality-passed count, length-passed
+        count and sequence counts of every setting.
+    """
+    branches = {}
+    for quality_threshold, settings in by_quality.items():
+        sequences = [seq for _, seq, _ in truncate_quality(batch, quality_threshold)]
+        for setting in settings:
+            long_enough = [seq for seq in sequences if len(seq) >= setting.length_threshold]
+            branches[setting] = (len(sequences), len(long_enough), Counter(long_enough))
+    return len(batch), branches
+
+
+def derive_sweep_uniques(
+    merged_fastq: Path, outputs: Mapping[SweepSetting, Path], cores: int = 1
+) -> dict[SweepSetting, BranchStats]:
+    """由合併讀序一次計算所有設定的品質截斷、長度過濾與去重複
+
+    Derive quality truncation, length filtering and dereplication of every setting from the
+    merged reads in one pass.
+
+    cores > 1 時各批次在子程序中平行處理, 序列計數依輸入順序合併。
+
+    With cores > 1 batches are processed in worker processes; sequence counts are combined
+    in input order.
+
+    Args:
+        merged_fastq (Path): 合併讀序 FASTQ / Merged reads FASTQ.
+        outputs (Mapping[SweepSetting, Path]): 各設定的去重複 FASTA 輸出路徑 /
+            Uniques FASTA output path of every setting.
+        cores (int): 使用的核心數 / Number of cores.
+
+    Returns:
+        dict[SweepSetting, BranchStats]: 各設定的讀序統計 / Read statistics per setting.
+    """
+    by_quality: dict[int, list[SweepSetting]] = {}
+    for setting in outputs:
+        by_quality.setdefault(setting.quality_threshold, []).append(setting)
+
+    counts: dict[SweepSetting, Counter] = {setting: Counter() for setting in outputs}
+    stats = {setting: BranchStats() for setting in outputs}
+
+    batches = ((batch, by_quality) for batch in iter_fastq_batches(merged_fastq))
+    for merged_reads, branches in ordered_process_map(_branch_batch, batches, cores):
+        for setting, (quality_passed, length_passed, batch_counts) in branches.items():
+            stats[setting].merged_reads += merged_reads
+            stats[setting].quality_passed += quality_passed
+            stats[setting].length_passed += length_passed
+            counts[setting].update(batch_counts)
+
+    for setting, uniques_fasta in outputs.items():
+        stats[setting].uniques = write_uniques(uniques_fasta, counts[setting])
+
+    logger.info(f"完成參數分支: {merged_fastq.name} ({len(outputs)} 組設定)")
+    return stats
+
+
+def summarize_sorted_blasts(excel_path: Path) -> tuple[int, int]:
+    """由整理後的 BLAST 結果計算已鑑定的讀序數與物種數
+
+    Count the assigned reads and species in a sorted BLAST result.
+
+    已鑑定指 Stat 為空白的列 (Identity >= 97 的最佳比對), 不含 *DUPE*、*FILTERED* 與
+    低豐度列。
+
+    Assigned rows are those with an empty Stat, i.e. best hits with Identity >= 97; *DUPE*,
+    *FILTERED* and low-abundance rows are left out.
+
+    Args:
+        excel_path (Path): 整理後的 BLAST 結果 Excel / Sorted BLAST result Excel file.
+
+    Returns:
+        tuple[int, int]: 已鑑定的讀序數與物種數; 檔案不存在時為 (0, 0) /
+        Assigned reads and species; (0, 0) when the file does not exist.
+    """
+    if not excel_path.exists():
+        return 0, 0
+    df = pd.read_excel(excel_path, engine="openpyxl")
+    assigned = df[df["Stat"].fillna("") == ""]
+    return int(assigned["Reads"].fillna(0).sum()), int(assigned["Scientific_name"].nunique())
+
+
+def write_sweep_comparison(output_path: Path, rows: list[dict]) -> None:
+    """寫出各設定的比較表 (Excel)
+
+    Write the comparison table of all settings as Excel.
+
+    Args:
+        output_path (Path): 輸出路徑 / Output path.
+        rows (list[dict]): 每個設定與樣本一列 / One row per setting and sample.
+    """
+    df = pd.DataFrame(rows, columns=list(COMPARISON_COLUMNS))
+    with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
+        df.to_excel(writer, index=False, sheet_name="Comparison")
+        summary = df.groupby(["Setting", "Quality_threshold", "Length_threshold"], sort=False)[
+            [
+                "Merged_reads",
+                "Quality_passed",
+                "Length_passed",
+                "Uniques",
+                "ZOTUs",
+                "Assigned_reads",
+            ]
+        ].sum()
+        summary.reset_index().to_excel(writer, index=False, sheet_name="Summary")
+    logger.info(f"已寫出參數掃描比較表: {output_path}")
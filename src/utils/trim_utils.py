@@ -0,0 +1,275 @@
+"""Sanger 序列修剪工具 (Trimmomatic 相容)
+
+Native Sanger read trimming utilities compatible with Trimmomatic SE mode.
+
+實作 Trimmomatic 的 ILLUMINACLIP (simple clip) 與 LEADING / TRAILING 步驟,
+並輸出相同格式的 trimlog, 不再需要啟動 JVM。
+
+Implements Trimmomatic's ILLUMINACLIP (simple clip), LEADING and TRAILING steps and writes
+a trimlog in the same format, without launching a JVM.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from src.utils.logger_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Trimmomatic 每個相符鹼基的得分 log10(4)
+# Score awarded by Trimmomatic for each matching base: log10(4)
+MATCH_SCORE = float(np.log10(4.0))
+SEED_LENGTH = 16
+PHRED_OFFSET = 33
+
+
+@dataclass(slots=True, frozen=True)
+class TrimSettings:
+    """修剪參數 (對應 ILLUMINACLIP:<fa>:3:30:10 LEADING:30 TRAILING:30)
+
+    Trimming parameters (equivalent to ILLUMINACLIP:<fa>:3:30:10 LEADING:30 TRAILING:30).
+    """
+
+    seed_mismatches: int = 3
+    palindrome_clip_threshold: int = 30
+    simple_clip_threshold: int = 10
+    leading: int = 30
+    trailing: int = 30
+
+
+@dataclass(slots=True, frozen=True)
+class TrimStats:
+    """修剪統計
+
+    Trimming statistics.
+    """
+
+    input_reads: int
+    surviving_reads: int
+
+    @property
+    def dropped_reads(self) -> int:
+        """被丟棄的讀序數
+
+        Number of dropped reads.
+        """
+        return self.input_reads - self.surviving_reads
+
+
+def load_adapters(adapter_path: Path) -> list[np.ndarray]:
+    """讀取引子 FASTA 檔案
+
+    Load adapter/primer sequences from a FASTA file as uint8 arrays.
+
+    Args:
+        adapter_path (Path): 引子 FASTA 檔案路徑 / Adapter FASTA file path.
+
+    Returns:
+        list[np.ndarray]: 引子序列列表 / List of adapter sequences.
+    """
+    adapters: list[np.ndarray] = []
+    chunks: list[str] = []
+
+    for line in adapter_path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line.startswith(">"):
+            if chunks:
+                adapters.append(np.frombuffer("".join(chunks).upper().encode(), dtype=np.uint8))
+                chunks.clear()
+        elif line:
+            chunks.append(line)
+    if chunks:
+        adapters.append(np.frombuffer("".join(chunks).upper().encode(), dtype=np.uint8))
+
+    return adapters
+
+
+def _max_range_scores(scores: np.ndarray) -> np.ndarray:
+    """計算每一列的最大連續子區間和 (Kadane, 對列向量化)
+
+    Maximum contiguous-range sum of every row (Kadane's algorithm vectorized over rows).
+
+    Args:
+        scores (np.ndarray): 二維得分矩陣 / 2-D score matrix.
+
+    Returns:
+        np.ndarray: 每列的最大區間和 / Best range sum per row.
+    """
+    current = np.zeros(scores.shape[0], dtype=np.float32)
+    best = np.zeros(scores.shape[0], dtype=np.float32)
+    for column in scores.T:
+        current = np.maximum(current + column, 0.0)
+        np.maximum(best, current, out=best)
+    return best
+
+
+def find_adapter_clip(
+    seq: np.ndarray, qual: np.ndarray, adapters: list[np.ndarray], settings: TrimSettings
+) -> int:
+    """尋找 simple clip 的截斷位置
+
+    Find the ILLUMINACLIP simple-clip position of a read.
+
+    每個引子在所有可能的偏移量上同時比對: 前 16 個重疊鹼基為 seed, 錯配數不可超過
+    seed_mismatches; 相符鹼基得 log10(4) 分, 錯配扣 Q/10 分, 取最大連續區間得分,
+    達到 simple_clip_threshold 即在該偏移量截斷。
+
+    Every adapter is aligned at all offsets at once. The first 16 overlapping bases form the
+    seed, which may contain at most seed_mismatches mismatches. Matches score log10(4) and
+    mismatches cost Q/10; the best contiguous range must reach simple_clip_threshold.
+
+    Args:
+        seq (np.ndarray): 序列 (ASCII uint8) / Sequence as ASCII uint8.
+        qual (np.ndarray): 品質分數 (Phred) / Phred quality scores.
+        adapters (list[np.ndarray]): 引子序列 / Adapter sequences.
+        settings (TrimSettings): 修剪參數 / Trimming parameters.
+
+    Returns:
+        int: 保留的長度 (未找到時為序列長度) / Length to keep (read length if no adapter).
+    """
+    read_len = len(seq)
+    keep = read_len
+    if read_len == 0:
+        return keep
+
+    penalties = qual.astype(np.float32) / 10.0
+
+    for adapter in adapters:
+        adapter_len = len(adapter)
+        pad = adapter_len - 1
+        padded_seq = np.zeros(read_len + 2 * pad, dtype=np.uint8)
+        padded_seq[pad : pad + read_len] = seq
+        padded_pen = np.zeros(read_len + 2 * pad, dtype=np.float32)
+        padded_pen[pad : pad + read_len] = penalties
+
+        # 第 k 列代表引子起點位於讀序偏移量 k - pad
+        # Row k corresponds to the adapter starting at read offset k - pad
+        windows = np.lib.stride_tricks.sliding_window_view(padded_seq, adapter_len)
+        pen_windows = np.lib.stride_tricks.sliding_window_view(padded_pen, adapter_len)
+        valid = windows != 0
+        matches = (windows == adapter) & valid
+        mismatches = valid & ~matches
+
+        # seed: 每個偏移量中前 SEED_LENGTH 個重疊位置
+        # Seed: the first SEED_LENGTH overlapping positions at each offset
+        overlap_rank = np.cumsum(valid, axis=1)
+        in_seed = valid & (overlap_rank <= SEED_LENGTH)
+        seed_misses = np.count_nonzero(mismatches & in_seed, axis=1)
+
+        candidates = np.flatnonzero(seed_misses <= settings.seed_mismatches)
+        if candidates.size == 0:
+            continue
+
+        scores = np.where(matches[candidates], MATCH_SCORE, 0.0) - np.where(
+            mismatches[candidates], pen_windows[candidates], 0.0
+        )
+        best = _max_range_scores(scores.astype(np.float32))
+        hits = candidates[best >= settings.simple_clip_threshold]
+        if hits.size:
+            keep = min(keep, max(int(hits[0]) - pad, 0))
+
+    return keep
+
+
+def trim_read(
+    seq: np.ndarray, qual: np.ndarray, adapters: list[np.ndarray], settings: TrimSettings
+) -> tuple[int, int]:
+    """依序套用 ILLUMINACLIP, LEADING, TRAILING
+
+    Apply ILLUMINACLIP, LEADING and TRAILING in Trimmomatic order.
+
+    Args:
+        seq (np.ndarray): 序列 (ASCII uint8) / Sequence as ASCII uint8.
+        qual (np.ndarray): 品質分數 (Phred) / Phred quality scores.
+        adapters (list[np.ndarray]): 引子序列 / Adapter sequences.
+        settings (TrimSettings): 修剪參數 / Trimming parameters.
+
+    Returns:
+        tuple[int, int]: 保留區間 [start, end) / Surviving range [start, end).
+    """
+    end = find_adapter_clip(seq, qual, adapters, settings)
+    if end == 0:
+        return 0, 0
+
+    high_leading = np.flatnonzero(qual[:end] >= settings.leading)
+    if high_leading.size == 0:
+        return 0, 0
+    start = int(high_leading[0])
+
+    high_trailing = np.flatnonzero(qual[start:end] >= settings.trailing)
+    if high_trailing.size == 0:
+        return 0, 0
+    end = start + int(high_trailing[-1]) + 1
+
+    return start, end
+
+
+def trim_fastq(
+    input_fastq: Path,
+    output_fastq: Path,
+    trimlog: Path,
+    adapter_path: Path,
+    settings: TrimSettings | None = None,
+) -> TrimStats:
+    """修剪 FASTQ 檔案並寫出 Trimmomatic 格式的 trimlog
+
+    Trim a FASTQ file and write a Trimmomatic-format trimlog.
+
+    trimlog 每行為: 讀序名稱, 保留長度, 第一個保留鹼基位置, 最後保留鹼基位置 + 1,
+    從尾端修剪的長度; 被丟棄的讀序記為 0 0 0 0。
+
+    Each trimlog line is: read name, surviving length, first surviving base, last surviving
+    base + 1 and amount trimmed from the end; dropped reads are logged as 0 0 0 0.
+
+    Args:
+        input_fastq (Path): 輸入 FASTQ 檔案路徑 / Input FASTQ file path.
+        output_fastq (Path): 輸出 FASTQ 檔案路徑 / Output FASTQ file path.
+        trimlog (Path): Trim log 檔案路徑 / Trim log file path.
+        adapter_path (Path): 引子 FASTA 檔案路徑 / Adapter FASTA file path.
+        settings (TrimSettings | None): 修剪參數 / Trimming parameters.
+
+    Returns:
+        TrimStats: 修剪統計 / Trimming statistics.
+    """
+    settings = settings or TrimSettings()
+    adapters = load_adapters(adapter_path)
+    input_reads = 0
+    surviving_reads = 0
+
+    with (
+        input_fastq.open("rb") as f_in,
+        output_fastq.open("wb") as f_out,
+        trimlog.open("w", encoding="utf-8") as f_log,
+    ):
+        while True:
+            header = f_in.readline()
+            if not header:
+                break
+            seq_line = f_in.readline().rstrip(b"\r\n")
+            f_in.readline()
+            qual_line = f_in.readline().rstrip(b"\r\n")
+            input_reads += 1
+
+            seq = np.frombuffer(seq_line.upper(), dtype=np.uint8)
+            qual = np.frombuffer(qual_line, dtype=np.uint8) - PHRED_OFFSET
+            start, end = trim_read(seq, qual, adapters, settings)
+            length = end - start
+            name = header[1:].rstrip(b"\r\n").decode("utf-8", errors="replace")
+
+            if length > 0:
+                surviving_reads += 1
+                f_out.write(header.rstrip(b"\r\n") + b"\n")
+                f_out.write(seq_line[start:end] + b"\n+\n")
+                f_out.write(qual_line[start:end] + b"\n")
+                f_log.write(f"{name} {length} {start} {end} {len(seq) - end}\n")
+            else:
+                f_log.write(f"{name} 0 0 0 0\n")
+
+    stats = TrimStats(input_reads=input_reads, surviving_reads=surviving_reads)
+    logger.info(
+        f"修剪完成: Input Reads: {stats.input_reads} Surviving: {stats.surviving_reads} "
+        f"Dropped: {stats.dropped_reads}"
+    )
+    return stats
@@ -0,0 +1,51 @@
+"""BLAST 結果彙整工具測試
+
+Tests of the BLAST summary utilities.
+"""
+
+import math
+from pathlib import Path
+
+from src.utils.blast_summary_utils import DUPE_STAT, FILTERED_STAT, summarize_blast_hits
+
+FIELDS = ("qseqid", "pident", "qcovs", "sscinames", "sacc")
+HITS = [
+    ("Zotu1", 100.0, 100, "Danio rerio", "A1"),
+    ("Zotu1", 99.0, 100, "Danio rerio", "A2"),
+    ("Zotu1", 98.0, 100, "Oryzias latipes", "A3"),
+    ("Zotu1", 90.0, 100, "Oryzias latipes", "A4"),
+    ("Zotu2", 100.0, 100, "Danio rerio", "B1"),
+    ("Zotu2", 99.0, 100, "Danio rerio", "B2"),
+    ("Zotu2", 90.0, 100, "Oryzias latipes", "B3"),
+    ("Zotu3", 100.0, 100, "Danio rerio", "C1"),
+    ("Zotu3", 90.0, 100, "Oryzias latipes", "C2"),
+]
+
+
+def _summarize(tmp_path: Path, counts: dict[str, int]) -> list[tuple]:
+    blast_txt = tmp_path / "blast.txt"
+    blast_txt.write_text("".join("\t".join(map(str, hit)) + "\n" for hit in HITS))
+    table = summarize_blast_hits(blast_txt, FIELDS, counts, {}, chunk_rows=2)
+    return [
+        (row.OTU, row.Accession_number, row.Stat, None if math.isnan(row.Reads) else row.Reads)
+        for row in table.itertuples()
+    ]
+
+
+def test_summary_drops_same_species_dupes_of_listed_result(tmp_path: Path) -> None:
+    rows = _summarize(tmp_path, {"Zotu1": 10, "Zotu2": 5, "Zotu3": 5})
+    assert rows[:3] == [
+        ("Zotu1", "A1", "", 10),
+        ("Zotu1", "A3", DUPE_STAT, None),
+        ("Zotu1", "A4", FILTERED_STAT, None),
+    ]
+
+
+def test_summary_keeps_same_species_dupes_without_reads(tmp_path: Path) -> None:
+    rows = _summarize(tmp_path, {"Zotu1": 10})
+    # 沒有讀序數的 OTU 列出所有物種的 *DUPE*; 沒有 *DUPE* 時整個 OTU 不列出
+    # An OTU without reads lists *DUPE* rows of every species, and is left out without any
+    assert [row for row in rows if row[0] != "Zotu1"] == [
+        ("Zotu2", "B2", DUPE_STAT, None),
+        ("Zotu2", "B3", FILTERED_STAT, None),
+    ]
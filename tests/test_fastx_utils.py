@@ -0,0 +1,30 @@
+"""FASTA / FASTQ 工具測試
+
+Tests of the FASTA / FASTQ utilities.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from src.utils.fastx_utils import fastq_to_fasta
+
+
+@pytest.mark.parametrize("block_size", [4, 1 << 16])
+def test_fastq_to_fasta_keeps_final_record_without_newline(tmp_path: Path, block_size: int) -> None:
+    fastq = tmp_path / "in.fastq"
+    fastq.write_bytes(b"@a\nACGT\n+\nIIII\n@b\nAC\n+\nII")
+
+    count = fastq_to_fasta(fastq, tmp_path / "out.fasta", block_size=block_size)
+
+    assert count == 2
+    assert (tmp_path / "out.fasta").read_bytes() == b">a\nACGT\n>b\nAC\n"
+
+
+@pytest.mark.parametrize("block_size", [4, 1 << 16])
+def test_fastq_to_fasta_rejects_truncated_record(tmp_path: Path, block_size: int) -> None:
+    fastq = tmp_path / "in.fastq"
+    fastq.write_bytes(b"@a\nACGT\n+\nIIII\n@b\nAC\n")
+
+    with pytest.raises(ValueError):
+        fastq_to_fasta(fastq, tmp_path / "out.fasta", block_size=block_size)
@@ -0,0 +1,52 @@
+"""序列運算核心測試
+
+Tests of the sequence kernels.
+"""
+
+import numpy as np
+
+from src.utils.kernel_utils import (
+    SequenceBatch,
+    encode_2bit,
+    expected_errors,
+    kmer_hashes,
+    pack_2bit,
+    pack_4bit,
+    reverse_batch,
+    reverse_complement_batch,
+    unpack_2bit,
+    unpack_4bit,
+)
+
+
+def test_reverse_complement_batch_keeps_case_and_iupac() -> None:
+    batch = SequenceBatch.from_bytes([b"ACGTN", b"", b"aacR"])
+
+    assert reverse_complement_batch(batch).to_bytes() == [b"NACGT", b"", b"Ygtt"]
+    assert reverse_batch(batch).to_bytes() == [b"NTGCA", b"", b"Rcaa"]
+
+
+def test_pack_round_trips() -> None:
+    batch = SequenceBatch.from_bytes([b"ACGTTGCAN"])
+
+    packed = pack_2bit(encode_2bit(batch))
+    assert unpack_2bit(packed, 8).tobytes() == b"ACGTTGCA"
+    assert unpack_4bit(pack_4bit(batch), 9).tobytes() == b"ACGTTGCAN"
+
+
+def test_kmer_hashes_skip_invalid_and_boundary_kmers() -> None:
+    batch = SequenceBatch.from_bytes([b"ACGT", b"ANC", b"AC"])
+
+    hashes, owners, starts = kmer_hashes(batch, 2)
+    assert hashes.tolist() == [0b0001, 0b0110, 0b1011, 0b0001]
+    assert owners.tolist() == [0, 0, 0, 2]
+    assert starts.tolist() == [0, 1, 2, 0]
+
+    canonical, _, _ = kmer_hashes(batch, 2, canonical=True)
+    assert canonical.tolist() == [0b0001, 0b0110, 0b0001, 0b0001]
+
+
+def test_expected_errors_sums_error_probabilities() -> None:
+    batch = SequenceBatch.from_bytes([b"II", b"", b"+"])
+
+    assert np.allclose(expected_errors(batch), [2e-4, 0.0, 0.1])
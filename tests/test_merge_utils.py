@@ -0,0 +1,87 @@
+"""雙端讀序合併工具測試
+
+Tests of the paired-end read merging utilities.
+
+預期結果依 usearch -fastq_mergepairs 的行為: 重疊區一致鹼基的品質上限為 41
+(-fastq_qmaxout), 不一致時取品質較高的鹼基, staggered 配對預設丟棄。
+
+Expectations follow usearch -fastq_mergepairs: agreeing overlap bases are capped at
+quality 41 (-fastq_qmaxout), disagreements keep the higher-quality base, and staggered
+pairs are discarded by default.
+"""
+
+from src.utils.merge_utils import MergeSettings, merge_records
+from src.utils.sequence_utils import reverse_complement
+
+INSERT = (
+    "GTCGGTAAAACTCGTGCCAGCCACCGCGGTTATACGAGAGGCCCAAGTTGATAGACAACGGCGTAAAGAGTGGTTAAGA"
+    "TAAACCCCATTAAAGCCGAACGCCCTCAAAGCTGTTATACGCACCCGAAGGTAAGAAGCCCAAT"
+)
+ADAPTER = "AGATCGGAAGAGCACACGTCTGAACTCCAGTCAC"
+
+
+def _pair(read1: str, read2: str, name: bytes = b"r") -> tuple[tuple, tuple]:
+    return (name, read1.encode(), b"I" * len(read1)), (name, read2.encode(), b"I" * len(read2))
+
+
+def test_merge_records_overlapping_pair() -> None:
+    record1, record2 = _pair(INSERT[:100], reverse_complement(INSERT)[:100])
+
+    merged, stats = merge_records([record1], [record2], MergeSettings())
+
+    assert stats.merged == 1
+    _, seq, qual = merged[0]
+    overlap = 200 - len(INSERT)
+    start = len(INSERT) - 100
+    assert seq == INSERT.encode()
+    assert qual == b"I" * start + b"J" * overlap + b"I" * start
+
+
+def test_merge_records_keeps_higher_quality_base_on_mismatch() -> None:
+    read1 = INSERT[:100]
+    read2 = reverse_complement(INSERT[:70] + "A" + INSERT[71:])[:100]
+    record1 = (b"r", read1.encode(), b"I" * 100)
+    record2 = (b"r", read2.encode(), b"5" * 100)
+
+    merged, _ = merge_records([record1], [record2], MergeSettings())
+
+    assert merged[0][1] == INSERT.encode()
+    assert merged[0][2][70] == ord("5")
+
+
+def test_merge_records_discards_staggered_pairs_by_default() -> None:
+    insert = INSERT[:80]
+    record1, record2 = _pair(insert + ADAPTER[:20], reverse_complement(insert) + ADAPTER[:20])
+
+    merged, stats = merge_records([record1], [record2], MergeSettings())
+    assert merged == []
+    assert stats.staggered == 1
+
+    merged, stats = merge_records([record1], [record2], MergeSettings(allow_stagger=True))
+    assert stats.merged == 1
+    assert merged[0][1] == insert.encode()
+
+
+def test_merge_records_rejects_too_many_diffs() -> None:
+    mutated = list(INSERT)
+    for i in range(60, 72, 2):
+        mutated[i] = "A" if mutated[i] != "A" else "C"
+    record1, record2 = _pair(INSERT[:100], reverse_complement("".join(mutated))[:100])
+
+    merged, stats = merge_records([record1], [record2], MergeSettings())
+
+    assert merged == []
+    assert stats.too_many_diffs == 1
+
+
+def test_merge_records_finds_overlap_inside_tandem_repeat() -> None:
+    # 重疊區落在串聯重複內: R2 的 k-mer 都投給 R1 中第一個重複單元所在的錯誤對角線
+    # The overlap lies inside a tandem repeat, so every R2 k-mer votes for the wrong
+    # diagonal of the first repeat unit in R1
+    insert = INSERT[:20] + "ACGTTG" * 14 + INSERT[-46:]
+    record1, record2 = _pair(insert[:100], reverse_complement(insert[50:]))
+
+    merged, stats = merge_records([record1], [record2], MergeSettings())
+
+    assert stats.merged == 1
+    assert merged[0][1] == insert.encode()
@@ -0,0 +1,41 @@
+"""配對輸入檔案預檢測試
+
+Tests of the paired input pre-flight checks.
+"""
+
+from pathlib import Path
+
+from src.utils.pairing_utils import ReadPair, check_read_pair, is_fastq_file
+from src.utils.qc_utils import scan_fastq_pair
+
+
+def _write_fastq(path: Path, reads: list[tuple[str, str]]) -> None:
+    path.write_text("".join(f"@{name}\n{seq}\n+\n{'5' * len(seq)}\n" for name, seq in reads))
+
+
+def test_check_read_pair_accumulates_qc_in_the_same_scan(tmp_path: Path) -> None:
+    reads = [(f"r{i}", "ACGT" * (i % 5 + 1)) for i in range(20)]
+    _write_fastq(tmp_path / "s_R1.fastq", [(f"{name}/1", seq) for name, seq in reads])
+    _write_fastq(tmp_path / "s_R2.fastq", [(f"{name}/2", seq) for name, seq in reads])
+    pair = ReadPair("s", tmp_path / "s_R1.fastq", tmp_path / "s_R2.fastq")
+
+    check = check_read_pair(pair, with_qc=True)
+
+    assert check.ok
+    assert check.qc == scan_fastq_pair(pair.r1, pair.r2)
+    assert check_read_pair(pair).qc is None
+
+
+def test_check_read_pair_reports_mismatched_ids(tmp_path: Path) -> None:
+    _write_fastq(tmp_path / "s_R1.fastq", [("a", "ACGT"), ("b", "ACGT")])
+    _write_fastq(tmp_path / "s_R2.fastq", [("a", "ACGT"), ("c", "ACGT")])
+
+    check = check_read_pair(ReadPair("s", tmp_path / "s_R1.fastq", tmp_path / "s_R2.fastq"))
+
+    assert not check.ok
+    assert "第 2 筆" in check.error
+
+
+def test_is_fastq_file_accepts_the_pairing_suffixes() -> None:
+    names = ("s_R1.fastq", "s_R1.fq", "s_R1.fastq.gz", "S_R1.FQ.GZ", "s_R1.fasta", "s.fastq.bz2")
+    assert [is_fastq_file(Path(name)) for name in names] == [True, True, True, True, False, False]
@@ -0,0 +1,181 @@
+"""引子修剪工具測試
+
+Tests of the primer trimming utilities.
+"""
+
+import json
+from pathlib import Path
+import random
+import shutil
+import subprocess
+
+import pytest
+
+from src.utils.primer_trim_utils import (
+    LinkedAdapter,
+    PrimerTrimSettings,
+    relocate_cutadapt_report,
+    trim_pair_records,
+    trim_primers_paired,
+)
+from src.utils.sequence_utils import reverse_complement
+
+FORWARD = "GTCGGTAAAACTCGTGCCAGC"
+REVERSE = "CAAACTGGGATTAGATACCCCACTATG"
+INSERT = "ACGTTGCAAGTCCGATAGCTTAGGCATCGATCGGATACCAGTTAGC"
+
+
+def _record(name: str, seq: str) -> tuple[bytes, bytes, bytes]:
+    return name.encode(), seq.encode(), b"I" * len(seq)
+
+
+def _random_pairs(count: int, seed: int) -> list[tuple[str, str]]:
+    """產生含 5'、3'、兩端或無引子的隨機讀序對
+
+    Generate random read pairs with the 5' primer, the 3' primer, both or neither.
+    """
+    rng = random.Random(seed)
+
+    def bases(length: int) -> str:
+        return "".join(rng.choice("ACGT") for _ in range(length))
+
+    def mutate(primer: str) -> str:
+        primer = list(primer)
+        for _ in range(rng.choice([0, 0, 1, 2, 3])):
+            i = rng.randrange(len(primer))
+            op = rng.random()
+            if op < 0.6:
+                primer[i] = rng.choice("ACGTN")
+            elif op < 0.8:
+                del primer[i]
+            else:
+                primer.insert(i, rng.choice("ACGT"))
+        return "".join(primer)
+
+    pairs = []
+    for _ in range(count):
+        kind = rng.choice(["both", "front", "back", "none", "partial"])
+        amplicon = bases(rng.randint(0, 200))
+        front = mutate(FORWARD) if kind in ("both", "front") else ""
+        back = mutate(REVERSE) if kind in ("both", "back") else ""
+        read = bases(rng.choice([0, 0, 3, 10])) + front + amplicon + back + bases(5)
+        if kind == "partial":
+            tail = REVERSE[: rng.randint(2, 15)]
+            read = FORWARD[rng.randint(5, 15) :] + amplicon + tail
+        mate = reverse_complement(read)[: rng.randint(50, 300)] if rng.random() < 0.7 else ""
+        pairs.append((read[: rng.randint(60, 300)] or "A", mate or bases(150)))
+    return pairs
+
+
+def test_trim_pair_records_keeps_reads_with_either_primer() -> None:
+    adapter1, adapter2 = LinkedAdapter.primer_pair(FORWARD, REVERSE)
+    amplicon = FORWARD + INSERT + REVERSE
+    reads = {
+        "both": amplicon,
+        "front": FORWARD + INSERT,
+        "back": INSERT + REVERSE,
+        "none": INSERT,
+    }
+    mate = reverse_complement(amplicon)
+    batch1 = [_record(name, seq) for name, seq in reads.items()]
+    batch2 = [_record(name, mate) for name in reads]
+
+    kept1, kept2, stats = trim_pair_records(
+        batch1, batch2, adapter1, adapter2, PrimerTrimSettings()
+    )
+
+    assert [record[0] for record in kept1] == [b"both", b"front", b"back"]
+    assert all(record[1] == INSERT.encode() for record in kept1)
+    assert all(record[1] == reverse_complement(INSERT).encode() for record in kept2)
+    assert stats.read1_with_adapter == 3
+    assert stats.discarded_pairs == 1
+
+
+@pytest.mark.skipif(shutil.which("cutadapt") is None, reason="cutadapt 未安裝")
+def test_trim_primers_paired_matches_cutadapt(tmp_path: Path) -> None:
+    pairs = _random_pairs(1500, seed=1)
+    for i, name in enumerate(("in1", "in2")):
+        (tmp_path / f"{name}.fastq").write_text(
+            "".join(f"@r{n}\n{pair[i]}\n+\n{'I' * len(pair[i])}\n" for n, pair in enumerate(pairs))
+        )
+    adapter1, adapter2 = LinkedAdapter.primer_pair(FORWARD, REVERSE)
+    trim_primers_paired(
+        tmp_path / "in1.fastq",
+        tmp_path / "in2.fastq",
+        tmp_path / "out1.fastq",
+        tmp_path / "out2.fastq",
+        adapter1,
+        adapter2,
+        tmp_path / "native.json",
+    )
+    subprocess.run(
+        [
+            "cutadapt",
+            "-a",
+            adapter1.spec,
+            "-A",
+            adapter2.spec,
+            "--discard-untrimmed",
+            "--json",
+            str(tmp_path / "cutadapt.json"),
+            "-o",
+            str(tmp_path / "expected1.fastq"),
+            "-p",
+            str(tmp_path / "expected2.fastq"),
+            str(tmp_path / "in1.fastq"),
+            str(tmp_path / "in2.fastq"),
+        ],
+        check=True,
+        capture_output=True,
+    )
+
+    for read in (1, 2):
+        assert (tmp_path / f"out{read}.fastq").read_text() == (
+            tmp_path / f"expected{read}.fastq"
+        ).read_text()
+
+    native = json.loads((tmp_path / "native.json").read_text())
+    expected = json.loads((tmp_path / "cutadapt.json").read_text())
+    assert native["read_counts"] == expected["read_counts"]
+    assert native["basepair_counts"] == expected["basepair_counts"]
+    for key in ("adapters_read1", "adapters_read2"):
+        assert native[key] == expected[key]
+
+
+def test_relocate_cutadapt_report_rewrites_paths(tmp_path: Path) -> None:
+    old, new = tmp_path / "old", tmp_path / "new"
+    old.mkdir()
+    new.mkdir()
+    pairs = _random_pairs(20, seed=2)
+    for i, name in enumerate(("in1", "in2")):
+        (old / f"{name}.fastq").write_text(
+            "".join(f"@r{n}\n{pair[i]}\n+\n{'I' * len(pair[i])}\n" for n, pair in enumerate(pairs))
+        )
+    adapter1, adapter2 = LinkedAdapter.primer_pair(FORWARD, REVERSE)
+    trim_primers_paired(
+        old / "in1.fastq",
+        old / "in2.fastq",
+        old / "out1.fastq",
+        old / "out2.fastq",
+        adapter1,
+        adapter2,
+        old / "report.json",
+    )
+    shutil.copyfile(old / "report.json", new / "report.json")
+
+    relocate_cutadapt_report(
+        new / "report.json",
+        new / "in1.fastq",
+        new / "in2.fastq",
+        new / "out1.fastq",
+        new / "out2.fastq",
+    )
+
+    before = json.loads((old / "report.json").read_text())
+    after = json.loads((new / "report.json").read_text())
+    assert after["input"]["path1"] == str(new / "in1.fastq")
+    assert after["input"]["path2"] == str(new / "in2.fastq")
+    assert after["command_line_arguments"] == [
+        argument.replace(str(old), str(new)) for argument in before["command_line_arguments"]
+    ]
+    assert after["read_counts"] == before["read_counts"]
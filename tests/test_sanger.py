@@ -0,0 +1,73 @@
+"""Sanger 監看模式測試
+
+Tests of the Sanger watch mode.
+"""
+
+import json
+import os
+from pathlib import Path
+import time
+
+import pandas as pd
+
+from src.sanger import WATCH_SETTLE_SECONDS, SangerWatcher
+
+
+class _Frame:
+    """只實作監看流程所需步驟的內容框架替身
+
+    Stand-in for the content frame implementing only the steps the watcher calls.
+    """
+
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    def _ab1_to_fastq(self, ab1_file: Path) -> str:
+        if ab1_file.read_bytes() != b"ABIF":
+            raise ValueError("not an ABIF file")
+        return f"@{ab1_file.stem}\nACGT\n+\nIIII\n"
+
+    def _trim_sequences(self, input_fastq: Path, output_fastq: Path, *args: object) -> None:
+        output_fastq.write_text(input_fastq.read_text())
+
+    def _convert_fastq_to_fasta(self, input_fastq: Path, output_fasta: Path) -> None:
+        output_fasta.write_text("")
+
+    def _run_blast(self, *args: object) -> None:
+        pass
+
+    def _parse_blast_results(self, blast_txt: Path, sample_files: list[Path]) -> pd.DataFrame:
+        self.batches.append([sample_file.stem for sample_file in sample_files])
+        return pd.DataFrame({"No": [sample_file.stem for sample_file in sample_files]})
+
+    def _add_chinese_names(self, *args: object) -> None:
+        pass
+
+
+def _write_ab1(path: Path, content: bytes) -> None:
+    path.write_bytes(content)
+    past = time.time() - WATCH_SETTLE_SECONDS - 10
+    os.utime(path, (past, past))
+
+
+def test_unreadable_ab1_does_not_block_the_batch(tmp_path: Path) -> None:
+    input_folder = tmp_path / "samples"
+    input_folder.mkdir()
+    _write_ab1(input_folder / "good.ab1", b"ABIF")
+    _write_ab1(input_folder / "bad.ab1", b"junk")
+    frame = _Frame()
+    watcher = SangerWatcher(frame, input_folder, tmp_path / "out", "primer", "db")
+
+    assert watcher.process_pending() == 1
+    assert frame.batches == [["good"]]
+    state = json.loads(watcher.state_file.read_text(encoding="utf-8"))
+    assert "error" in state["bad.ab1"]
+    assert "error" not in state["good.ab1"]
+
+    # 失敗的檔案在內容變更前不再處理
+    # The failed file is skipped until its content changes
+    assert watcher.process_pending() == 0
+    _write_ab1(input_folder / "bad.ab1", b"ABIF")
+    assert watcher.process_pending() == 1
+    assert frame.batches[-1] == ["bad"]
+    assert "error" not in watcher.state["bad.ab1"]
@@ -0,0 +1,60 @@
+"""排程工具測試
+
+Tests of the scheduling utilities.
+"""
+
+import os
+import time
+
+from src.utils.scheduler_utils import (
+    PROCESS_MODE,
+    THREAD_MODE,
+    CoreScheduler,
+    ResourceBudget,
+    ToolProfile,
+    ordered_process_map,
+)
+
+BUDGET = ResourceBudget(cpus=4, memory_bytes=64 * 1024**3)
+EXTERNAL = ToolProfile("tool", max_threads=8, memory_bytes=1024**3)
+NATIVE = ToolProfile("native", max_threads=16, memory_bytes=1024**3, native=True)
+
+
+def _worker_pid(_: int) -> int:
+    time.sleep(0.2)
+    return os.getpid()
+
+
+def test_plan_gives_native_stages_worker_processes() -> None:
+    scheduler = CoreScheduler(BUDGET)
+
+    external = scheduler.plan("external", EXTERNAL, items=96)
+    native = scheduler.plan("native", NATIVE, items=96)
+
+    assert (external.workers, external.threads, external.mode) == (4, 1, THREAD_MODE)
+    assert (native.workers, native.threads, native.mode) == (1, 4, PROCESS_MODE)
+    assert [stage["mode"] for stage in scheduler.to_dict()["stages"]] == [
+        THREAD_MODE,
+        PROCESS_MODE,
+    ]
+
+
+def test_plan_runs_native_samples_together_beyond_max_threads() -> None:
+    scheduler = CoreScheduler(ResourceBudget(cpus=64, memory_bytes=64 * 1024**3))
+
+    plan = scheduler.plan("native", NATIVE, items=96)
+
+    assert (plan.workers, plan.threads) == (4, 16)
+
+
+def test_native_stage_uses_several_processes_with_more_samples_than_cpus() -> None:
+    scheduler = CoreScheduler(ResourceBudget(cpus=2, memory_bytes=64 * 1024**3))
+    pids: set[int] = set()
+
+    def run_sample(sample: str, threads: int) -> None:
+        pids.update(ordered_process_map(_worker_pid, ((i,) for i in range(4)), threads))
+
+    scheduler.run("native", NATIVE, run_sample, [(f"S{i}.fastq",) for i in range(8)])
+
+    assert os.getpid() not in pids
+    assert len(pids) > 1